@@ -0,0 +1,68 @@
+"""
+Benchmark tiled SLM frame rendering against the number of worker threads.
+
+Renders a lens + Zernike + background + vortex frame on the full chip with
+1..N threads and reports the best time per frame and the speed-up over a
+single thread.
+
+Usage (from the activated venv):
+    python scripts/bench_slm_render.py [--max-workers N] [--repeat R]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from dlab.hardware.wrappers.phase_layers import (
+    BackgroundLayer,
+    LensLayer,
+    VortexLayer,
+    ZernikeLayer,
+    render_tiled,
+)
+from dlab.hardware.wrappers.slm_geometry import get_geometry
+
+
+def _layers(geometry):
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 1024, geometry.shape).astype(np.float64)
+    js = tuple(range(2, 16))
+    return [
+        LensLayer(bending_strength=0.6, wavelength_nm=1030.0),
+        ZernikeLayer(js, tuple(float(c) for c in rng.normal(0.0, 30.0, len(js)))),
+        BackgroundLayer(image=background),
+        VortexLayer(vortices=((10.0, 1), (4.0, -2))),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    geometry = get_geometry()
+    layers = _layers(geometry)
+    reference = render_tiled(layers, geometry, workers=1)  # also warms the caches
+
+    print(f"Frame {geometry.shape[0]}x{geometry.shape[1]}, {len(layers)} layers, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'ms/frame':>10} {'speed-up':>9}")
+    base_ms = None
+    for workers in range(1, max(1, args.max_workers) + 1):
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            frame = render_tiled(layers, geometry, workers=workers)
+            best = min(best, time.perf_counter() - t0)
+        if not np.array_equal(frame, reference):
+            raise SystemExit(f"Tiled frame with {workers} workers differs from the reference.")
+        ms = best * 1e3
+        base_ms = base_ms or ms
+        print(f"{workers:>8} {ms:>10.1f} {base_ms / ms:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
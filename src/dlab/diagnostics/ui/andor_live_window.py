@@ -9,7 +9,8 @@ from pathlib import Path
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from scipy.ndimage import rotate as sp_rotate
+from scipy.ndimage import map_coordinates
+from scipy.special import cosdg, sindg
 from PIL import Image, PngImagePlugin
 import cmasher as cmr
 
@@ -25,6 +26,9 @@ from dlab.hardware.wrappers.andor_controller import (
     AndorController, AndorControllerError,
     DEFAULT_EXPOSURE_US, MIN_EXPOSURE_US, MAX_EXPOSURE_US
 )
+from dlab.hardware.wrappers.acquisition_hub import AcquisitionHub, FrameReader
+from dlab.hardware.wrappers.dark_calibration import DEFAULT_DARK_FRAMES, default_calibration_store
+from dlab.diagnostics.ui.render_scheduler import BlitManager, RenderScheduler
 from dlab.core.device_registry import REGISTRY
 from dlab.utils.config_utils import cfg_get
 from dlab.utils.paths_utils import data_dir
@@ -34,6 +38,7 @@ from dlab.boot import ROOT
 
 REGISTRY_KEY = "camera:andor"
 SAVE_NAME = "AndorCam_1"
+SCAN_REGISTRY_KEY = f"{REGISTRY_KEY}:{SAVE_NAME}"
 
 DEFAULT_PREPROCESS = {
     "enabled": False,
@@ -42,8 +47,17 @@ DEFAULT_PREPROCESS = {
     "x1": 490,
     "y0": 210,
     "y1": 340,
+    "order": 3,
 }
 
+INTERP_ORDERS = {"Nearest": 0, "Linear": 1, "Cubic": 3}
+# Extra input pixels around the sampled area so the spline prefilter of a
+# cropped input matches the full-frame one.
+SPLINE_MARGIN_PX = 8
+
+# Colorbar ticks are part of the cached background; refresh them this often.
+FULL_REDRAW_S = 1.0
+
 COLORMAPS = [
     "cmr.rainforest", "cmr.neutral", "cmr.sunburst",
     "cmr.freeze", "turbo", "viridis", "plasma"
@@ -60,13 +74,80 @@ def _resolve_cmap(key: str):
     return plt.get_cmap(key)
 
 
+class _RotateCropMap:
+    """
+    Rotation (as ``scipy.ndimage.rotate(..., reshape=True)``) followed by a
+    crop, folded into one coordinate map of the cropped output pixels.
+
+    The map depends only on the frame shape, angle and crop, so it is built
+    once and reused; each frame then costs a gather of the ROI pixels from
+    the small input window they come from, not a full-frame rotation.
+    """
+
+    def __init__(self, shape: tuple[int, int], angle: float, crop: tuple[int, int, int, int], order: int):
+        self.key = (tuple(shape), float(angle), tuple(crop), int(order))
+        self.order = int(order)
+        h, w = shape
+        c, s = cosdg(angle), sindg(angle)
+        rot = np.array([[c, s], [-s, c]])
+        in_shape = np.array([h, w], dtype=float)
+        bounds = rot @ [[0, 0, h, h], [0, w, 0, w]]
+        out_shape = (np.ptp(bounds, axis=1) + 0.5).astype(int)
+        offset = (in_shape - 1) / 2 - rot @ ((out_shape - 1) / 2)
+
+        # Same clamping as a crop of the rotated frame.
+        x0, x1, y0, y1 = crop
+        oh, ow = int(out_shape[0]), int(out_shape[1])
+        y0, y1 = max(0, min(y0, oh - 1)), max(y0 + 1, min(y1, oh))
+        x0, x1 = max(0, min(x0, ow - 1)), max(x0 + 1, min(x1, ow))
+        y1, x1 = min(y1, oh), min(x1, ow)
+        self.out_shape = (y1 - y0, x1 - x0)
+
+        rows, cols = np.mgrid[y0:y1, x0:x1].astype(np.float64)
+        coords = np.tensordot(rot, np.stack((rows, cols)), axes=1)
+        coords += offset[:, None, None]
+
+        # Only the input window the ROI samples from (plus a margin for the
+        # spline support) is ever read.
+        margin = SPLINE_MARGIN_PX if self.order > 1 else 1
+        lo = np.floor(coords.reshape(2, -1).min(axis=1)).astype(int) - margin
+        hi = np.ceil(coords.reshape(2, -1).max(axis=1)).astype(int) + margin + 1
+        lo = np.clip(lo, 0, [h - 1, w - 1])
+        hi = np.clip(hi, lo + 1, [h, w])
+        self.window = (slice(lo[0], hi[0]), slice(lo[1], hi[1]))
+        # The window only ends where the frame does or well past the sampled
+        # area, so "nearest" edge handling on it matches the full frame.
+        coords -= lo[:, None, None]
+        self.coords = coords
+        self._out = np.empty(self.out_shape, dtype=np.float32)
+
+    def apply(self, image: np.ndarray) -> np.ndarray:
+        src = image[self.window]
+        map_coordinates(src, self.coords, output=self._out, order=self.order, mode="nearest")
+        out = self._out
+        if np.issubdtype(image.dtype, np.integer):
+            info = np.iinfo(image.dtype)
+            out = np.clip(np.rint(out), info.min, info.max)
+        return out.astype(image.dtype)
+
+
 class _LiveCaptureThread(QThread):
-    """Background thread for continuous image capture."""
+    """
+    Background thread for continuous image capture.
+
+    In stream mode the camera acquires continuously into its frame ring and
+    the newest frame is shown every interval, with its frame number and the
+    skipped-frame count; otherwise each frame is a single acquisition.
+
+    The exposure is only applied after it changed, and never while a scan
+    shares the camera stream; a change made meanwhile waits for the scan.
+    """
 
     image_signal = pyqtSignal(np.ndarray)
     fps_signal = pyqtSignal(float)
+    frame_info_signal = pyqtSignal(int, int)
 
-    def __init__(self, controller: AndorController, exposure: int, interval_ms: int):
+    def __init__(self, controller: AndorController, exposure: int, interval_ms: int, stream: bool = False):
         super().__init__()
         self._controller = controller
         self._exposure = exposure
@@ -74,29 +155,73 @@ class _LiveCaptureThread(QThread):
         self._running = True
         self._lock = threading.Lock()
         self._frame_times: list[float] = []
+        self._stream = stream
+        self._exposure_pending = True
 
     def update_parameters(self, exposure: int, interval_ms: int):
         with self._lock:
+            if exposure != self._exposure:
+                self._exposure_pending = True
             self._exposure = exposure
             self._interval_s = interval_ms / 1000.0
 
+    def _apply_pending_exposure(self, hub: AcquisitionHub, own: int):
+        """Set a changed exposure unless another consumer holds the stream."""
+        with self._lock:
+            if not self._exposure_pending:
+                return
+            exp = self._exposure
+        if hub.run_exclusive(lambda: self._controller.set_exposure(exp), own):
+            with self._lock:
+                if self._exposure == exp:
+                    self._exposure_pending = False
+
     def stop(self):
         self._running = False
 
     def run(self):
+        if self._stream:
+            self._run_stream()
+            return
+        hub = AcquisitionHub.for_camera(self._controller)
         while self._running:
             try:
                 with self._lock:
-                    exp = self._exposure
                     interval = self._interval_s
 
-                image = self._controller.capture_single(exp)
+                self._apply_pending_exposure(hub, own=0)
+                image = self._controller.capture_single()
                 self.image_signal.emit(image)
                 self._update_fps()
                 time.sleep(interval)
             except Exception:
                 break
 
+    def _run_stream(self):
+        hub = AcquisitionHub.for_camera(self._controller)
+        try:
+            self._apply_pending_exposure(hub, own=0)  # before the stream starts, if nobody holds it
+            reader = FrameReader(hub.acquire())
+        except Exception:
+            return
+        reader.skip(-1)  # show the frame already in the ring right away
+        try:
+            while self._running:
+                with self._lock:
+                    interval = self._interval_s
+                self._apply_pending_exposure(hub, own=1)
+                got = reader.latest(timeout=1.0, copy=True)
+                if got is not None:
+                    _, frame, frame_number = got
+                    self.image_signal.emit(frame)
+                    self.frame_info_signal.emit(int(frame_number), int(self._controller.frames_skipped))
+                    self._update_fps()
+                time.sleep(interval)
+        except Exception:
+            pass
+        finally:
+            hub.release()
+
     def _update_fps(self):
         now = time.time()
         self._frame_times.append(now)
@@ -109,6 +234,27 @@ class _LiveCaptureThread(QThread):
         self.fps_signal.emit(fps)
 
 
+class _DarkCalibrationThread(QThread):
+    """Records a dark calibration without blocking the GUI."""
+
+    done_signal = pyqtSignal(object)
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, controller: AndorController, n_frames: int, exposure: int):
+        super().__init__()
+        self._controller = controller
+        self._n_frames = n_frames
+        self._exposure = exposure
+
+    def run(self):
+        try:
+            cal = self._controller.calibrate_dark(self._n_frames, self._exposure)
+        except Exception as e:
+            self.error_signal.emit(str(e))
+            return
+        self.done_signal.emit(cal)
+
+
 class AndorLiveWindow(QWidget):
     """Live view window for Andor camera."""
 
@@ -123,6 +269,7 @@ class AndorLiveWindow(QWidget):
         self._log = log_panel
         self._cam: AndorController | None = None
         self._capture_thread: _LiveCaptureThread | None = None
+        self._dark_thread: _DarkCalibrationThread | None = None
         self._last_frame: np.ndarray | None = None
         self._frame_lock = threading.Lock()
 
@@ -132,6 +279,11 @@ class AndorLiveWindow(QWidget):
         self._fixed_cbar_max: float | None = None
         self._cmap_key = "cmr.rainforest"
         self._cmap = _resolve_cmap(self._cmap_key)
+        self._profile_line = None
+        self._profile_fill = None
+        self._profile_axis: int | None = None
+        self._last_full_draw = 0.0
+        self._remap: _RotateCropMap | None = None
 
         # Crosshair state
         self._crosshair_visible = False
@@ -147,7 +299,10 @@ class AndorLiveWindow(QWidget):
 
         self._init_ui()
         self._load_preprocess_from_config()
-        self.external_image_signal.connect(self._update_image)
+        self._render = RenderScheduler(self._update_image, parent=self)
+        self._render.stats_signal.connect(self._update_display_stats)
+        self._blit = BlitManager(self._canvas, self._animated_artists)
+        self.external_image_signal.connect(self._render.submit, Qt.DirectConnection)
 
     def _init_ui(self):
         main_layout = QHBoxLayout(self)
@@ -183,6 +338,26 @@ class AndorLiveWindow(QWidget):
         fps_layout.addStretch()
         param_layout.addLayout(fps_layout)
 
+        disp_layout = QHBoxLayout()
+        disp_layout.addWidget(QLabel("Display:"))
+        self._display_label = QLabel("0.0 fps (0 dropped)")
+        disp_layout.addWidget(self._display_label)
+        disp_layout.addStretch()
+        param_layout.addLayout(disp_layout)
+
+        # Continuous acquisition
+        self._stream_cb = QCheckBox("Stream (continuous)")
+        self._stream_cb.setChecked(True)
+        self._stream_cb.setToolTip("Acquire continuously and show the newest frame; otherwise one acquisition per frame.")
+        param_layout.addWidget(self._stream_cb)
+
+        frame_layout = QHBoxLayout()
+        frame_layout.addWidget(QLabel("Frame:"))
+        self._frame_label = QLabel("-")
+        frame_layout.addWidget(self._frame_label)
+        frame_layout.addStretch()
+        param_layout.addLayout(frame_layout)
+
         # MCP Voltage
         mcp_layout = QHBoxLayout()
         mcp_layout.addWidget(QLabel("MCP Voltage:"))
@@ -309,6 +484,11 @@ class AndorLiveWindow(QWidget):
         self._pre_angle_sb.setSingleStep(1.0)
         self._pre_angle_sb.setValue(DEFAULT_PREPROCESS["angle"])
         row_angle.addWidget(self._pre_angle_sb)
+        row_angle.addWidget(QLabel("Interp:"))
+        self._pre_order_combo = QComboBox()
+        self._pre_order_combo.addItems(list(INTERP_ORDERS))
+        self._pre_order_combo.setCurrentText(self._order_name(DEFAULT_PREPROCESS["order"]))
+        row_angle.addWidget(self._pre_order_combo)
         pre_layout.addLayout(row_angle)
 
         row_x = QHBoxLayout()
@@ -350,6 +530,31 @@ class AndorLiveWindow(QWidget):
         pre_layout.addLayout(pre_btn_row)
         param_layout.addWidget(pre_grp)
 
+        # Dark calibration
+        dark_grp = QGroupBox("Dark Calibration")
+        dark_layout = QVBoxLayout(dark_grp)
+        dark_row = QHBoxLayout()
+        dark_row.addWidget(QLabel("Frames:"))
+        self._dark_frames_spin = QSpinBox()
+        self._dark_frames_spin.setRange(2, 1000)
+        self._dark_frames_spin.setValue(DEFAULT_DARK_FRAMES)
+        dark_row.addWidget(self._dark_frames_spin)
+        self._dark_btn = QPushButton("Record Dark")
+        self._dark_btn.clicked.connect(self._record_dark)
+        dark_row.addWidget(self._dark_btn)
+        dark_layout.addLayout(dark_row)
+        self._dark_apply_cb = QCheckBox("Apply to scans")
+        self._dark_apply_cb.setChecked(True)
+        self._dark_apply_cb.setToolTip(
+            "Subtract the master dark and repair defect pixels of the current exposure; "
+            "replaces the per-frame hot-pixel cleanup and background frames."
+        )
+        self._dark_apply_cb.toggled.connect(self._on_dark_apply)
+        dark_layout.addWidget(self._dark_apply_cb)
+        self._dark_label = QLabel("-")
+        dark_layout.addWidget(self._dark_label)
+        param_layout.addWidget(dark_grp)
+
         param_layout.addStretch()
         splitter.addWidget(param_panel)
 
@@ -401,7 +606,10 @@ class AndorLiveWindow(QWidget):
             self._cam = AndorController(device_index=0)
             self._cam.activate()
             REGISTRY.register(REGISTRY_KEY, self._cam)
+            REGISTRY.register(SCAN_REGISTRY_KEY, self._cam)
             self._log_message("Camera activated.")
+            self._on_dark_apply(self._dark_apply_cb.isChecked())
+            self._refresh_dark_status()
 
             self._activate_btn.setEnabled(False)
             self._deactivate_btn.setEnabled(True)
@@ -413,6 +621,7 @@ class AndorLiveWindow(QWidget):
     def _deactivate_camera(self):
         try:
             REGISTRY.unregister(REGISTRY_KEY)
+            REGISTRY.unregister(SCAN_REGISTRY_KEY)
             if self._cam:
                 self._cam.deactivate()
                 self._log_message("Camera deactivated.")
@@ -437,9 +646,14 @@ class AndorLiveWindow(QWidget):
             QMessageBox.critical(self, "Error", "Invalid parameter values.")
             return
 
-        self._capture_thread = _LiveCaptureThread(self._cam, exposure, interval)
-        self._capture_thread.image_signal.connect(self._update_image)
+        self._capture_thread = _LiveCaptureThread(
+            self._cam, exposure, interval, stream=self._stream_cb.isChecked()
+        )
+        self._stream_cb.setEnabled(False)
+        self._render.reset()
+        self._capture_thread.image_signal.connect(self._render.submit, Qt.DirectConnection)
         self._capture_thread.fps_signal.connect(self._update_fps)
+        self._capture_thread.frame_info_signal.connect(self._update_frame_info)
         self._capture_thread.start()
 
         self._log_message("Live capture started.")
@@ -451,6 +665,7 @@ class AndorLiveWindow(QWidget):
             self._capture_thread.stop()
             self._capture_thread.wait()
             self._capture_thread = None
+        self._stream_cb.setEnabled(True)
 
         self._log_message("Live capture stopped.")
         self._start_btn.setEnabled(True)
@@ -467,14 +682,93 @@ class AndorLiveWindow(QWidget):
                 self._cam.set_exposure(exposure)
         except ValueError:
             pass
+        self._refresh_dark_status()
+
+    # -------------------------------------------------------------------------
+    # Dark calibration
+    # -------------------------------------------------------------------------
+
+    def _refresh_dark_status(self):
+        try:
+            exposure = int(self._exposure_edit.text())
+        except ValueError:
+            self._dark_label.setText("-")
+            return
+        if self._cam is None:
+            self._dark_label.setText("-")
+            return
+        cal = default_calibration_store().get(self._cam.camera_name, exposure)
+        if cal is None:
+            self._dark_label.setText(f"None at {exposure} µs")
+        else:
+            self._dark_label.setText(f"{cal.frames} frames, {cal.n_defects} defects ({cal.created})")
+
+    def _on_dark_apply(self, checked: bool):
+        if self._cam:
+            self._cam.dark_correction = bool(checked)
+
+    def _record_dark(self):
+        if self._cam is None:
+            QMessageBox.critical(self, "Error", "Camera not activated.")
+            return
+        if self._dark_thread is not None:
+            return
+        try:
+            exposure = int(self._exposure_edit.text())
+        except ValueError:
+            QMessageBox.critical(self, "Error", "Invalid exposure.")
+            return
+        n = int(self._dark_frames_spin.value())
+        reply = QMessageBox.question(
+            self, "Dark Calibration",
+            f"Block the beam (or close the shutter), then record {n} dark frames at {exposure} µs?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes,
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        self._dark_thread = _DarkCalibrationThread(self._cam, n, exposure)
+        self._dark_thread.done_signal.connect(self._on_dark_done)
+        self._dark_thread.error_signal.connect(self._on_dark_error)
+        self._dark_thread.finished.connect(self._on_dark_finished)
+        self._dark_btn.setEnabled(False)
+        self._exposure_edit.setEnabled(False)
+        self._dark_label.setText(f"Recording {n} frames…")
+        self._log_message(f"Recording dark calibration: {n} frames at {exposure} µs.")
+        self._dark_thread.start()
+
+    def _on_dark_done(self, cal):
+        self._log_message(
+            f"Dark calibration stored: {cal.frames} frames at {cal.exposure_us} µs, {cal.n_defects} defect pixels."
+        )
+
+    def _on_dark_error(self, message: str):
+        QMessageBox.critical(self, "Error", f"Dark calibration failed: {message}")
+        self._log_message(f"Dark calibration error: {message}")
+
+    def _on_dark_finished(self):
+        self._dark_thread = None
+        self._dark_btn.setEnabled(True)
+        self._exposure_edit.setEnabled(True)
+        self._refresh_dark_status()
 
     def _update_fps(self, fps: float):
         self._fps_label.setText(f"{fps:.1f}")
 
+    def _update_frame_info(self, frame_number: int, skipped: int):
+        self._frame_label.setText(f"{frame_number} ({skipped} skipped)")
+
+    def _update_display_stats(self, arrival_fps: float, display_fps: float, dropped: int):
+        self._display_label.setText(f"{display_fps:.1f} fps ({dropped} dropped)")
+
     # -------------------------------------------------------------------------
     # Image display
     # -------------------------------------------------------------------------
 
+    def _animated_artists(self) -> list:
+        return [self._image_artist, self._ax_img.title, self._ch_h, self._ch_v,
+                self._profile_line, self._profile_fill]
+
     def _update_image(self, image: np.ndarray):
         with self._frame_lock:
             self._last_frame = image
@@ -482,17 +776,14 @@ class AndorLiveWindow(QWidget):
         disp = self._display_preprocess(image)
         max_val = float(np.max(disp))
         min_val = float(np.min(disp))
-        sum_val = float(np.sum(disp))
-        mean_val = float(np.mean(disp))
+        sum_val = float(np.sum(disp, dtype=np.float64))
+        mean_val = sum_val / disp.size
         title = f"Sum: {sum_val:.0f} | Max: {max_val:.0f} | Mean: {mean_val:.1f}"
 
         # Check if dimensions changed
-        recreate = False
-        if self._image_artist is not None:
-            if self._image_artist.get_array().shape != disp.shape:
-                recreate = True
+        recreate = self._image_artist is None or self._image_artist.get_array().shape != disp.shape
 
-        if self._image_artist is None or recreate:
+        if recreate:
             self._ax_img.clear()
             if self._cbar is not None:
                 try:
@@ -511,13 +802,10 @@ class AndorLiveWindow(QWidget):
                 self._image_artist, ax=self._ax_img, fraction=fraction, pad=0.02, aspect=30
             )
             self._cbar.ax.set_ylabel("Intensity", rotation=270, labelpad=15)
+            self._ch_h = self._ch_v = None
         else:
-            xlim = self._ax_img.get_xlim()
-            ylim = self._ax_img.get_ylim()
             self._image_artist.set_data(disp)
-            self._ax_img.set_xlim(xlim)
-            self._ax_img.set_ylim(ylim)
-            self._ax_img.set_title(title)
+            self._ax_img.title.set_text(title)
 
         # Colorbar scaling
         if self._autofix_cbar_cb.isChecked():
@@ -530,49 +818,76 @@ class AndorLiveWindow(QWidget):
             self._fixed_cbar_max = None
             self._image_artist.set_clim(min_val, max_val)
 
-        self._image_artist.set_cmap(self._cmap)
-        self._cbar.update_normal(self._image_artist)
-
-        # Profile
-        axis = self._profile_axis_for_display()
-        profile = np.sum(disp, axis=axis)
-        self._ax_profile.clear()
-        self._ax_profile.grid(True, alpha=0.3)
-
-        if axis == 1:
-            x = np.arange(disp.shape[0])
-            self._ax_profile.plot(x, profile, linewidth=1.5)
-            self._ax_profile.fill_between(x, profile, alpha=0.3)
-            self._ax_profile.set_xlabel("Row (px)")
-            self._ax_profile.set_xlim(0, disp.shape[0] - 1)
-        else:
-            x = np.arange(disp.shape[1])
-            self._ax_profile.plot(x, profile, linewidth=1.5)
-            self._ax_profile.fill_between(x, profile, alpha=0.3)
-            self._ax_profile.set_xlabel("Column (px)")
-            self._ax_profile.set_xlim(0, disp.shape[1] - 1)
+        now = time.monotonic()
+        full = recreate or now - self._last_full_draw >= FULL_REDRAW_S
+        if full:
+            self._cbar.update_normal(self._image_artist)
 
-        self._ax_profile.set_ylabel("Integrated Intensity")
-        self._ax_profile.set_ylim(bottom=0)
+        full = self._update_profile(disp) or full
+        if recreate:
+            self._refresh_crosshair()
+        if full:
+            self._last_full_draw = now
+        self._blit.update(full=full)
 
-        self._refresh_crosshair()
-        self._canvas.draw_idle()
+    def _update_profile(self, disp: np.ndarray) -> bool:
+        """Update the integrated profile in place; True if the axes need a full redraw."""
+        axis = self._profile_axis_for_display()
+        profile = np.sum(disp, axis=axis, dtype=np.float64)
+        x = np.arange(profile.size)
+        top = float(profile.max()) * 1.1 if profile.size else 0.0
+        top = top if top > 0 else 1.0
+
+        if (self._profile_line is None or axis != self._profile_axis
+                or self._profile_line.get_xdata().size != profile.size):
+            self._ax_profile.clear()
+            self._ax_profile.grid(True, alpha=0.3)
+            self._profile_line, = self._ax_profile.plot(x, profile, linewidth=1.5)
+            self._profile_fill = self._ax_profile.fill_between(x, profile, alpha=0.3)
+            self._profile_axis = axis
+            self._ax_profile.set_xlabel("Row (px)" if axis == 1 else "Column (px)")
+            self._ax_profile.set_xlim(0, profile.size - 1)
+            self._ax_profile.set_ylabel("Integrated Intensity")
+            self._ax_profile.set_ylim(0, top)
+            return True
+
+        self._profile_line.set_ydata(profile)
+        self._profile_fill.set_verts([np.column_stack((
+            np.concatenate((x, x[::-1])),
+            np.concatenate((profile, np.zeros_like(profile))),
+        ))])
+        _, cur_top = self._ax_profile.get_ylim()
+        if top > cur_top or top < 0.5 * cur_top:
+            self._ax_profile.set_ylim(0, top)
+            return True
+        return False
 
     def _display_preprocess(self, image: np.ndarray) -> np.ndarray:
         out = image
         if self._pre_enable_cb.isChecked():
             angle = float(self._pre_angle_sb.value())
-            if abs(angle) > 1e-9:
-                out = sp_rotate(out, angle, reshape=True, order=3, mode="nearest").astype(image.dtype)
-
             y0, y1 = int(self._pre_y0_sb.value()), int(self._pre_y1_sb.value())
             x0, x1 = int(self._pre_x0_sb.value()), int(self._pre_x1_sb.value())
+            if abs(angle) > 1e-9:
+                order = INTERP_ORDERS.get(self._pre_order_combo.currentText(), 3)
+                key = (tuple(image.shape[:2]), angle, (x0, x1, y0, y1), order)
+                if self._remap is None or self._remap.key != key:
+                    self._remap = _RotateCropMap(image.shape[:2], angle, (x0, x1, y0, y1), order)
+                return self._remap.apply(image)
+
             h, w = out.shape[:2]
             y0, y1 = max(0, min(y0, h - 1)), max(y0 + 1, min(y1, h))
             x0, x1 = max(0, min(x0, w - 1)), max(x0 + 1, min(x1, w))
             out = out[y0:y1, x0:x1]
         return out
 
+    @staticmethod
+    def _order_name(order: int) -> str:
+        for name, value in INTERP_ORDERS.items():
+            if value == order:
+                return name
+        return "Cubic"
+
     def _profile_axis_for_display(self) -> int:
         if not self._pre_enable_cb.isChecked():
             return 1
@@ -787,6 +1102,7 @@ class AndorLiveWindow(QWidget):
             "x1": int(self._pre_x1_sb.value()),
             "y0": int(self._pre_y0_sb.value()),
             "y1": int(self._pre_y1_sb.value()),
+            "order": INTERP_ORDERS[self._pre_order_combo.currentText()],
         }
         data["andor"] = andor
 
@@ -810,6 +1126,9 @@ class AndorLiveWindow(QWidget):
         self._pre_x1_sb.setValue(int(preprocess.get("x1", DEFAULT_PREPROCESS["x1"])))
         self._pre_y0_sb.setValue(int(preprocess.get("y0", DEFAULT_PREPROCESS["y0"])))
         self._pre_y1_sb.setValue(int(preprocess.get("y1", DEFAULT_PREPROCESS["y1"])))
+        self._pre_order_combo.setCurrentText(
+            self._order_name(int(preprocess.get("order", DEFAULT_PREPROCESS["order"])))
+        )
         self._log_message("Preprocess settings loaded.")
 
     def _reset_preprocess_to_default(self):
@@ -819,6 +1138,7 @@ class AndorLiveWindow(QWidget):
         self._pre_x1_sb.setValue(DEFAULT_PREPROCESS["x1"])
         self._pre_y0_sb.setValue(DEFAULT_PREPROCESS["y0"])
         self._pre_y1_sb.setValue(DEFAULT_PREPROCESS["y1"])
+        self._pre_order_combo.setCurrentText(self._order_name(DEFAULT_PREPROCESS["order"]))
         self._log_message("Preprocess reset to defaults.")
 
     # -------------------------------------------------------------------------
@@ -906,6 +1226,8 @@ class AndorLiveWindow(QWidget):
     # -------------------------------------------------------------------------
 
     def closeEvent(self, event):
+        if self._dark_thread:
+            self._dark_thread.wait()
         if self._capture_thread:
             self._stop_capture()
         if self._cam:
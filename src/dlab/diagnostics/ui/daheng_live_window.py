@@ -28,6 +28,12 @@ from dlab.hardware.wrappers.daheng_controller import (
     DEFAULT_EXPOSURE_US, MIN_EXPOSURE_US, MAX_EXPOSURE_US,
     DEFAULT_GAIN, MIN_GAIN, MAX_GAIN
 )
+from dlab.hardware.wrappers.acquisition_hub import AcquisitionHub, FrameReader
+from dlab.hardware.wrappers.dark_calibration import (
+    ActiveCalibration, DEFAULT_DARK_FRAMES, default_calibration_store, record_dark_calibration,
+)
+from dlab.hardware.wrappers.frame_accumulator import FrameAccumulator, reject_hot_pixels
+from dlab.diagnostics.ui.render_scheduler import BlitManager, RenderScheduler
 from dlab.core.device_registry import REGISTRY
 from dlab.utils.paths_utils import data_dir
 from dlab.utils.log_panel import LogPanel
@@ -36,6 +42,9 @@ from dlab.boot import ROOT
 
 PIXEL_SIZE_M = 3.45e-6
 MIN_INTERVAL_US = 500_000
+MIN_STREAM_INTERVAL_US = 40_000
+# Colorbar ticks are part of the cached background; refresh them this often.
+FULL_REDRAW_S = 1.0
 
 COLORMAPS = [
     "cmr.rainforest", "cmr.neutral", "cmr.sunburst",
@@ -55,11 +64,21 @@ def _resolve_cmap(key: str):
 
 
 class _LiveCaptureThread(QThread):
-    """Background thread for continuous image capture."""
+    """
+    Background thread for continuous image capture.
+
+    In stream mode the camera free-runs into its frame ring at the sensor
+    rate and the newest frame is shown every interval; otherwise each frame
+    is a single triggered capture.
+
+    Exposure and gain are only applied after they changed, and never while a
+    scan shares the camera stream; a change made meanwhile waits for the scan.
+    """
 
     image_signal = pyqtSignal(np.ndarray)
 
-    def __init__(self, cam: DahengController, exposure_us: int, gain: int, interval_us: int, cap_lock=None):
+    def __init__(self, cam: DahengController, exposure_us: int, gain: int, interval_us: int, cap_lock=None,
+                 stream: bool = False):
         super().__init__()
         self._cam = cam
         self._exposure_us = exposure_us
@@ -68,32 +87,100 @@ class _LiveCaptureThread(QThread):
         self._running = True
         self._lock = threading.Lock()
         self._cap_lock = cap_lock
+        self._stream = stream
+        self._settings_pending = True
 
     def update_parameters(self, exposure_us: int, gain: int, interval_us: int):
         with self._lock:
+            if (exposure_us, gain) != (self._exposure_us, self._gain):
+                self._settings_pending = True
             self._exposure_us = exposure_us
             self._gain = gain
             self._interval_s = interval_us / 1e6
 
+    def _apply_pending_settings(self, hub: AcquisitionHub, own: int):
+        """Set changed exposure and gain unless another consumer holds the stream."""
+        with self._lock:
+            if not self._settings_pending:
+                return
+            exp, g = self._exposure_us, self._gain
+
+        def apply():
+            self._cam.set_exposure(exp)
+            self._cam.set_gain(g)
+
+        if hub.run_exclusive(apply, own):
+            with self._lock:
+                if (self._exposure_us, self._gain) == (exp, g):
+                    self._settings_pending = False
+
     def stop(self):
         self._running = False
 
     def run(self):
+        if self._stream:
+            self._run_stream()
+            return
+        hub = AcquisitionHub.for_camera(self._cam)
         while self._running:
             try:
                 with self._lock:
-                    exp = self._exposure_us
-                    g = self._gain
                     wait_s = self._interval_s
 
                 lock = self._cap_lock or threading.Lock()
                 with lock:
-                    frame = self._cam.capture_single(exp, g)
+                    self._apply_pending_settings(hub, own=0)
+                    frame = self._cam.capture_single(self._cam.current_exposure, self._cam.current_gain)
                 self.image_signal.emit(frame)
                 time.sleep(wait_s)
             except Exception:
                 break
 
+    def _run_stream(self):
+        hub = AcquisitionHub.for_camera(self._cam)
+        try:
+            self._apply_pending_settings(hub, own=0)  # before the stream starts, if nobody holds it
+            reader = FrameReader(hub.acquire())
+        except Exception:
+            return
+        try:
+            while self._running:
+                with self._lock:
+                    wait_s = self._interval_s
+                self._apply_pending_settings(hub, own=1)
+                got = reader.latest(timeout=1.0, copy=True)
+                if got is not None:
+                    self.image_signal.emit(got[1])
+                time.sleep(wait_s)
+        except Exception:
+            pass
+        finally:
+            hub.release()
+
+
+class _DarkCalibrationThread(QThread):
+    """Records a dark calibration from the shared stream without blocking the GUI."""
+
+    done_signal = pyqtSignal(object)
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, cam: DahengController, camera: str, n_frames: int, exposure_us: int, gain: int):
+        super().__init__()
+        self._cam = cam
+        self._camera = camera
+        self._n_frames = n_frames
+        self._exposure_us = exposure_us
+        self._gain = gain
+
+    def run(self):
+        try:
+            cal = record_dark_calibration(self._cam, self._camera, self._n_frames, self._exposure_us, self._gain)
+            default_calibration_store().put(cal)
+        except Exception as e:
+            self.error_signal.emit(str(e))
+            return
+        self.done_signal.emit(cal)
+
 
 class DahengLiveWindow(QWidget):
     """Live view window for Daheng camera."""
@@ -116,6 +203,10 @@ class DahengLiveWindow(QWidget):
         self._capture_thread: _LiveCaptureThread | None = None
         self._capture_lock = threading.Lock()
         self._live_running = False
+        self._scan_acc = FrameAccumulator()
+        self._scan_scratch: np.ndarray | None = None
+        self._dark = ActiveCalibration(default_calibration_store(), self._scan_camera_name)
+        self._dark_thread: _DarkCalibrationThread | None = None
 
         self._last_frame: np.ndarray | None = None
         self._frame_lock = threading.Lock()
@@ -151,7 +242,12 @@ class DahengLiveWindow(QWidget):
         self._mpl_cid_motion = None
 
         self._init_ui()
-        self.gui_update_image.connect(self._update_image, Qt.QueuedConnection)
+        self._refresh_dark_status()
+        self._render = RenderScheduler(self._update_image, parent=self)
+        self._render.stats_signal.connect(self._update_rate_label)
+        self._blit = BlitManager(self._canvas, self._animated_artists)
+        self._last_full_draw = 0.0
+        self.gui_update_image.connect(self._render.submit, Qt.DirectConnection)
         self.gui_log.connect(self._log_message, Qt.QueuedConnection)
 
     def _init_ui(self):
@@ -186,6 +282,21 @@ class DahengLiveWindow(QWidget):
         int_layout.addWidget(self._interval_edit)
         param_layout.addLayout(int_layout)
 
+        # Persistent stream
+        self._stream_cb = QCheckBox("Stream (free-run)")
+        self._stream_cb.setChecked(True)
+        self._stream_cb.setToolTip("Keep the stream open and show the newest frame; otherwise trigger each frame.")
+        self._stream_cb.toggled.connect(self._on_params_changed)
+        param_layout.addWidget(self._stream_cb)
+
+        # Acquisition vs display rate
+        rate_layout = QHBoxLayout()
+        rate_layout.addWidget(QLabel("Rate:"))
+        self._rate_label = QLabel("acq 0.0 fps | shown 0.0 fps (0 dropped)")
+        rate_layout.addWidget(self._rate_label)
+        rate_layout.addStretch()
+        param_layout.addLayout(rate_layout)
+
         # Gain
         gain_layout = QHBoxLayout()
         gain_layout.addWidget(QLabel("Gain:"))
@@ -276,6 +387,30 @@ class DahengLiveWindow(QWidget):
         roi_layout.addLayout(roi_row3)
         param_layout.addWidget(roi_group)
 
+        # Dark calibration
+        dark_grp = QGroupBox("Dark Calibration")
+        dark_layout = QVBoxLayout(dark_grp)
+        dark_row = QHBoxLayout()
+        dark_row.addWidget(QLabel("Frames:"))
+        self._dark_frames_spin = QSpinBox()
+        self._dark_frames_spin.setRange(2, 1000)
+        self._dark_frames_spin.setValue(DEFAULT_DARK_FRAMES)
+        dark_row.addWidget(self._dark_frames_spin)
+        self._dark_btn = QPushButton("Record Dark")
+        self._dark_btn.clicked.connect(self._record_dark)
+        dark_row.addWidget(self._dark_btn)
+        dark_layout.addLayout(dark_row)
+        self._dark_apply_cb = QCheckBox("Apply to scans")
+        self._dark_apply_cb.setChecked(True)
+        self._dark_apply_cb.setToolTip(
+            "Subtract the master dark and repair defect pixels of the current exposure and gain; "
+            "replaces the per-frame hot-pixel cleanup and background frames."
+        )
+        dark_layout.addWidget(self._dark_apply_cb)
+        self._dark_label = QLabel("-")
+        dark_layout.addWidget(self._dark_label)
+        param_layout.addWidget(dark_grp)
+
         # Crosshair controls
         ch_grp = QGroupBox("Crosshairs")
         ch_layout = QVBoxLayout(ch_grp)
@@ -449,9 +584,12 @@ class DahengLiveWindow(QWidget):
             return
 
         self._capture_thread = _LiveCaptureThread(
-            self._cam, exp_us, gain, interval_us, cap_lock=self._capture_lock
+            self._cam, exp_us, gain, interval_us, cap_lock=self._capture_lock,
+            stream=self._stream_cb.isChecked(),
         )
-        self._capture_thread.image_signal.connect(self._update_image)
+        self._stream_cb.setEnabled(False)
+        self._render.reset()
+        self._capture_thread.image_signal.connect(self._render.submit, Qt.DirectConnection)
         self._capture_thread.start()
         self._live_running = True
 
@@ -465,13 +603,15 @@ class DahengLiveWindow(QWidget):
             self._capture_thread.wait()
             self._capture_thread = None
             self._live_running = False
+        self._stream_cb.setEnabled(True)
 
         self._log_message("Live capture stopped.")
         self._start_btn.setEnabled(True)
         self._stop_btn.setEnabled(False)
 
     def _update_interval_field(self, exp_us: int) -> int:
-        interval_us = exp_us if exp_us >= MIN_INTERVAL_US else MIN_INTERVAL_US
+        min_us = MIN_STREAM_INTERVAL_US if self._stream_cb.isChecked() else MIN_INTERVAL_US
+        interval_us = exp_us if exp_us >= min_us else min_us
         self._interval_edit.setText(str(interval_us))
         return interval_us
 
@@ -487,6 +627,7 @@ class DahengLiveWindow(QWidget):
                 self._cam.set_gain(gain)
         except ValueError:
             pass
+        self._refresh_dark_status()
 
     # -------------------------------------------------------------------------
     # Image display
@@ -528,7 +669,9 @@ class DahengLiveWindow(QWidget):
         else:
             extent = extent_mm
 
-        if self._image_artist is None:
+        recreate = self._image_artist is None
+        full = recreate
+        if recreate:
             self._ax.clear()
             self._image_artist = self._ax.imshow(
                 disp, cmap=self._cmap, vmin=vmin, vmax=vmax,
@@ -545,22 +688,36 @@ class DahengLiveWindow(QWidget):
                 self._image_artist.set_clim(vmin, self._fixed_vmax)
             else:
                 self._image_artist.set_clim(vmin, vmax)
-            self._image_artist.set_extent(extent)
-            self._image_artist.set_cmap(self._cmap)
+            if list(self._image_artist.get_extent()) != list(extent):
+                self._image_artist.set_extent(extent)
+                full = True
+
+        # Colorbar ticks are part of the cached background; refresh them at
+        # most once per FULL_REDRAW_S instead of on every frame.
+        now = time.monotonic()
+        if not recreate and (full or now - self._last_full_draw >= FULL_REDRAW_S):
             if self._cbar:
                 self._cbar.update_normal(self._image_artist)
+            full = True
 
-        # Draw ROI overlay if not previewing crop
-        if not (self._preview_roi_cb.isChecked() and self._use_roi_cb.isChecked()):
-            self._draw_roi_overlay()
+        if recreate:
+            # Draw ROI overlay if not previewing crop
+            if not (self._preview_roi_cb.isChecked() and self._use_roi_cb.isChecked()):
+                self._draw_roi_overlay()
+            if self._crosshair_visible:
+                self._refresh_crosshair()
+            if self._crosshair2_visible:
+                self._refresh_crosshair2()
 
-        # Refresh crosshairs
-        if self._crosshair_visible:
-            self._refresh_crosshair()
-        if self._crosshair2_visible:
-            self._refresh_crosshair2()
+        if full:
+            self._last_full_draw = now
+        self._blit.update(full=full)
 
-        self._canvas.draw_idle()
+    def _animated_artists(self) -> list:
+        return [self._image_artist, self._roi_artist, self._ch_h, self._ch_v, self._ch2_h, self._ch2_v]
+
+    def _update_rate_label(self, arrival_fps: float, display_fps: float, dropped: int):
+        self._rate_label.setText(f"acq {arrival_fps:.1f} fps | shown {display_fps:.1f} fps ({dropped} dropped)")
 
     # -------------------------------------------------------------------------
     # Colorbar controls
@@ -1016,6 +1173,85 @@ class DahengLiveWindow(QWidget):
             except Exception as e:
                 self._log_message(f"Error writing log: {e}")
 
+    # -------------------------------------------------------------------------
+    # Dark calibration
+    # -------------------------------------------------------------------------
+
+    @property
+    def _scan_camera_name(self) -> str:
+        return f"DahengCam_{self._fixed_index}"
+
+    def _refresh_dark_status(self):
+        try:
+            exp_us = int(self._exposure_edit.text())
+            gain = int(self._gain_edit.text())
+        except ValueError:
+            self._dark_label.setText("-")
+            return
+        cal = self._dark.get(exp_us, gain)
+        if cal is None:
+            self._dark_label.setText(f"None at {exp_us} µs, gain {gain}")
+        else:
+            self._dark_label.setText(f"{cal.frames} frames, {cal.n_defects} defects ({cal.created})")
+
+    def _record_dark(self):
+        if self._cam is None:
+            QMessageBox.critical(self, "Error", "Camera not activated.")
+            return
+        if self._dark_thread is not None:
+            return
+        try:
+            exp_us = int(self._exposure_edit.text())
+            gain = int(self._gain_edit.text())
+        except ValueError:
+            QMessageBox.critical(self, "Error", "Invalid parameter values.")
+            return
+        n = int(self._dark_frames_spin.value())
+        reply = QMessageBox.question(
+            self, "Dark Calibration",
+            f"Block the beam, then record {n} dark frames at {exp_us} µs, gain {gain}?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes,
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        with self._capture_lock:
+            self._cam.set_exposure(exp_us)
+            self._cam.set_gain(gain)
+        self._dark_thread = _DarkCalibrationThread(self._cam, self._scan_camera_name, n, exp_us, gain)
+        self._dark_thread.done_signal.connect(self._on_dark_done)
+        self._dark_thread.error_signal.connect(self._on_dark_error)
+        self._dark_thread.finished.connect(self._on_dark_finished)
+        self._dark_btn.setEnabled(False)
+        self._exposure_edit.setEnabled(False)
+        self._gain_edit.setEnabled(False)
+        self._dark_label.setText(f"Recording {n} frames…")
+        self._log_message(f"Recording dark calibration: {n} frames at {exp_us} µs, gain {gain}.")
+        self._dark_thread.start()
+
+    def _on_dark_done(self, cal):
+        self._log_message(
+            f"Dark calibration stored: {cal.frames} frames, {cal.n_defects} defect pixels."
+        )
+
+    def _on_dark_error(self, message: str):
+        QMessageBox.critical(self, "Error", f"Dark calibration failed: {message}")
+        self._log_message(f"Dark calibration error: {message}")
+
+    def _on_dark_finished(self):
+        self._dark_thread = None
+        self._dark_btn.setEnabled(True)
+        self._exposure_edit.setEnabled(True)
+        self._gain_edit.setEnabled(True)
+        self._refresh_dark_status()
+
+    def dark_calibration(self):
+        """Stored dark calibration for the current exposure and gain, or None."""
+        try:
+            return self._dark.get(int(self._exposure_edit.text()), int(self._gain_edit.text()))
+        except ValueError:
+            return None
+
     # -------------------------------------------------------------------------
     # External API for scans
     # -------------------------------------------------------------------------
@@ -1028,18 +1264,16 @@ class DahengLiveWindow(QWidget):
         background: bool = False,
         *,
         force_roi: bool = False,
+        noise: bool = False,
     ):
-        """Grab frame(s) for use in scanning routines."""
+        """
+        Grab frame(s) for use in scanning routines. With ``noise`` the
+        per-pixel standard deviation over the averaged frames is returned in
+        ``meta["PixelStd"]`` and its mean in ``meta["PixelNoise"]``.
+        """
         if not self._cam:
             raise DahengControllerError("Camera not activated.")
 
-        was_live = bool(self._live_running)
-        if was_live:
-            try:
-                self._stop_capture()
-            except Exception:
-                pass
-
         try:
             exp_us = int(self._exposure_edit.text())
         except ValueError:
@@ -1050,44 +1284,76 @@ class DahengLiveWindow(QWidget):
         except ValueError:
             device_gain = DEFAULT_GAIN
 
-        def _cap_once(cur_exp_us):
-            self._cam.set_exposure(cur_exp_us)
-            self._cam.set_gain(device_gain)
-            return self._cam.capture_single(cur_exp_us, device_gain)
-
-        n = max(1, int(averages))
-        acc = None
-
-        for _ in range(n):
-            f = np.asarray(_cap_once(exp_us), dtype=np.float32)
-            if (force_roi or self._use_roi_cb.isChecked()) and self._roi_px is not None:
-                x0, y0, x1, y1 = self._roi_px
-                h0, w0 = f.shape
-                x0 = max(0, min(w0 - 1, x0))
-                x1 = max(1, min(w0, x1))
-                y0 = max(0, min(h0 - 1, y0))
-                y1 = max(1, min(h0, y1))
-                f = f[y0:y1, x0:x1]
-            acc = f if acc is None else (acc + f)
-
-        avg = acc / n
-
-        if dead_pixel_cleanup:
-            avg[avg >= 65535.0] = 0.0
-            avg[avg < 0.0] = 0.0
-            p9999 = np.percentile(avg, 99.99)
-            if p9999 > 65535.0:
-                avg[avg > p9999] = 0.0
+        # Read from the shared stream: live view keeps running during the scan
+        # and consecutive scan points reuse the stream instead of restarting it.
+        # Register before changing settings so live view cannot set them back.
+        hub = AcquisitionHub.for_camera(self._cam)
+        with self._capture_lock:
+            ring = hub.acquire()
+            try:
+                self._cam.set_exposure(exp_us)
+                self._cam.set_gain(device_gain)
+            except Exception:
+                hub.release()
+                raise
+        try:
+            reader = FrameReader(ring)
+            reader.skip(1)  # the frame in flight may predate the settings
+            timeout_s = 2.0 + exp_us / 1e6
+
+            n = max(1, int(averages))
+            acc = self._scan_acc
+            acc.reset(track_variance=noise and n > 1)
+            full_shape = crop = None
+            while acc.count < n:
+                got = reader.next(timeout=timeout_s)
+                if got is None:
+                    raise DahengControllerError("Timed out waiting for a streamed frame")
+                seq, view, _ = got
+                full_shape = view.shape
+                if (force_roi or self._use_roi_cb.isChecked()) and self._roi_px is not None:
+                    x0, y0, x1, y1 = self._roi_px
+                    h0, w0 = view.shape
+                    x0 = max(0, min(w0 - 1, x0))
+                    x1 = max(1, min(w0, x1))
+                    y0 = max(0, min(h0 - 1, y0))
+                    y1 = max(1, min(h0, y1))
+                    crop = (x0, y0, x1, y1)
+                    view = view[y0:y1, x0:x1]
+                # Copy the (ROI of the) frame out in its native dtype before
+                # accumulating, so a frame overwritten meanwhile is dropped whole.
+                if self._scan_scratch is None or self._scan_scratch.shape != view.shape:
+                    self._scan_scratch = np.empty(view.shape, dtype=view.dtype)
+                np.copyto(self._scan_scratch, view)
+                if not ring.is_valid(seq):
+                    continue
+                if acc.shape != view.shape:
+                    acc.reset(view.shape)
+                acc.add(self._scan_scratch)
+        finally:
+            hub.release()
+
+        avg = acc.mean()
+        cal = self._dark.get(exp_us, device_gain) if self._dark_apply_cb.isChecked() else None
+        if cal is not None and cal.dark.shape != full_shape:
+            self.gui_log.emit(f"Dark calibration {cal.dark.shape} does not match frame {full_shape}; ignored.")
+            cal = None
+        if cal is not None:
+            # Master dark and defect map replace the per-frame hot-pixel cleanup.
+            cal.cropped(crop).apply(avg, out=avg)
+        elif dead_pixel_cleanup:
+            reject_hot_pixels(avg)
 
         frame_u8 = np.clip(avg, 0, 255).astype(np.uint8)
         self.gui_update_image.emit(frame_u8)
 
         meta = {
-            "CameraName": f"DahengCam_{self._fixed_index}",
+            "CameraName": self._scan_camera_name,
             "CameraIndex": self._fixed_index,
             "Exposure_us": exp_us,
             "Gain": device_gain,
             "Background": "1" if background else "0",
+            "DarkCorrected": "1" if cal is not None else "0",
             "ROI_px": (
                 ""
                 if self._roi_px is None
@@ -1099,6 +1365,10 @@ class DahengLiveWindow(QWidget):
                 else "0"
             ),
         }
+        if noise:
+            std = acc.std() if acc.track_variance else np.zeros_like(avg)
+            meta["PixelStd"] = std
+            meta["PixelNoise"] = float(std.mean())
         return frame_u8, meta
 
     # -------------------------------------------------------------------------
@@ -1106,6 +1376,8 @@ class DahengLiveWindow(QWidget):
     # -------------------------------------------------------------------------
 
     def closeEvent(self, event):
+        if self._dark_thread:
+            self._dark_thread.wait()
         if self._capture_thread:
             self._stop_capture()
         if self._cam:
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+_log = logging.getLogger(__name__)
+
+DEFAULT_MAX_FPS = 20.0
+RATE_WINDOW_S = 2.0
+STATS_INTERVAL_S = 0.5
+
+
+class RenderScheduler(QObject):
+    """
+    Latest-frame-wins scheduling of a live view's redraws.
+
+    :meth:`submit` may be called from any thread and only stores the frame;
+    a timer on the GUI thread renders the newest one at most ``max_fps``
+    times a second. A frame replaced before it was shown counts as dropped
+    for display, which says nothing about the acquisition itself.
+    ``stats_signal`` reports (arrival fps, display fps, dropped frames).
+    """
+
+    stats_signal = pyqtSignal(float, float, int)
+
+    def __init__(self, render: Callable[[np.ndarray], None], max_fps: float = DEFAULT_MAX_FPS,
+                 parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self._render = render
+        self._lock = threading.Lock()
+        self._pending: Optional[np.ndarray] = None
+        self._arrivals: deque = deque()
+        self._renders: deque = deque()
+        self._last_stats = 0.0
+        self.received = 0
+        self.rendered = 0
+        self.dropped = 0
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._tick)
+        self.set_max_fps(max_fps)
+        self._timer.start()
+
+    def set_max_fps(self, max_fps: float) -> None:
+        self._timer.setInterval(max(1, int(round(1000.0 / max(0.1, float(max_fps))))))
+
+    def submit(self, frame: np.ndarray) -> None:
+        """Offer a new frame; replaces any frame still waiting to be shown."""
+        now = time.monotonic()
+        with self._lock:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = frame
+            self.received += 1
+            self._arrivals.append(now)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._pending = None
+            self._arrivals.clear()
+            self._renders.clear()
+            self.received = self.rendered = self.dropped = 0
+
+    def rates(self) -> tuple[float, float]:
+        """(arrival fps, display fps) over the last few seconds."""
+        now = time.monotonic()
+        with self._lock:
+            return self._rate(self._arrivals, now), self._rate(self._renders, now)
+
+    @staticmethod
+    def _rate(times: deque, now: float) -> float:
+        while times and now - times[0] > RATE_WINDOW_S:
+            times.popleft()
+        if len(times) < 2:
+            return 0.0
+        return (len(times) - 1) / max(1e-9, times[-1] - times[0])
+
+    def _tick(self) -> None:
+        with self._lock:
+            frame, self._pending = self._pending, None
+        if frame is not None:
+            try:
+                self._render(frame)
+            except Exception as e:
+                _log.error("Live view render failed: %s", e)
+            now = time.monotonic()
+            with self._lock:
+                self.rendered += 1
+                self._renders.append(now)
+
+        now = time.monotonic()
+        if now - self._last_stats >= STATS_INTERVAL_S:
+            self._last_stats = now
+            acq_fps, disp_fps = self.rates()
+            self.stats_signal.emit(acq_fps, disp_fps, int(self.dropped))
+
+
+class BlitManager:
+    """
+    Redraws a live view's changing artists over a cached background.
+
+    ``artists`` returns the artists that change every frame (image, overlay
+    lines, ...). They are marked animated, so full draws leave them out of
+    the cached background and :meth:`update` only restores the background,
+    draws them and blits. Whenever the set of artists changes, or anything
+    else on the figure does (limits, colorbar, labels), ask for a full draw.
+    """
+
+    def __init__(self, canvas, artists: Callable[[], Iterable]) -> None:
+        self._canvas = canvas
+        self._artists_fn = artists
+        self._animated: list = []
+        self._bg = None
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _current(self) -> list:
+        return [a for a in self._artists_fn() if a is not None]
+
+    def _on_draw(self, event) -> None:
+        self._bg = self._canvas.copy_from_bbox(self._canvas.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self) -> None:
+        fig = self._canvas.figure
+        for a in self._animated:
+            if a.get_visible() and a.figure is fig:
+                fig.draw_artist(a)
+
+    def update(self, full: bool = False) -> bool:
+        """Blit the artists; falls back to a full draw when needed. True if blitted."""
+        artists = self._current()
+        same = len(artists) == len(self._animated) and all(a is b for a, b in zip(artists, self._animated))
+        if full or not same or self._bg is None:
+            for a in artists:
+                a.set_animated(True)
+            self._animated = artists
+            self._bg = None
+            self._canvas.draw_idle()
+            return False
+        self._canvas.restore_region(self._bg)
+        self._draw_artists()
+        self._canvas.blit(self._canvas.figure.bbox)
+        return True
@@ -92,6 +92,8 @@ class GCWorker(QObject):
         self.do_background = bool(do_background)
         self.existing_scan_log = existing_scan_log
         self.abort = False
+        # True when every scan frame was corrected with a stored dark calibration.
+        self.dark_corrected: bool | None = None
         self._best_sum = float("-inf")
         self._best_pos = None
 
@@ -195,6 +197,8 @@ class GCWorker(QObject):
                 self.progress.emit(done, total)
                 continue
 
+            corrected = str((meta or {}).get("DarkCorrected", "0")) == "1"
+            self.dark_corrected = corrected if self.dark_corrected is None else (self.dark_corrected and corrected)
             cam_name = str((meta or {}).get("CameraName", "AndorCam")).strip() or "AndorCam"
             exp_meta = int((meta or {}).get("Exposure_us", self.exposure_us))
             ts_ms = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
@@ -623,8 +627,12 @@ class GCScanTab(QWidget):
             self._log_message("Scan finished with errors or aborted.")
             self._last_scan_log_path = None
 
-        # Optional background capture after scan
-        if self._bg_checkbox.isChecked() and self._last_scan_log_path:
+        # Optional background capture after scan; not needed when the frames
+        # were already corrected with the camera's stored dark calibration.
+        if self._bg_checkbox.isChecked() and self._last_scan_log_path and self._worker \
+                and self._worker.dark_corrected:
+            self._log_message("Frames were dark-corrected from the calibration library; background skipped.")
+        elif self._bg_checkbox.isChecked() and self._last_scan_log_path:
             reply = QMessageBox.information(
                 self,
                 "Background",
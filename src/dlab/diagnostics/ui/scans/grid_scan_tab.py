@@ -28,6 +28,7 @@ from PyQt5.QtWidgets import (
 
 from dlab.core.device_registry import REGISTRY
 from dlab.hardware.wrappers.phase_settings import PhaseSettings
+from dlab.hardware.wrappers.slm_frame_bank import SlmFrameBank, default_bank_path
 from dlab.utils.log_panel import LogPanel
 from dlab.utils.paths_utils import data_dir, cfg_get
 
@@ -185,6 +186,7 @@ class GridScanWorker(QObject):
         background: bool = False,
         existing_scan_log: str | None = None,
         axes_meta: dict | None = None,
+        slm_frame_bank: SlmFrameBank | None = None,
         parent: QObject | None = None,
     ) -> None:
         super().__init__(parent)
@@ -200,6 +202,10 @@ class GridScanWorker(QObject):
         self.axes_meta = axes_meta or {}
         self.data_root = data_dir()
         self.timestamp = datetime.datetime.now()
+        self.slm_frame_bank = slm_frame_bank
+        self._slm_axis_pos = [k for k, (ax, _) in enumerate(self.axes) if ax.startswith("slm:")]
+        self._last_slm_idxs: list[int] | None = None
+        self._last_slm_frame: np.ndarray | None = None
 
     def _emit(self, msg: str) -> None:
         self.log.emit(msg)
@@ -475,8 +481,39 @@ class GridScanWorker(QObject):
             raise RuntimeError("Red SLM is not active.")
 
         screen_num = self.axes_meta[ax].get("screen", 3)
-        slm_red.publish(levels, screen_num=screen_num)
-        self._emit(f"SLM {class_name}:{field_name} = {pos}")
+        latency_ms = slm_red.publish(levels, screen_num=screen_num)
+        self._emit(f"SLM {class_name}:{field_name} = {pos} (publish {latency_ms:.1f} ms)")
+
+    def _push_slm_frame(self, idxs: list[int]) -> None:
+        """Push the pre-rendered SLM frame for the current grid point."""
+        slm_idxs = [idxs[k] for k in self._slm_axis_pos]
+        if slm_idxs == self._last_slm_idxs:
+            return
+
+        slm_red = REGISTRY.get("slm:red:controller")
+        if slm_red is None:
+            raise RuntimeError("Red SLM is not active.")
+
+        first_ax = self.axes[self._slm_axis_pos[0]][0]
+        screen_num = self.axes_meta[first_ax].get("screen", 3)
+        frame = self.slm_frame_bank.frame(slm_idxs)
+        latency_ms = slm_red.open_session(screen_num).push(frame)
+        self._last_slm_idxs = slm_idxs
+        self._last_slm_frame = frame
+
+        desc = ", ".join(
+            f"{self.axes[k][0].split(':', 1)[1]} = {self.axes[k][1][idxs[k]]}" for k in self._slm_axis_pos
+        )
+        self._emit(f"SLM {desc} (publish {latency_ms:.1f} ms)")
+
+    def _release_slm_frames(self) -> None:
+        """Leave the controller with a private copy of the last pushed frame."""
+        if self._last_slm_frame is None:
+            return
+        slm_red = REGISTRY.get("slm:red:controller")
+        if slm_red is not None:
+            slm_red.phase = np.array(self._last_slm_frame)
+        self._last_slm_frame = None
 
     def _prepare_move_targets(self, ui_combo: list[tuple[str, float]]) -> tuple[list, list]:
         """Prepare move targets and log entries for a grid point."""
@@ -579,6 +616,12 @@ class GridScanWorker(QObject):
         )
 
     def run(self) -> None:
+        try:
+            self._run()
+        finally:
+            self._release_slm_frames()
+
+    def _run(self) -> None:
         try:
             stages = self._initialize_stages()
             detectors = self._initialize_detectors()
@@ -617,7 +660,8 @@ class GridScanWorker(QObject):
                 for ax, move_val in move_targets:
                     try:
                         if ax.startswith("slm:"):
-                            self._move_slm_axis(ax, move_val)
+                            if self.slm_frame_bank is None:
+                                self._move_slm_axis(ax, move_val)
                         else:
                             stages[ax].move_to(float(move_val), blocking=True)
                     except Exception as e:
@@ -625,6 +669,13 @@ class GridScanWorker(QObject):
                         move_ok = False
                         break
 
+                if move_ok and self.slm_frame_bank is not None and self._slm_axis_pos:
+                    try:
+                        self._push_slm_frame(idxs)
+                    except Exception as e:
+                        self._emit(f"SLM frame push failed: {e}")
+                        move_ok = False
+
                 if not move_ok:
                     continue
 
@@ -705,6 +756,7 @@ class GridScanTab(QWidget):
         self._doing_background = False
         self._cached_params: dict | None = None
         self._last_scan_log_path: str | None = None
+        self._slm_bank: SlmFrameBank | None = None
 
         self._init_ui()
         self._refresh_devices()
@@ -1170,12 +1222,45 @@ class GridScanTab(QWidget):
             QMessageBox.critical(self, "Invalid parameters", str(e))
             return
 
+        self._release_slm_bank()
+        try:
+            self._slm_bank = self._prerender_slm_frames(p)
+        except Exception as e:
+            QMessageBox.critical(self, "SLM pre-render failed", str(e))
+            return
+
         self._cached_params = p
         self._doing_background = False
         self._last_scan_log_path = None
         self._launch(background=False, existing=None)
         self._log_message("Scan started…")
 
+    def _prerender_slm_frames(self, p: dict) -> SlmFrameBank | None:
+        """Render every SLM axis position into a frame bank before the scan starts."""
+        axes = []
+        for ax, positions in p["axes"]:
+            if not ax.startswith("slm:"):
+                continue
+            parts = ax.split(":")
+            if len(parts) != 3:
+                raise ValueError(f"Invalid SLM axis format '{ax}'. Expected slm:ClassName:FieldName")
+            axes.append((parts[1], parts[2], positions))
+        if not axes:
+            return None
+
+        slm_window = REGISTRY.get("slm:red:window")
+        if slm_window is None:
+            raise RuntimeError("SLM window not registered.")
+
+        path = default_bank_path(f"{p['scan_name']}_{datetime.datetime.now():%Y%m%d_%H%M%S}")
+        self._log_message("Pre-rendering SLM frames…")
+        return slm_window.render_frame_bank(axes, path)
+
+    def _release_slm_bank(self) -> None:
+        if self._slm_bank is not None:
+            self._slm_bank.close(delete=True)
+            self._slm_bank = None
+
     def _launch(self, background: bool, existing: str | None) -> None:
         p = self._cached_params
         if not p:
@@ -1192,6 +1277,7 @@ class GridScanTab(QWidget):
             background=background,
             existing_scan_log=existing,
             axes_meta=p.get("axes_meta", {}),
+            slm_frame_bank=self._slm_bank,
         )
 
         self._worker.moveToThread(self._thread)
@@ -1254,7 +1340,28 @@ class GridScanTab(QWidget):
             if reply == QMessageBox.Yes:
                 self._doing_background = True
                 self._log_message("Launching background scan…")
+                # The background scan replays the same SLM frames; keep the bank.
                 self._launch(background=True, existing=self._last_scan_log_path)
                 return
 
-        self._doing_background = False
\ No newline at end of file
+        self._doing_background = False
+        self._release_slm_bank()
+
+    # -------------------------------------------------------------------------
+    # Cleanup
+    # -------------------------------------------------------------------------
+
+    def closeEvent(self, event) -> None:
+        if self._worker:
+            self._worker.abort = True
+            try:
+                self._worker.finished.disconnect(self._on_finished)
+            except TypeError:
+                pass
+        if self._thread and self._thread.isRunning():
+            self._thread.quit()
+            self._thread.wait()
+        self._thread = None
+        self._worker = None
+        self._release_slm_bank()
+        super().closeEvent(event)
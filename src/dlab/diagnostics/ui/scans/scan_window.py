@@ -45,6 +45,9 @@ class ScanWindow(QMainWindow):
     # -------------------------------------------------------------------------
 
     def closeEvent(self, event) -> None:
+        # Tabs do not get a close event of their own; let them stop scans and free resources.
+        for i in range(self._tabs.count()):
+            self._tabs.widget(i).close()
         self.closed.emit()
         super().closeEvent(event)
 
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import os
 import json
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
 from PyQt5 import QtWidgets, QtCore
-from PyQt5.QtCore import pyqtSignal, Qt
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot, Qt
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 
@@ -14,9 +16,14 @@ from dlab.boot import ROOT, get_config
 from dlab.utils.log_panel import LogPanel
 from dlab.utils.yaml_utils import read_yaml, write_yaml
 from dlab.utils.paths_utils import ressources_dir
+from dlab.utils.config_utils import cfg_get
 
 from dlab.hardware.wrappers.phase_settings import PhaseSettings
-from dlab.hardware.wrappers.slm_controller import SLMController
+from dlab.hardware.wrappers.slm_controller import SLMController, LEVEL_DTYPE, publish_parallel
+from dlab.hardware.wrappers.slm_frame_bank import SlmFrameBank
+from dlab.hardware.wrappers.slm_pattern_cache import default_pattern_cache
+from dlab.hardware.wrappers.slm_geometry import get_geometry
+from dlab.hardware.wrappers.phase_layers import RENDER_VERSION, prerender, render_sum
 from dlab.core.device_registry import REGISTRY
 
 
@@ -29,6 +36,25 @@ def _slm_path(key: str) -> Path:
     return (ROOT / rel).resolve()
 
 
+class _PreviewWorker(QObject):
+    """Turns composed SLM levels into decimated preview images off the GUI thread."""
+
+    ready = pyqtSignal(str, int, object)
+
+    def __init__(self, step: int, parent=None):
+        super().__init__(parent)
+        self.step = max(1, int(step))
+        self.latest: dict[str, int] = {}
+
+    @pyqtSlot(str, int, object, int)
+    def render(self, color: str, seq: int, levels: np.ndarray, bit_depth: int):
+        if self.latest.get(color) != seq:
+            return  # superseded by a newer preview request
+        img = levels[:: self.step, :: self.step].astype(np.float32)
+        img *= np.float32(2.0 * np.pi / bit_depth)
+        self.ready.emit(color, seq, img)
+
+
 class SlmWindow(QtWidgets.QMainWindow):
     """
     Control window for red and green SLM devices.
@@ -36,6 +62,7 @@ class SlmWindow(QtWidgets.QMainWindow):
     Provides phase preview, publishing to screens, and settings management.
     """
     closed = pyqtSignal()
+    _preview_requested = pyqtSignal(str, int, object, int)
 
     def __init__(self, log_panel: LogPanel | None = None):
         super().__init__()
@@ -51,6 +78,18 @@ class SlmWindow(QtWidgets.QMainWindow):
 
         self._slm_red_status = "closed"
         self._slm_green_status = "closed"
+        self._pattern_cache = default_pattern_cache()
+
+        # Preview images are decimated and converted on a worker thread and
+        # swapped in when ready, so publishing never waits on matplotlib.
+        self._preview_step = max(1, int(cfg_get("slm.preview_decimation", 4)))
+        self._preview_seq = 0
+        self._preview_worker = _PreviewWorker(self._preview_step)
+        self._preview_thread = QThread(self)
+        self._preview_worker.moveToThread(self._preview_thread)
+        self._preview_requested.connect(self._preview_worker.render)
+        self._preview_worker.ready.connect(self._on_preview_ready)
+        self._preview_thread.start()
 
         self._init_ui()
 
@@ -76,6 +115,11 @@ class SlmWindow(QtWidgets.QMainWindow):
         self._slm_tabs.addTab(self._create_slm_panel("green"), "Green SLM")
 
         main_layout.addWidget(self._slm_tabs)
+
+        btn_publish_both = QtWidgets.QPushButton("Publish both SLMs")
+        btn_publish_both.clicked.connect(self.publish_both)
+        main_layout.addWidget(btn_publish_both)
+
         status_bar = self.statusBar()
         if status_bar:
             status_bar.showMessage("Red SLM: closed | Green SLM: closed")
@@ -87,6 +131,20 @@ class SlmWindow(QtWidgets.QMainWindow):
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
 
+        tools_menu = menubar.addMenu("&Tools")
+        optimise_action = QtWidgets.QAction("Wavefront optimisation...", self)
+        optimise_action.triggered.connect(self._open_wavefront_optimizer)
+        tools_menu.addAction(optimise_action)
+
+    def _open_wavefront_optimizer(self):
+        from dlab.diagnostics.ui.wavefront_optimizer_window import WavefrontOptimizerWindow
+
+        if getattr(self, "_wavefront_win", None) is None:
+            self._wavefront_win = WavefrontOptimizerWindow(self)
+            self._wavefront_win.destroyed.connect(lambda: setattr(self, "_wavefront_win", None))
+        self._wavefront_win.show()
+        self._wavefront_win.raise_()
+
     def _create_slm_panel(self, color: str):
         panel = QtWidgets.QGroupBox(f"{color.capitalize()} SLM Interface")
         layout = QtWidgets.QVBoxLayout(panel)
@@ -130,8 +188,13 @@ class SlmWindow(QtWidgets.QMainWindow):
         slm = getattr(self, f"_slm_{color}")
         h, w = slm.slm_size
         extent = (-w / 2, w / 2, -h / 2, h / 2)
+        step = self._preview_step
         phase_image = ax.imshow(
-            np.zeros(slm.slm_size), cmap="hsv", vmin=0, vmax=2 * np.pi, extent=extent
+            np.zeros((-(-h // step), -(-w // step)), dtype=np.float32),
+            cmap="hsv",
+            vmin=0,
+            vmax=2 * np.pi,
+            extent=extent,
         )
         cbar = fig.colorbar(phase_image, ax=ax, orientation="horizontal", fraction=0.07, pad=0.03)
         cbar.set_ticks([0, np.pi, 2 * np.pi])
@@ -236,21 +299,105 @@ class SlmWindow(QtWidgets.QMainWindow):
         active = REGISTRY.get("slm:red:active_classes") or []
         widgets = REGISTRY.get("slm:red:widgets") or []
 
-        composed = np.zeros(slm.slm_size, dtype=np.uint16)
+        total = np.zeros(slm.slm_size, dtype=LEVEL_DTYPE)
         for w in widgets:
             try:
                 if w.name_() not in active:
                     continue
-                lv = w.phase()
+                total += w.levels()
             except Exception:
                 continue
-            composed = (composed + lv) % (slm.bit_depth + 1)
 
-        return composed
+        return self._wrap_levels(total, slm.bit_depth)
+
+    def render_frame_bank(self, axes: list[tuple[str, str, list[float]]], path: Path) -> SlmFrameBank:
+        """
+        Pre-render red SLM frames for every combination of SLM scan axis positions.
+
+        ``axes`` holds (class name, field name, positions) per axis. Layers that
+        are not scanned are summed once; the scanned widgets are snapshotted
+        into headless layers with the scanned fields overridden, so the
+        widgets are left untouched and the frames render on a thread pool.
+        """
+        slm = self._slm_red
+        active = REGISTRY.get("slm:red:active_classes") or []
+        widgets = {w.name_(): w for w in (REGISTRY.get("slm:red:widgets") or [])}
+
+        scanned = []
+        for class_name, field_name, _ in axes:
+            if class_name not in active:
+                raise ValueError(f"SLM class '{class_name}' is not active on the red SLM.")
+            w = widgets.get(class_name)
+            if w is None:
+                raise ValueError(f"SLM widget for '{class_name}' not found in registry.")
+            if not hasattr(w, field_name):
+                raise ValueError(f"Field '{field_name}' does not exist in SLM class '{class_name}'.")
+            scanned.append((w, field_name))
+
+        scanned_names = {class_name for class_name, _, _ in axes}
+        static = np.zeros(slm.slm_size, dtype=LEVEL_DTYPE)
+        for name, w in widgets.items():
+            if name in active and name not in scanned_names:
+                static += w.levels()
+        static.setflags(write=False)
+
+        lengths = [len(pos) for _, _, pos in axes]
+        layer_sets = []
+        for idxs in np.ndindex(*lengths):
+            overrides: dict = {}
+            for (w, field_name), (_, _, positions), i in zip(scanned, axes, idxs):
+                overrides.setdefault(w, {})[field_name] = str(positions[i])
+            layer_sets.append([w.to_layer(ov) for w, ov in overrides.items()])
+
+        geometry = get_geometry(slm.slm_size, slm.chip_width, slm.chip_height)
+        bank = SlmFrameBank(path, lengths, slm.slm_size)
+
+        def render(flat: int) -> None:
+            bank.store(flat, render_sum(layer_sets[flat], geometry, slm.bit_depth, base=static))
+
+        try:
+            with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+                list(pool.map(render, range(len(layer_sets))))
+            bank.flush()
+        except Exception:
+            bank.close()
+            raise
+
+        self._log_message(f"Pre-rendered {len(bank)} red SLM frames for scan.")
+        return bank
+
+    def _pattern_key(self, slm: SLMController, cache_keys) -> str:
+        return self._pattern_cache.make_key(
+            list(cache_keys),
+            (slm.slm_size, slm.chip_width, slm.chip_height),
+            slm.bit_depth,
+            RENDER_VERSION,
+        )
+
+    def _compose_cached(self, slm: SLMController, refs) -> np.ndarray:
+        """
+        Composed levels of ``refs``, loaded from the on-disk pattern cache when
+        this exact configuration was rendered before. Layers only recompute
+        when their parameters changed; the sum is plain integer adds.
+        """
+        key = self._pattern_key(slm, [ref.cache_key() for ref in refs])
+        frame = self._pattern_cache.get(key)
+        if frame is not None:
+            return frame
+        total = np.zeros(slm.slm_size, dtype=LEVEL_DTYPE)
+        for ref in refs:
+            total += ref.levels()
+        self._wrap_levels(total, slm.bit_depth)
+        self._pattern_cache.put(key, total)
+        return total
 
     @staticmethod
-    def _levels_to_radians(levels: np.ndarray, bit_depth: int) -> np.ndarray:
-        return levels.astype(np.float64) * (2.0 * np.pi / bit_depth)
+    def _wrap_levels(total: np.ndarray, bit_depth: int) -> np.ndarray:
+        """Wrap a sum of layer levels to [0, bit_depth] in place."""
+        # uint16 cannot overflow here: a handful of layers of at most
+        # bit_depth each stays far below 65535.
+        np.remainder(total, bit_depth + 1, out=total)
+        return total
 
     def _get_phase(self, color: str):
         self._log_message(f"Preview requested for {color} SLM.")
@@ -258,35 +405,32 @@ class SlmWindow(QtWidgets.QMainWindow):
         phase_refs = getattr(self, f"_phase_refs_{color}")
         checkboxes = getattr(self, f"_checkboxes_{color}")
 
-        total_levels = np.zeros(slm.slm_size, dtype=np.uint16)
-        preview_levels = np.zeros(slm.slm_size, dtype=np.uint16)
-        publish_types, preview_types = [], []
-
-        active_refs = []
-        for cb, phase_ref in zip(checkboxes, phase_refs):
-            if cb.isChecked():
-                levels = phase_ref.phase()
-                total_levels = (total_levels + levels) % (slm.bit_depth + 1)
-                publish_types.append(phase_ref.name_())
-                active_refs.append(phase_ref)
-                if "background" not in phase_ref.name_().lower():
-                    preview_levels = (preview_levels + levels) % (slm.bit_depth + 1)
-                    preview_types.append(phase_ref.name_())
+        active_refs = [ref for cb, ref in zip(checkboxes, phase_refs) if cb.isChecked()]
+        publish_types = [ref.name_() for ref in active_refs]
+        preview_refs = [ref for ref in active_refs if "background" not in ref.name_().lower()]
+        preview_types = [ref.name_() for ref in preview_refs]
 
         if color == "red":
             self._update_registry_red(publish_types, active_refs)
 
-        slm.phase = total_levels
-        display_phase = self._levels_to_radians(preview_levels, slm.bit_depth)
-
-        phase_image = getattr(self, f"_phase_image_{color}")
-        phase_image.set_data(display_phase)
-        canvas = getattr(self, f"_canvas_{color}")
-        canvas.draw()
+        slm.phase = self._compose_cached(slm, active_refs)
+        preview = slm.phase if len(preview_refs) == len(active_refs) else self._compose_cached(slm, preview_refs)
+        self._request_preview(color, preview, slm.bit_depth)
 
         self._log_message(f"Preview updated for {color} SLM. Types: {', '.join(preview_types)}")
         return publish_types
 
+    def _request_preview(self, color: str, levels: np.ndarray, bit_depth: int):
+        self._preview_seq += 1
+        self._preview_worker.latest[color] = self._preview_seq
+        self._preview_requested.emit(color, self._preview_seq, levels, bit_depth)
+
+    def _on_preview_ready(self, color: str, seq: int, img: np.ndarray):
+        if self._preview_worker.latest.get(color) != seq:
+            return
+        getattr(self, f"_phase_image_{color}").set_data(img)
+        getattr(self, f"_canvas_{color}").draw_idle()
+
     def _open_publish_win(self, color: str):
         self._log_message(f"Publish requested for {color} SLM.")
         slm: SLMController = getattr(self, f"_slm_{color}")
@@ -308,15 +452,99 @@ class SlmWindow(QtWidgets.QMainWindow):
             QtWidgets.QMessageBox.warning(self, "Error", f"No background image provided for {color} SLM.")
             return
 
-        slm.publish(slm.phase, screen_num)
+        latency_ms = slm.publish(slm.phase, screen_num)
         REGISTRY.register("slm:red:active_classes", publish_types)
         REGISTRY.register("slm:red:widgets", getattr(self, "_phase_refs_red"))
         REGISTRY.register("slm:red:controller", slm)
 
         setattr(self, f"_slm_{color}_status", f"displaying (Screen {screen_num})")
-        self._log_message(f"Published {color} SLM phase on screen {screen_num}. Types: {', '.join(publish_types)}")
+        self._log_message(
+            f"Published {color} SLM phase on screen {screen_num} in {latency_ms:.1f} ms. "
+            f"Types: {', '.join(publish_types)}"
+        )
         self._update_status_bar()
 
+    def _publish_job(self, color: str):
+        """
+        Snapshot the active layers of ``color`` on the GUI thread. Returns the
+        controller, a callable that composes the frame without touching any
+        widget, and a dict that callable fills with the preview levels.
+        """
+        slm: SLMController = getattr(self, f"_slm_{color}")
+        phase_refs = getattr(self, f"_phase_refs_{color}")
+        checkboxes = getattr(self, f"_checkboxes_{color}")
+        active_refs = [ref for cb, ref in zip(checkboxes, phase_refs) if cb.isChecked()]
+        names = [ref.name_() for ref in active_refs]
+        keys = [ref.cache_key() for ref in active_refs]
+        items = [ref.snapshot() for ref in active_refs]
+        in_preview = ["background" not in name.lower() for name in names]
+        geometry = get_geometry(slm.slm_size, slm.chip_width, slm.chip_height)
+        out = {"types": names, "refs": active_refs}
+
+        def compose(subset):
+            key = self._pattern_key(slm, [k for k, keep in zip(keys, subset) if keep])
+            frame = self._pattern_cache.get(key)
+            if frame is not None:
+                return frame
+            total = np.zeros(slm.slm_size, dtype=LEVEL_DTYPE)
+            for i, keep in enumerate(subset):
+                if not keep:
+                    continue
+                items[i] = prerender(items[i], geometry, slm.bit_depth)
+                total += items[i].levels
+            self._wrap_levels(total, slm.bit_depth)
+            self._pattern_cache.put(key, total)
+            return total
+
+        def render() -> np.ndarray:
+            levels = compose([True] * len(items))
+            out["preview"] = levels if all(in_preview) else compose(in_preview)
+            if np.all(levels == 0):
+                raise ValueError(f"No background image provided for {color} SLM.")
+            return levels
+
+        return slm, render, out
+
+    def publish_both(self):
+        """
+        Render and publish the red and green SLMs concurrently; returns once
+        both frames are displayed, with per-SLM timing.
+        """
+        self._log_message("Publish requested for both SLMs.")
+        screens = {color: getattr(self, f"_spin_{color}").value() for color in ("red", "green")}
+        if screens["red"] == screens["green"]:
+            QtWidgets.QMessageBox.warning(
+                self, "Error", f"Red and green SLM cannot both use screen {screens['red']}."
+            )
+            return None
+
+        jobs, outs = [], {}
+        for color in ("red", "green"):
+            slm, render, out = self._publish_job(color)
+            jobs.append((slm, screens[color], render))
+            outs[color] = out
+
+        timings = publish_parallel(jobs)
+        for slm, screen_num, _ in jobs:
+            color = slm.color
+            out, t = outs[color], timings[color]
+            if "preview" in out:
+                self._request_preview(color, out["preview"], slm.bit_depth)
+            if not t.ok:
+                QtWidgets.QMessageBox.warning(self, "Error", str(t.error))
+                continue
+            if color == "red":
+                self._update_registry_red(out["types"], out["refs"])
+                REGISTRY.register("slm:red:widgets", getattr(self, "_phase_refs_red"))
+                REGISTRY.register("slm:red:controller", slm)
+            setattr(self, f"_slm_{color}_status", f"displaying (Screen {screen_num})")
+            self._log_message(
+                f"Published {color} SLM phase on screen {screen_num}: render {t.render_ms:.1f} ms, "
+                f"push {t.push_ms:.1f} ms, total {t.total_ms:.1f} ms. Types: {', '.join(out['types'])}"
+            )
+        self._update_status_bar()
+        return timings
+
     def _close_publish_win(self, color: str):
         self._log_message(f"Close requested for {color} SLM.")
         slm: SLMController = getattr(self, f"_slm_{color}")
@@ -442,6 +670,10 @@ class SlmWindow(QtWidgets.QMainWindow):
         except Exception as e:
             self._log_message(f"Error during shutdown: {e}")
 
+        self._preview_thread.quit()
+        self._preview_thread.wait()
+        self._pattern_cache.flush()
+
         self.closed.emit()
         super().closeEvent(a0)
 
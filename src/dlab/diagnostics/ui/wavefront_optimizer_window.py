@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal, QThread, Qt
+from PyQt5.QtWidgets import (
+    QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QLabel, QLineEdit,
+    QPushButton, QComboBox, QTextEdit, QMessageBox
+)
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+
+from dlab.core.device_registry import REGISTRY
+from dlab.utils.paths_utils import ressources_dir
+from dlab.hardware.wrappers.phase_layers import ZernikeLayer
+from dlab.hardware.wrappers.slm_geometry import get_geometry
+from dlab.hardware.wrappers.zernike_basis import get_zernike_basis, load_coefficients, save_coefficients
+from dlab.hardware.wrappers.wavefront_optimizer import (
+    METRICS,
+    CoordinateSearch,
+    SpgdSearch,
+    WavefrontOptimizer,
+    WavefrontResult,
+)
+
+logger = logging.getLogger("dlab.ui.WavefrontOptimizerWindow")
+
+
+def _parse_modes(text: str) -> list[int]:
+    """Parse Noll indices such as "4-15" or "4, 5, 7-9"."""
+    js: list[int] = []
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            a, b = (int(v) for v in part.split("-", 1))
+            js.extend(range(a, b + 1))
+        else:
+            js.append(int(part))
+    js = sorted(set(js))
+    if not js or js[0] < 1:
+        raise ValueError("Give at least one Noll index ≥ 1.")
+    return js
+
+
+def _parse_roi(text: str):
+    text = text.strip()
+    if not text:
+        return None
+    x0, y0, x1, y1 = (int(v) for v in text.split(","))
+    if x1 <= x0 or y1 <= y0:
+        raise ValueError("ROI must be x0,y0,x1,y1 with x1 > x0 and y1 > y0.")
+    return x0, y0, x1, y1
+
+
+def _frame_source(dev):
+    """Single-frame grabber for a registered camera window or controller."""
+    if hasattr(dev, "grab_frame_for_scan"):
+        return lambda: dev.grab_frame_for_scan(averages=1)[0]
+    if hasattr(dev, "capture_single"):
+        return dev.capture_single
+    raise ValueError(f"{type(dev).__name__} cannot grab frames.")
+
+
+# ---------- worker ----------
+class WavefrontOptimizerWorker(QObject):
+    step = pyqtSignal(object)
+    log_signal = pyqtSignal(str)
+    finished = pyqtSignal(object)
+
+    def __init__(self, optimizer: WavefrontOptimizer, strategy, coefs0, max_iterations: int,
+                 parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.optimizer = optimizer
+        self.strategy = strategy
+        self.coefs0 = coefs0
+        self.max_iterations = int(max_iterations)
+        self.abort = False
+
+    def run(self) -> None:
+        result = None
+        try:
+            result = self.optimizer.run(
+                self.strategy,
+                self.coefs0,
+                self.max_iterations,
+                on_step=self.step.emit,
+                should_stop=lambda: self.abort,
+            )
+        except Exception as e:
+            msg = f"Optimisation error: {e}"
+            self.log_signal.emit(msg)
+            logger.exception(msg)
+        self.finished.emit(result)
+
+
+class WavefrontOptimizerWindow(QMainWindow):
+    """
+    Closed-loop Zernike optimisation of an SLM from camera feedback.
+
+    The active layers of the SLM window, except Zernike, form the fixed base
+    frame; the selected Noll modes start from the loaded Zernike file (or
+    zero) and are optimised on the selected camera. The result is written as
+    a coefficient file that can be applied to the Zernike layer.
+    """
+
+    def __init__(self, slm_window, parent=None) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Wavefront Optimisation")
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self._slm_window = slm_window
+        self._thread: QThread | None = None
+        self._worker: WavefrontOptimizerWorker | None = None
+        self._js: list[int] = []
+        self._fixed: dict[int, float] = {}
+        self._result_path: str | None = None
+        self._scores: list[float] = []
+        self._best: list[float] = []
+
+        self._build_ui()
+        self._refresh_cameras()
+
+    def _build_ui(self) -> None:
+        central = QWidget(self); self.setCentralWidget(central)
+        main = QHBoxLayout(central)
+
+        left = QVBoxLayout()
+
+        self.color_combo = QComboBox(); self.color_combo.addItems(["red", "green"])
+        self.camera_combo = QComboBox()
+        self.refresh_btn = QPushButton("Refresh cameras")
+        self.refresh_btn.clicked.connect(self._refresh_cameras)
+        self.metric_combo = QComboBox(); self.metric_combo.addItems(list(METRICS))
+        self.roi_edit = QLineEdit("")
+        self.roi_edit.setPlaceholderText("x0,y0,x1,y1 (full frame)")
+        self.modes_edit = QLineEdit("4-15")
+        self.strategy_combo = QComboBox(); self.strategy_combo.addItems([SpgdSearch.name, CoordinateSearch.name])
+        self.step_edit = QLineEdit("20")
+        self.min_step_edit = QLineEdit("2")
+        self.gain_edit = QLineEdit("10")
+        self.iterations_edit = QLineEdit("200")
+        self.settle_edit = QLineEdit("50")
+
+        def add_row(label: str, w: QWidget):
+            r = QHBoxLayout()
+            r.addWidget(QLabel(label)); r.addWidget(w)
+            left.addLayout(r)
+
+        add_row("SLM:", self.color_combo)
+        add_row("Camera:", self.camera_combo)
+        left.addWidget(self.refresh_btn)
+        add_row("Metric:", self.metric_combo)
+        add_row("ROI (px):", self.roi_edit)
+        add_row("Noll modes:", self.modes_edit)
+        add_row("Search:", self.strategy_combo)
+        add_row("Step / σ (levels):", self.step_edit)
+        add_row("Min step / σ:", self.min_step_edit)
+        add_row("SPGD gain:", self.gain_edit)
+        add_row("Max iterations:", self.iterations_edit)
+        add_row("SLM settle (ms):", self.settle_edit)
+
+        self.start_btn = QPushButton("Start")
+        self.start_btn.clicked.connect(self._start)
+        self.abort_btn = QPushButton("Abort")
+        self.abort_btn.clicked.connect(self._abort)
+        self.abort_btn.setEnabled(False)
+        self.apply_btn = QPushButton("Apply to Zernike layer")
+        self.apply_btn.clicked.connect(self._apply)
+        self.apply_btn.setEnabled(False)
+
+        left.addWidget(self.start_btn)
+        left.addWidget(self.abort_btn)
+        left.addWidget(self.apply_btn)
+        left.addStretch(1)
+        main.addLayout(left, 1)
+
+        right = QVBoxLayout()
+        self.fig = Figure(figsize=(5, 5))
+        self.ax_score = self.fig.add_subplot(211)
+        self.ax_score.set_xlabel("Iteration"); self.ax_score.set_ylabel("Score")
+        self.line_score, = self.ax_score.plot([], [], "b-", label="current")
+        self.line_best, = self.ax_score.plot([], [], "g--", label="best")
+        self.ax_score.legend(loc="lower right", fontsize=8)
+        self.ax_coefs = self.fig.add_subplot(212)
+        self.ax_coefs.set_xlabel("Mode (j)"); self.ax_coefs.set_ylabel("Coef (levels)")
+        self.fig.tight_layout()
+        self.canvas = FigureCanvas(self.fig)
+        right.addWidget(self.canvas)
+
+        self.log_text = QTextEdit(); self.log_text.setReadOnly(True)
+        right.addWidget(QLabel("Log:")); right.addWidget(self.log_text)
+
+        main.addLayout(right, 2)
+
+    def _refresh_cameras(self) -> None:
+        self.camera_combo.clear()
+        seen = set()
+        for key, dev in REGISTRY.items(prefix="camera:"):
+            if dev is None or id(dev) in seen:
+                continue
+            if hasattr(dev, "grab_frame_for_scan") or hasattr(dev, "capture_single"):
+                seen.add(id(dev))
+                self.camera_combo.addItem(key, key)
+
+    # Setup
+    def _zernike_ref(self, color: str):
+        refs = getattr(self._slm_window, f"_phase_refs_{color}")
+        return next((ref for ref in refs if ref.name_() == "Zernike"), None)
+
+    def _build_optimizer(self, color: str, js: list[int], metric, settle_s: float):
+        """Base frame and starting coefficients from the SLM window, on the GUI thread."""
+        win = self._slm_window
+        slm = getattr(win, f"_slm_{color}")
+        refs = getattr(win, f"_phase_refs_{color}")
+        checkboxes = getattr(win, f"_checkboxes_{color}")
+        screen_num = getattr(win, f"_spin_{color}").value()
+        active = [ref for cb, ref in zip(checkboxes, refs) if cb.isChecked()]
+
+        # Modes of the loaded file that are not optimised stay fixed in the base.
+        start: dict[int, float] = {}
+        zernike = self._zernike_ref(color)
+        if zernike is not None and zernike in active and zernike.filepath:
+            file_js, file_coefs = load_coefficients(zernike.filepath)
+            start = {int(j): float(c) for j, c in zip(file_js, file_coefs)}
+        self._fixed = {j: c for j, c in start.items() if j not in js}
+
+        base = np.array(win._compose_cached(slm, [ref for ref in active if ref is not zernike]))
+        if self._fixed:
+            geometry = get_geometry(slm.slm_size, slm.chip_width, slm.chip_height)
+            fixed = ZernikeLayer(tuple(self._fixed), tuple(self._fixed.values()))
+            base += fixed.render(geometry, slm.bit_depth)
+            win._wrap_levels(base, slm.bit_depth)
+
+        optimizer = WavefrontOptimizer(
+            get_zernike_basis(js, slm.slm_size),
+            base,
+            publish=lambda levels: slm.publish(levels, screen_num),
+            grab=_frame_source(REGISTRY.get(self.camera_combo.currentData())),
+            metric=metric,
+            bit_depth=slm.bit_depth,
+            settle_s=settle_s,
+        )
+        coefs0 = np.array([start.get(j, 0.0) for j in js])
+        return optimizer, coefs0
+
+    # Run
+    def _start(self) -> None:
+        try:
+            color = self.color_combo.currentText()
+            if self.camera_combo.currentData() is None:
+                raise ValueError("No camera registered; open a camera window first.")
+            js = _parse_modes(self.modes_edit.text())
+            metric = partial(METRICS[self.metric_combo.currentText()], roi=_parse_roi(self.roi_edit.text()))
+            step = float(self.step_edit.text())
+            min_step = float(self.min_step_edit.text())
+            gain = float(self.gain_edit.text())
+            iterations = int(self.iterations_edit.text())
+            settle_s = float(self.settle_edit.text()) / 1e3
+            if step <= 0 or iterations < 1:
+                raise ValueError("Step and iterations must be positive.")
+            optimizer, coefs0 = self._build_optimizer(color, js, metric, settle_s)
+        except Exception as e:
+            QMessageBox.critical(self, "Invalid input", str(e))
+            return
+
+        if self.strategy_combo.currentText() == SpgdSearch.name:
+            strategy = SpgdSearch(len(js), sigma=step, gain=gain, min_sigma=min_step)
+        else:
+            strategy = CoordinateSearch(len(js), step=step, min_step=min_step)
+
+        # reset plots
+        self._scores, self._best = [], []
+        self.line_score.set_data([], []); self.line_best.set_data([], [])
+        self._plot_coefs(js, coefs0)
+
+        self._thread = QThread(self)
+        self._worker = WavefrontOptimizerWorker(optimizer, strategy, coefs0, iterations)
+        self._worker.moveToThread(self._thread)
+        self._thread.started.connect(self._worker.run)
+        self._worker.step.connect(self._on_step)
+        self._worker.log_signal.connect(self._log)
+        self._worker.finished.connect(self._finished)
+        self._thread.finished.connect(self._thread.deleteLater)
+
+        self._js = js
+        self.start_btn.setEnabled(False)
+        self.abort_btn.setEnabled(True)
+        self.apply_btn.setEnabled(False)
+        self._thread.start()
+        self._log(f"{strategy.name} optimisation of modes {js} on the {color} SLM started…")
+
+    def _abort(self) -> None:
+        if self._worker:
+            self._worker.abort = True
+            self._log("Abort requested.")
+            self.abort_btn.setEnabled(False)
+
+    # slots
+    def _on_step(self, step) -> None:
+        self._scores.append(step.score); self._best.append(step.best_score)
+        x = np.arange(1, len(self._scores) + 1)
+        self.line_score.set_data(x, self._scores)
+        self.line_best.set_data(x, self._best)
+        self.ax_score.relim(); self.ax_score.autoscale_view()
+        self._plot_coefs(self._js, step.coefs)
+        if step.iteration % 10 == 0:
+            self._log(f"Iteration {step.iteration}: score {step.score:.4g}, best {step.best_score:.4g}, "
+                      f"{step.ms_per_frame:.0f} ms/frame")
+
+    def _plot_coefs(self, js, coefs) -> None:
+        self.ax_coefs.clear()
+        self.ax_coefs.bar(js, coefs, alpha=0.8)
+        self.ax_coefs.set_xlabel("Mode (j)"); self.ax_coefs.set_ylabel("Coef (levels)")
+        self.ax_coefs.grid(True)
+        self.canvas.draw_idle()
+
+    def _log(self, msg: str) -> None:
+        ts = datetime.now().strftime("%H:%M:%S")
+        self.log_text.append(f"[{ts}] {msg}")
+        self.log_text.verticalScrollBar().setValue(
+            self.log_text.verticalScrollBar().maximum()
+        )
+        logger.info(msg)
+
+    def _finished(self, result: WavefrontResult | None) -> None:
+        if result is not None:
+            self._plot_coefs(result.js, result.coefs)
+            coefs = dict(self._fixed)
+            coefs.update({j: float(c) for j, c in zip(result.js, result.coefs)})
+            out_dir = ressources_dir() / "aberration_correction"
+            out_dir.mkdir(parents=True, exist_ok=True)
+            path = out_dir / f"optimized_{datetime.now().strftime('%Y_%m_%d_%H%M%S')}.txt"
+            js = sorted(coefs)
+            save_coefficients(str(path), js, [coefs[j] for j in js])
+            self._result_path = path.as_posix()
+            self.apply_btn.setEnabled(True)
+            state = "converged" if result.converged else "stopped"
+            self._log(
+                f"Optimisation {state} after {result.iterations} iterations ({result.frames} frames): "
+                f"score {result.initial_score:.4g} → {result.score:.4g}. Saved to {self._result_path}"
+            )
+        else:
+            self._log("Finished with errors.")
+        self.abort_btn.setEnabled(False)
+        self.start_btn.setEnabled(True)
+
+        if self._thread and self._thread.isRunning():
+            self._thread.quit()
+            self._thread.wait()
+        self._thread = None
+        self._worker = None
+
+    def _apply(self) -> None:
+        color = self.color_combo.currentText()
+        zernike = self._zernike_ref(color)
+        if zernike is None or not self._result_path:
+            return
+        zernike.set_file(self._result_path)
+        refs = getattr(self._slm_window, f"_phase_refs_{color}")
+        checkboxes = getattr(self._slm_window, f"_checkboxes_{color}")
+        for cb, ref in zip(checkboxes, refs):
+            if ref is zernike:
+                cb.setChecked(True)
+        self._slm_window._get_phase(color)
+        self._log(f"Applied {self._result_path} to the {color} Zernike layer.")
+
+    def closeEvent(self, event):
+        if self._worker:
+            self._worker.abort = True
+        if self._thread and self._thread.isRunning():
+            self._thread.quit()
+            self._thread.wait()
+        super().closeEvent(event)
@@ -183,9 +183,10 @@ def SLM_Disp_Data(display_number, data_array, width, height):
         raise IndexError('Array dimensions must match SLM screen resolution of ' 
                          + str(height) + 'x' + str(width) + '.')
 
-    # convert from numpy array to pointer to array of ushort
-    data = data_array.astype(np.ushort)
-    c = data.ctypes.data_as(ct.POINTER((ct.c_ushort * height) * width)).contents
+    # pass the numpy buffer to the driver as a raw pointer
+    # (no copy when the caller already hands over a C-contiguous ushort array)
+    data = np.ascontiguousarray(data_array, dtype=np.ushort)
+    c = ct.c_void_p(data.ctypes.data)
 
     # display on SLM
     ret = dll.SLM_Disp_Data(display_number, width, height, flags, c)
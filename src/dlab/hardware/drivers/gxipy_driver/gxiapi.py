@@ -3,6 +3,7 @@
 # -*-mode:python ; tab-width:4 -*- ex:set tabstop=4 shiftwidth=4 expandtab: -*-
 
 import numpy
+import threading
 from dlab.hardware.drivers.gxipy_driver.gxwrapper import *
 from dlab.hardware.drivers.gxipy_driver.dxwrapper import *
 from dlab.hardware.drivers.gxipy_driver.gxidef import *
@@ -1453,6 +1454,7 @@ class DataStream:
         
         self.__c_capture_callback = CAP_CALL(self.__on_capture_callback)
         self.__py_capture_callback = None
+        self.__capture_pool = None
 
         self.StreamAnnouncedBufferCount = IntFeature(self.__dev_handle, GxFeatureID.INT_ANNOUNCED_BUFFER_COUNT)
         self.StreamDeliveredFrameCount = IntFeature(self.__dev_handle, GxFeatureID.INT_DELIVERED_FRAME_COUNT)
@@ -1484,10 +1486,12 @@ class DataStream:
         status = gx_set_acquisition_buffer_number(self.__dev_handle, buf_num)
         StatusProcessor.process(status, 'DataStream', 'set_acquisition_buffer_number')
 
-    def get_image(self, timeout=1000):
+    def get_image(self, timeout=1000, pool=None):
         """
         :brief          Get an image, get successfully create image class object
         :param          timeout:    Acquisition timeout, range:[0, 0xFFFFFFFF]
+        :param          pool:       ImageBufferPool; the image is received directly into one of
+                                    its buffers and must be given back with RawImage.release()
         :return:        image object
         """
         if not isinstance(timeout, INT_TYPE):
@@ -1504,28 +1508,35 @@ class DataStream:
             print("DataStream.get_image: Current data steam don't  start acquisition")
             return None
 
-        frame_data = GxFrameData()
-        frame_data.image_size = self.payload_size
-        frame_data.image_buf = None
-        image = RawImage(frame_data)
+        if pool is not None:
+            image = pool.acquire(self.payload_size)
+            if image is None:
+                print("DataStream.get_image: no free buffer in the pool")
+                return None
+        else:
+            frame_data = GxFrameData()
+            frame_data.image_size = self.payload_size
+            frame_data.image_buf = None
+            image = RawImage(frame_data)
 
         status = gx_get_image(self.__dev_handle, image.frame_data, timeout)
         if status == GxStatusList.SUCCESS:
             return image
-        elif status == GxStatusList.TIMEOUT:
-            return None
-        else:
+        image.release()
+        if status != GxStatusList.TIMEOUT:
             StatusProcessor.process(status, 'DataStream', 'get_image')
-            return None
+        return None
 
     def flush_queue(self):
         status = gx_flush_queue(self.__dev_handle)
         StatusProcessor.process(status, 'DataStream', 'flush_queue')
 
-    def register_capture_callback(self, callback_func):
+    def register_capture_callback(self, callback_func, pool=None):
         """
         :brief      Register the capture event callback function.
         :param      callback_func:  callback function
+        :param      pool:           ImageBufferPool; frames are copied into its buffers instead of
+                                    newly allocated ones and must be given back with RawImage.release()
         :return:    none
         """
         if not isinstance(callback_func, types.FunctionType):
@@ -1537,6 +1548,7 @@ class DataStream:
 
         # callback will not recorded when register callback failed.
         self.__py_capture_callback = callback_func
+        self.__capture_pool = pool
 
     def unregister_capture_callback(self):
         """
@@ -1546,12 +1558,22 @@ class DataStream:
         status = gx_unregister_capture_callback(self.__dev_handle)
         StatusProcessor.process(status, 'DataStream', 'unregister_capture_callback')
         self.__py_capture_callback = None
+        self.__capture_pool = None
 
     def __on_capture_callback(self, capture_data):
         """
         :brief      Capture event callback function with capture date.
         :return:    none
         """
+        pool = self.__capture_pool
+        if pool is not None:
+            image = pool.acquire(capture_data.contents.image_size)
+            if image is None:
+                return  # every pooled buffer is still held; drop the frame
+            image.copy_from(capture_data.contents)
+            self.__py_capture_callback(image)
+            return
+
         frame_data = GxFrameData()
         frame_data.image_buf = capture_data.contents.image_buf
         frame_data.width = capture_data.contents.width
@@ -1954,16 +1976,103 @@ class RGBImage:
         return self.frame_data.image_size
 
 
+class ImageBufferPool:
+    """
+    :brief      Fixed set of preallocated RawImage objects backed by NumPy buffers.
+                DataStream.get_image(pool=...) receives frames directly into a free buffer;
+                get_numpy_array() of such an image is a view of that buffer, valid until
+                RawImage.release() gives it back. Steady-state acquisition allocates nothing.
+    """
+
+    def __init__(self, buffer_size, count):
+        if buffer_size <= 0 or count <= 0:
+            raise InvalidParameter("ImageBufferPool: buffer_size and count must be positive")
+        self.buffer_size = int(buffer_size)
+        self.__free = [RawImage(GxFrameData(), numpy.empty(self.buffer_size, dtype=numpy.ubyte), self)
+                       for _ in range(count)]
+        self.__count = count
+        self.__lent = set()
+        self.__cond = threading.Condition()
+
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def available(self):
+        with self.__cond:
+            return len(self.__free)
+
+    def acquire(self, size=None, timeout=0):
+        """
+        :brief      Take a free image, waiting up to timeout [s] for one to be released
+        :param      size:       bytes the frame needs (payload size)
+        :return:    RawImage, or None when none is free
+        """
+        if size is not None and size > self.buffer_size:
+            raise InvalidParameter("ImageBufferPool.acquire: frame of %d bytes exceeds buffers of %d bytes"
+                                   % (size, self.buffer_size))
+        with self.__cond:
+            if not self.__free and timeout:
+                self.__cond.wait_for(lambda: self.__free, timeout)
+            if not self.__free:
+                return None
+            image = self.__free.pop()
+            self.__lent.add(id(image))
+        image.frame_data.image_size = self.buffer_size if size is None else size
+        image.frame_data.status = 0
+        return image
+
+    def release(self, image):
+        """
+        :brief      Return a lent image; releasing it again, or an image this pool did not
+                    lend, is ignored so one buffer never backs two frames
+        """
+        with self.__cond:
+            if id(image) not in self.__lent:
+                return
+            self.__lent.discard(id(image))
+            self.__free.append(image)
+            self.__cond.notify()
+
+
 class RawImage:
-    def __init__(self, frame_data):
+    def __init__(self, frame_data, buffer=None, pool=None):
         self.frame_data = frame_data
+        self.__pool = pool
 
-        if self.frame_data.image_buf is not None:
+        if buffer is not None:
+            self.__image_array = buffer
+            self.frame_data.image_buf = buffer.ctypes.data
+        elif self.frame_data.image_buf is not None:
             self.__image_array = string_at(self.frame_data.image_buf, self.frame_data.image_size)
         else:
             self.__image_array = (c_ubyte * self.frame_data.image_size)()
             self.frame_data.image_buf = addressof(self.__image_array)
 
+    def copy_from(self, frame_data):
+        """
+        :brief      Copy a frame owned by the SDK into this image's buffer
+        :param      frame_data:     GxFrameData of the source frame
+        """
+        memmove(self.frame_data.image_buf, frame_data.image_buf, frame_data.image_size)
+        for name in ('status', 'width', 'height', 'pixel_format', 'image_size', 'frame_id', 'timestamp'):
+            setattr(self.frame_data, name, getattr(frame_data, name))
+
+    def release(self):
+        """
+        :brief      Give a pooled image back to its ImageBufferPool; arrays obtained from
+                    get_numpy_array() must not be used afterwards. No-op for other images.
+        """
+        if self.__pool is not None:
+            self.__pool.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
 
     def __pixel_format_raw16_to_raw8(self, pixel_format):
         """
@@ -2553,6 +2662,8 @@ class RawImage:
         :brief      get Raw data
         :return:    raw data[string]
         """
+        if isinstance(self.__image_array, numpy.ndarray):
+            return self.__image_array[:self.frame_data.image_size].tobytes()
         image_str = string_at(self.__image_array, self.frame_data.image_size)
         return image_str
 
@@ -2566,9 +2677,12 @@ class RawImage:
             raise ParameterTypeError("RawImage.save_raw: "
                                      "Expected file_path type is str, not %s" % type(file_path))
 
+        image_array = self.__image_array
+        if isinstance(image_array, numpy.ndarray):
+            image_array = image_array[:self.frame_data.image_size]
         try:
             fp = open(file_path, "wb")
-            fp.write(self.__image_array)
+            fp.write(image_array)
             fp.close()
         except Exception as error:
             raise UnexpectedError("RawImage.save_raw:%s" % error)
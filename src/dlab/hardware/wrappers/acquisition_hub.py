@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from dlab.hardware.wrappers.frame_ring import FrameRing
+
+
+_log = logging.getLogger(__name__)
+
+DEFAULT_LINGER_S = 2.0
+
+
+class FrameReader:
+    """
+    One consumer's cursor over a shared frame ring.
+
+    Each reader keeps its own position, so live view, scans and savers read
+    the same stream independently. A reader that falls behind the producer
+    jumps to the oldest frame still in the ring; the frames it passed over
+    are counted in :attr:`skipped`.
+    """
+
+    def __init__(self, ring: FrameRing, start_seq: Optional[int] = None) -> None:
+        self.ring = ring
+        self.next_seq = ring.last_seq + 1 if start_seq is None else int(start_seq)
+        self.skipped = 0
+
+    def skip(self, n: int = 1) -> None:
+        """Ignore the next ``n`` frames, e.g. one still exposing with old settings."""
+        self.next_seq += int(n)
+
+    def _get(self, seq: int, copy: bool):
+        return self.ring.read(seq) if copy else self.ring.view(seq)
+
+    def next(self, timeout: Optional[float] = None, copy: bool = False) -> Optional[Tuple[int, np.ndarray, Any]]:
+        """
+        Next frame in sequence as (seq, frame, meta), or None on timeout.
+
+        Without ``copy`` the frame is a read-only view into the ring; call
+        :meth:`FrameRing.is_valid` on ``seq`` after using it.
+        """
+        while True:
+            if self.ring.wait(self.next_seq - 1, timeout) < 0:
+                return None
+            seq = self.next_seq
+            got = self._get(seq, copy)
+            if got is None:
+                oldest = max(self.ring.oldest_seq(), seq + 1)
+                self.skipped += oldest - seq
+                self.next_seq = oldest
+                continue
+            self.next_seq = seq + 1
+            return seq, got[0], got[1]
+
+    def latest(self, timeout: Optional[float] = None, copy: bool = False) -> Optional[Tuple[int, np.ndarray, Any]]:
+        """Newest frame after the last one read, passing over any in between."""
+        newest = self.ring.wait(self.next_seq - 1, timeout)
+        if newest < 0:
+            return None
+        got = self._get(newest, copy)
+        if got is None:
+            return None
+        self.skipped += max(0, newest - self.next_seq)
+        self.next_seq = newest + 1
+        return newest, got[0], got[1]
+
+
+class AcquisitionHub:
+    """
+    Shares one camera stream between any number of consumers.
+
+    Works with any controller exposing ``start_stream()``, ``stop_stream()``,
+    ``is_streaming`` and ``ring``. The first :meth:`acquire` starts the
+    stream and it stops ``linger_s`` after the last :meth:`release`, so
+    back-to-back users such as the points of a scan keep the running stream
+    instead of restarting it.
+    """
+
+    _hubs: "weakref.WeakKeyDictionary[Any, AcquisitionHub]" = weakref.WeakKeyDictionary()
+    _hubs_lock = threading.Lock()
+
+    def __init__(self, controller, linger_s: float = DEFAULT_LINGER_S) -> None:
+        self.controller = controller
+        self.linger_s = float(linger_s)
+        self._users = 0
+        self._lock = threading.Lock()
+        self._stop_timer: Optional[threading.Timer] = None
+
+    @classmethod
+    def for_camera(cls, controller) -> "AcquisitionHub":
+        """The hub of ``controller``, created on first use."""
+        with cls._hubs_lock:
+            hub = cls._hubs.get(controller)
+            if hub is None:
+                hub = cls._hubs[controller] = cls(controller)
+            return hub
+
+    @property
+    def users(self) -> int:
+        return self._users
+
+    def acquire(self, **stream_kwargs) -> FrameRing:
+        """Register a consumer and return the ring, starting the stream if needed."""
+        with self._lock:
+            self._cancel_stop()
+            if not self.controller.is_streaming:
+                self.controller.start_stream(**stream_kwargs)
+            self._users += 1
+            return self.controller.ring
+
+    def release(self) -> None:
+        """Unregister a consumer; the stream lingers briefly once none are left."""
+        with self._lock:
+            self._users = max(0, self._users - 1)
+            if self._users or not self.controller.is_streaming:
+                return
+            if self.linger_s <= 0:
+                self._stop()
+                return
+            self._stop_timer = threading.Timer(self.linger_s, self._stop_if_idle)
+            self._stop_timer.daemon = True
+            self._stop_timer.start()
+
+    def run_exclusive(self, fn: Callable[[], Any], own: int = 0) -> bool:
+        """
+        Run ``fn``, typically a camera settings change, only while no consumer
+        other than the caller's ``own`` registrations holds the stream. Returns
+        False without running it otherwise. Consumers that set their settings
+        after :meth:`acquire` can therefore not be overridden by another one.
+        """
+        with self._lock:
+            if self._users > own:
+                return False
+            fn()
+            return True
+
+    @contextmanager
+    def session(self, **stream_kwargs) -> Iterator[FrameReader]:
+        """``with hub.session() as reader:`` reads frames produced from now on."""
+        ring = self.acquire(**stream_kwargs)
+        try:
+            yield FrameReader(ring)
+        finally:
+            self.release()
+
+    def _cancel_stop(self) -> None:
+        if self._stop_timer is not None:
+            self._stop_timer.cancel()
+            self._stop_timer = None
+
+    def _stop_if_idle(self) -> None:
+        with self._lock:
+            self._stop_timer = None
+            if self._users == 0:
+                self._stop()
+
+    def _stop(self) -> None:
+        try:
+            self.controller.stop_stream()
+        except Exception as e:
+            _log.error("Stopping the shared stream failed: %s", e)
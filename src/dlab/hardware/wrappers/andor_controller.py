@@ -1,11 +1,20 @@
 from __future__ import annotations
 
 import logging
+import threading
+import time
 
 import numpy as np
 from pylablib.devices import Andor
 import pylablib
 
+from dlab.hardware.wrappers.acquisition_hub import AcquisitionHub, FrameReader
+from dlab.hardware.wrappers.dark_calibration import (
+    ActiveCalibration, DarkCalibration, DEFAULT_DARK_FRAMES,
+    default_calibration_store, record_dark_calibration,
+)
+from dlab.hardware.wrappers.frame_accumulator import FrameAccumulator, reject_hot_pixels
+from dlab.hardware.wrappers.frame_ring import FrameRing
 from dlab.utils.config_utils import cfg_get
 
 
@@ -14,6 +23,8 @@ _log = logging.getLogger(__name__)
 DEFAULT_EXPOSURE_US = 500_000
 MIN_EXPOSURE_US = 1_000
 MAX_EXPOSURE_US = 10_000_000
+DEFAULT_STREAM_BUFFERS = 32
+STREAM_POLL_S = 0.2
 
 
 class AndorControllerError(Exception):
@@ -28,6 +39,21 @@ class AndorController:
         self._cam: Andor.AndorSDK2Camera | None = None
         self._image_shape: tuple[int, ...] | None = None
         self._current_exposure: int | None = None
+        self._acq_lock = threading.RLock()
+        self.ring: FrameRing | None = None
+        self._stream_thread: threading.Thread | None = None
+        self._stream_stop = threading.Event()
+        self._last_index = -1
+        self.frames_received = 0
+        self.frames_skipped = 0
+        self._scan_acc = FrameAccumulator()
+        self._scan_scratch: np.ndarray | None = None
+        self.dark_correction = True
+        self._dark = ActiveCalibration(default_calibration_store(), self.camera_name)
+
+    @property
+    def camera_name(self) -> str:
+        return f"AndorCam_{self.device_index + 1}"
 
     def is_active(self) -> bool:
         """Check if camera is activated."""
@@ -78,6 +104,10 @@ class AndorController:
     def deactivate(self) -> None:
         """Close the camera connection."""
         if self._cam:
+            try:
+                self.stop_stream()
+            except Exception as e:
+                _log.error("Andor[%s] stop_stream error: %s", self.device_index, e)
             try:
                 self._cam.close()
                 _log.info("Andor[%s] deactivated", self.device_index)
@@ -117,7 +147,16 @@ class AndorController:
             return
 
         try:
-            self._cam.set_exposure(exposure_us / 1e6)
+            with self._acq_lock:
+                if self.is_streaming:
+                    # The exposure cannot change mid-acquisition; restart it so
+                    # every streamed frame after this call uses the new value.
+                    self._cam.stop_acquisition()
+                    self._cam.set_exposure(exposure_us / 1e6)
+                    self._last_index = -1
+                    self._cam.start_acquisition()
+                else:
+                    self._cam.set_exposure(exposure_us / 1e6)
             self._current_exposure = exposure_us
             _log.debug("Andor[%s] exposure set to %dus", self.device_index, exposure_us)
         except Exception as e:
@@ -135,18 +174,296 @@ class AndorController:
         return self._current_exposure
 
     def capture_single(self, exposure_us: int | None = None, timeout_s: float = 20.0) -> np.ndarray:
-        """Capture a single frame with optional exposure override."""
+        """
+        Capture a single frame with optional exposure override, in the
+        camera's native integer dtype. While streaming, the next frame
+        exposed after this call is copied out of the ring.
+        """
+        frames, _ = self.capture_frames(1, exposure_us, timeout_s)
+        return frames[0]
+
+    def capture_frames(self, n: int, exposure_us: int | None = None,
+                       timeout_s: float = 20.0) -> tuple[np.ndarray, dict]:
+        """
+        Capture ``n`` consecutive frames as an (n, h, w) array in the native
+        dtype, with a dict holding their camera frame numbers and the number
+        of frames skipped in between.
+
+        While streaming the frames come from the ring; otherwise a single
+        acquisition run collects all of them from the camera's ring buffer.
+        """
         if self._cam is None or self._image_shape is None:
             raise AndorControllerError("Camera not active; call activate() first")
-
+        n = max(1, int(n))
         if exposure_us is not None:
             self.set_exposure(int(exposure_us))
+        if self.is_streaming:
+            return self._next_stream_frames(n, timeout_s)
+
+        frames: list[np.ndarray] = []
+        indices: list[int] = []
+        with self._acq_lock:
+            self._cam.setup_acquisition("cont", nframes=max(n, 2))
+            self._cam.start_acquisition()
+            try:
+                while len(frames) < n:
+                    self._cam.wait_for_frame(since="lastread", nframes=1, timeout=timeout_s)
+                    for frame, idx in self._read_new():
+                        frames.append(frame)
+                        indices.append(idx)
+            except Andor.AndorTimeoutError as e:
+                raise AndorControllerError(f"capture timed out after {len(frames)}/{n} frames") from e
+            finally:
+                self._cam.stop_acquisition()
+
+        frames, indices = frames[:n], indices[:n]
+        skipped = sum(b - a - 1 for a, b in zip(indices, indices[1:]))
+        return np.stack(frames), {"frame_numbers": indices, "skipped": skipped}
+
+    def grab_frame_for_scan(
+        self,
+        averages: int = 1,
+        adaptive=None,
+        dead_pixel_cleanup: bool = False,
+        background: bool = False,
+        *,
+        exposure_us: int | None = None,
+        force_roi: bool = False,
+        noise: bool = False,
+        timeout_s: float = 20.0,
+    ) -> tuple[np.ndarray, dict]:
+        """
+        Average ``averages`` consecutive frames for scanning routines and
+        return (uint16 frame, metadata). Frames come from the shared stream,
+        so live view keeps going during a scan and consecutive scan points
+        reuse the running acquisition. They are accumulated in place as they
+        arrive; with ``noise`` the per-pixel standard deviation is returned
+        in ``meta["PixelStd"]`` and its mean in ``meta["PixelNoise"]``.
+        """
+        if self._cam is None or self._image_shape is None:
+            raise AndorControllerError("Camera not active; call activate() first")
+        n = max(1, int(averages))
 
-        self._cam.start_acquisition()
+        # Register before changing the exposure so live view cannot set it back.
+        hub = AcquisitionHub.for_camera(self)
+        ring = hub.acquire()
+        numbers: list[int] = []
         try:
-            self._cam.wait_for_frame(timeout=timeout_s)
-            frame = self._cam.read_oldest_image()
+            if exposure_us is not None:
+                self.set_exposure(int(exposure_us))
+            reader = FrameReader(ring)
+            reader.skip(1)  # the frame in flight may predate this call
+            acc = self._scan_acc
+            acc.reset(ring.shape, track_variance=noise and n > 1)
+            if self._scan_scratch is None or self._scan_scratch.shape != ring.shape \
+                    or self._scan_scratch.dtype != ring.dtype:
+                self._scan_scratch = np.empty(ring.shape, dtype=ring.dtype)
+            timeout = timeout_s + (self._current_exposure or 0) / 1e6
+            while acc.count < n:
+                got = reader.next(timeout=timeout)
+                if got is None:
+                    raise AndorControllerError("Timed out waiting for a streamed frame")
+                seq, view, number = got
+                np.copyto(self._scan_scratch, view)
+                if not ring.is_valid(seq):
+                    continue  # overwritten while copying
+                acc.add(self._scan_scratch)
+                numbers.append(int(number))
         finally:
-            self._cam.stop_acquisition()
+            hub.release()
+
+        avg = acc.mean()
+        cal = self.dark_calibration() if self.dark_correction else None
+        if cal is not None and cal.dark.shape != avg.shape:
+            _log.warning("Dark calibration %s does not match frame shape %s; ignored.", cal.dark.shape, avg.shape)
+            cal = None
+        if cal is not None:
+            # Master dark and defect map replace the per-frame hot-pixel cleanup.
+            cal.apply(avg, out=avg)
+        elif dead_pixel_cleanup:
+            reject_hot_pixels(avg)
+        frame_u16 = np.clip(avg, 0, 65535).astype(np.uint16)
+
+        meta = {
+            "CameraName": self.camera_name,
+            "Exposure_us": int(self._current_exposure or 0),
+            "Background": "1" if background else "0",
+            "DarkCorrected": "1" if cal is not None else "0",
+            "FrameNumbers": f"{numbers[0]}-{numbers[-1]}",
+            "SkippedFrames": sum(max(0, b - a - 1) for a, b in zip(numbers, numbers[1:])),
+        }
+        if noise:
+            std = acc.std() if acc.track_variance else np.zeros_like(avg)
+            meta["PixelStd"] = std
+            meta["PixelNoise"] = float(std.mean())
+        return frame_u16, meta
+
+    # -------------------------------------------------------------------------
+    # Dark calibration
+    # -------------------------------------------------------------------------
+
+    def dark_calibration(self) -> DarkCalibration | None:
+        """Stored dark calibration for the current exposure, or None."""
+        if self._current_exposure is None:
+            return None
+        return self._dark.get(self._current_exposure)
+
+    def calibrate_dark(self, n_frames: int = DEFAULT_DARK_FRAMES, exposure_us: int | None = None,
+                       should_stop=None) -> DarkCalibration:
+        """
+        Record ``n_frames`` dark frames (shutter closed or beam blocked) and
+        store the master dark and defect map for the current exposure.
+        """
+        if self._cam is None or self._image_shape is None:
+            raise AndorControllerError("Camera not active; call activate() first")
+        if exposure_us is not None:
+            self.set_exposure(int(exposure_us))
+        exp_us = int(self._current_exposure or 0)
+        try:
+            cal = record_dark_calibration(self, self.camera_name, n_frames, exp_us,
+                                          should_stop=should_stop)
+        except RuntimeError as e:
+            raise AndorControllerError(str(e)) from e
+        path = self._dark.store.put(cal)
+        _log.info("Dark calibration at %d us: %d frames, %d defects -> %s",
+                  exp_us, cal.frames, cal.n_defects, path)
+        return cal
+
+    def _read_new(self) -> list[tuple[np.ndarray, int]]:
+        """Unread frames of the camera ring buffer with their frame indices."""
+        frames, infos = self._cam.read_multiple_images(missing_frame="skip", return_info=True)
+        out = []
+        for frame, info in zip(frames, infos):
+            idx = getattr(info, "frame_index", None)
+            out.append((frame, int(info[0] if idx is None else idx)))
+        return out
+
+    # -------------------------------------------------------------------------
+    # Streaming
+    # -------------------------------------------------------------------------
 
-        return frame.astype(np.float64, copy=False)
\ No newline at end of file
+    @property
+    def is_streaming(self) -> bool:
+        return self._stream_thread is not None
+
+    def start_stream(self, buffers: int | None = None, ring_slots: int | None = None) -> FrameRing:
+        """
+        Run the camera continuously and deliver every frame into :attr:`ring`.
+
+        ``buffers`` is the size of the camera's own ring buffer
+        (``andor.stream_buffers``); frames that overflow it are counted in
+        :attr:`frames_skipped`. Ring metadata is the camera frame number.
+        Returns the ring the frames land in.
+        """
+        if self._cam is None or self._image_shape is None:
+            raise AndorControllerError("Camera not active; call activate() first")
+        if self.is_streaming:
+            return self.ring
+        if buffers is None:
+            buffers = int(cfg_get("andor.stream_buffers", DEFAULT_STREAM_BUFFERS))
+        buffers = max(2, int(buffers))
+        slots = int(ring_slots or min(buffers, 8))
+
+        with self._acq_lock:
+            self._cam.setup_acquisition("cont", nframes=buffers)
+            self._cam.start_acquisition()
+            try:
+                # The first frame fixes the ring's dtype to the camera's native one.
+                self._cam.wait_for_frame(since="lastread", nframes=1, timeout=20.0 + (self._current_exposure or 0) / 1e6)
+                first = self._read_new()
+            except Exception as e:
+                self._cam.stop_acquisition()
+                raise AndorControllerError(f"start_stream failed: {e}") from e
+        frame0 = first[0][0]
+        if (self.ring is None or self.ring.shape != frame0.shape
+                or self.ring.dtype != frame0.dtype or self.ring.slots != slots):
+            self.ring = FrameRing(frame0.shape, frame0.dtype, max(2, slots))
+        self._last_index = -1
+        self.frames_received = 0
+        self.frames_skipped = 0
+        self._publish(first)
+
+        self._stream_stop.clear()
+        self._stream_thread = threading.Thread(
+            target=self._stream_loop, name=f"andor-{self.device_index}-stream", daemon=True
+        )
+        self._stream_thread.start()
+        _log.info("Andor[%s] streaming (%d buffers)", self.device_index, buffers)
+        return self.ring
+
+    def stop_stream(self) -> None:
+        """Stop the continuous acquisition."""
+        thread = self._stream_thread
+        if thread is None:
+            return
+        self._stream_stop.set()
+        thread.join(timeout=2.0 + (self._current_exposure or 0) / 1e6)
+        if thread.is_alive():
+            # The loop stops the acquisition itself once the driver returns.
+            _log.warning("Andor[%s] stream thread still running after stop request", self.device_index)
+            return
+        _log.info("Andor[%s] stream stopped after %d frames (%d skipped)",
+                  self.device_index, self.frames_received, self.frames_skipped)
+
+    def _publish(self, frames: list[tuple[np.ndarray, int]]) -> None:
+        for frame, idx in frames:
+            if self._last_index >= 0 and idx > self._last_index + 1:
+                self.frames_skipped += idx - self._last_index - 1
+            self._last_index = idx
+            self.ring.write(frame, idx)
+            self.frames_received += 1
+
+    def _stream_loop(self) -> None:
+        try:
+            while not self._stream_stop.is_set():
+                try:
+                    with self._acq_lock:
+                        try:
+                            self._cam.wait_for_frame(since="lastread", nframes=1, timeout=STREAM_POLL_S)
+                        except Andor.AndorTimeoutError:
+                            continue
+                        self._publish(self._read_new())
+                except Exception as e:
+                    if not self._stream_stop.is_set():
+                        _log.error("Andor[%s] stream error: %s", self.device_index, e)
+                    break
+        finally:
+            self._end_stream()
+
+    def _end_stream(self) -> None:
+        """
+        Stop the acquisition from the stream's own thread, after a stop
+        request or an error. Clearing the thread lets the next
+        :meth:`start_stream` (e.g. from the acquisition hub) restart it.
+        """
+        with self._acq_lock:
+            cam = self._cam
+            if cam is not None:
+                try:
+                    cam.stop_acquisition()
+                except Exception as e:
+                    _log.error("Andor[%s] stop_acquisition failed: %s", self.device_index, e)
+            # Cleared under the lock so set_exposure cannot restart an ended stream.
+            self._stream_thread = None
+
+    def _next_stream_frames(self, n: int, timeout_s: float) -> tuple[np.ndarray, dict]:
+        """
+        Copies of the first ``n`` frames fully exposed after this call; the
+        frame in flight may have started earlier, so it is skipped.
+        """
+        ring = self.ring
+        start = ring.last_seq + 2
+        out = np.empty((n,) + ring.shape, dtype=ring.dtype)
+        indices: list[int] = []
+        deadline = time.monotonic() + timeout_s + n * (self._current_exposure or 0) / 1e6
+        seq = start - 1
+        while len(indices) < n:
+            if ring.last_seq <= seq and ring.wait(seq, max(0.0, deadline - time.monotonic())) < 0:
+                raise AndorControllerError("Timed out waiting for a streamed frame")
+            seq += 1
+            got = ring.read(seq, out[len(indices)])
+            if got is None:
+                raise AndorControllerError("Streamed frame was overwritten before it could be read")
+            indices.append(int(got[1]))
+        skipped = sum(b - a - 1 for a, b in zip(indices, indices[1:]))
+        return out, {"frame_numbers": indices, "skipped": skipped}
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 import logging
+import threading
+import time
 
 import numpy as np
 
 from dlab.hardware.drivers import gxipy_driver as gx
+from dlab.hardware.wrappers.frame_ring import FrameRing
+from dlab.utils.config_utils import cfg_get
 
 
 _log = logging.getLogger(__name__)
@@ -15,6 +19,9 @@ MIN_EXPOSURE_US = 20
 MAX_EXPOSURE_US = 900_000
 MIN_GAIN = 0
 MAX_GAIN = 24
+DEFAULT_STREAM_BUFFERS = 8
+STREAM_TIMEOUT_MS = 1_000
+STREAM_POOL_BUFFERS = 2
 
 
 class DahengControllerError(Exception):
@@ -32,6 +39,14 @@ class DahengController:
         self.current_exposure: int | None = None
         self.current_gain: int | None = None
 
+        # Streaming state
+        self.ring: FrameRing | None = None
+        self._stream_thread: threading.Thread | None = None
+        self._stream_stop = threading.Event()
+        self._stream_free_run = True
+        self.frames_received = 0
+        self.frames_incomplete = 0
+
     def activate(self) -> None:
         """Initialize and configure the camera."""
         try:
@@ -73,6 +88,10 @@ class DahengController:
         _log.info("Daheng[%s] deactivated", self.index)
 
     def _safe_close(self) -> None:
+        try:
+            self.stop_stream()
+        except Exception:
+            pass
         try:
             if self._cam is not None:
                 try:
@@ -149,7 +168,11 @@ class DahengController:
         return self._imshape
 
     def capture_single(self, exposure_us: int, gain: int | None = None) -> np.ndarray:
-        """Capture a single frame with given exposure and optional gain."""
+        """
+        Capture a single frame with given exposure and optional gain.
+        While streaming, the next frame taken with these settings is copied
+        out of the ring instead of cycling the stream.
+        """
         if self._cam is None or self._imshape is None:
             raise DahengControllerError("Camera not active; call activate() first")
 
@@ -157,6 +180,9 @@ class DahengController:
         if gain is not None:
             self.set_gain(int(gain))
 
+        if self.is_streaming:
+            return self._next_stream_frame()
+
         self._cam.stream_on()
         try:
             self._cam.TriggerSoftware.send_command()
@@ -168,6 +194,132 @@ class DahengController:
         finally:
             self._cam.stream_off()
 
+    # -------------------------------------------------------------------------
+    # Streaming
+    # -------------------------------------------------------------------------
+
+    @property
+    def is_streaming(self) -> bool:
+        return self._stream_thread is not None
+
+    def start_stream(self, buffers: int | None = None, free_run: bool = True, ring_slots: int | None = None) -> FrameRing:
+        """
+        Keep the stream open and deliver every frame into :attr:`ring`.
+
+        ``free_run`` switches the trigger off so the sensor runs at its own
+        rate; otherwise frames are software-triggered back to back. ``buffers``
+        is the driver's acquisition buffer count (``daheng.stream_buffers``).
+        Returns the ring the frames land in.
+        """
+        if self._cam is None or self._imshape is None:
+            raise DahengControllerError("Camera not active; call activate() first")
+        if self.is_streaming:
+            return self.ring
+        if buffers is None:
+            buffers = int(cfg_get("daheng.stream_buffers", DEFAULT_STREAM_BUFFERS))
+        slots = int(ring_slots or max(2, buffers))
+
+        stream = self._cam.data_stream[0]
+        stream.set_acquisition_buffer_number(max(1, int(buffers)))
+        if free_run:
+            self._cam.TriggerMode.set(gx.GxSwitchEntry.OFF)
+            self._cam.AcquisitionMode.set(gx.GxAcquisitionModeEntry.CONTINUOUS)
+        if self.ring is None or self.ring.shape != self._imshape or self.ring.slots != slots:
+            self.ring = FrameRing(self._imshape, np.uint8, slots)
+        self.frames_received = 0
+        self.frames_incomplete = 0
+        self._stream_free_run = bool(free_run)
+        self._stream_stop.clear()
+        self._cam.stream_on()
+        # Frames are received straight into these buffers and copied once
+        # into the ring, so streaming allocates nothing per frame.
+        pool = gx.ImageBufferPool(stream.payload_size, STREAM_POOL_BUFFERS)
+
+        self._stream_thread = threading.Thread(
+            target=self._stream_loop, args=(pool,), name=f"daheng-{self.index}-stream", daemon=True
+        )
+        self._stream_thread.start()
+        _log.info("Daheng[%s] streaming (%s, %d buffers)", self.index,
+                  "free-run" if free_run else "software trigger", buffers)
+        return self.ring
+
+    def stop_stream(self) -> None:
+        """Stop streaming and restore single software-triggered captures."""
+        thread = self._stream_thread
+        if thread is None:
+            return
+        self._stream_stop.set()
+        thread.join(timeout=2 * STREAM_TIMEOUT_MS / 1e3)
+        if thread.is_alive():
+            # The loop closes the stream itself once get_image returns.
+            _log.warning("Daheng[%s] stream thread still running after stop request", self.index)
+            return
+        _log.info("Daheng[%s] stream stopped after %d frames (%d incomplete)",
+                  self.index, self.frames_received, self.frames_incomplete)
+
+    def _stream_loop(self, pool) -> None:
+        stream = self._cam.data_stream[0]
+        ring = self.ring
+        try:
+            while not self._stream_stop.is_set():
+                try:
+                    if not self._stream_free_run:
+                        self._cam.TriggerSoftware.send_command()
+                    img = stream.get_image(STREAM_TIMEOUT_MS, pool=pool)
+                    if img is None:
+                        continue
+                    with img:
+                        arr = img.get_numpy_array()
+                        if arr is None:
+                            self.frames_incomplete += 1
+                            continue
+                        ring.write(arr, (img.get_frame_id(), img.get_timestamp()))
+                    self.frames_received += 1
+                except Exception as e:
+                    if not self._stream_stop.is_set():
+                        _log.error("Daheng[%s] stream error: %s", self.index, e)
+                    break
+        finally:
+            self._end_stream()
+
+    def _end_stream(self) -> None:
+        """
+        Close the stream from its own thread, after a stop request or an
+        error, and restore software triggering. Clearing the thread lets the
+        next :meth:`start_stream` (e.g. from the acquisition hub) restart it.
+        """
+        cam = self._cam
+        if cam is not None:
+            try:
+                cam.stream_off()
+            except Exception as e:
+                _log.error("Daheng[%s] stream_off failed: %s", self.index, e)
+            try:
+                cam.TriggerMode.set(gx.GxSwitchEntry.ON)
+                cam.TriggerSource.set(gx.GxTriggerSourceEntry.SOFTWARE)
+            except Exception as e:
+                _log.error("Daheng[%s] restoring the software trigger failed: %s", self.index, e)
+        self._stream_thread = None
+
+    def _next_stream_frame(self) -> np.ndarray:
+        """
+        Copy of the first frame fully exposed after this call; the frame in
+        flight may have started earlier, so it is skipped.
+        """
+        ring = self.ring
+        target = ring.last_seq + 2
+        timeout_s = 2 * STREAM_TIMEOUT_MS / 1e3 + (self.current_exposure or 0) / 1e6
+        deadline = time.monotonic() + timeout_s
+        seq = ring.last_seq
+        while seq < target:
+            seq = ring.wait(seq, max(0.0, deadline - time.monotonic()))
+            if seq < 0:
+                raise DahengControllerError("Timed out waiting for a streamed frame")
+        got = ring.read(seq)
+        if got is None:
+            raise DahengControllerError("Streamed frame was overwritten before it could be read")
+        return got[0]
+
     @staticmethod
     def get_available_indices() -> list[int]:
         """Return list of available camera indices."""
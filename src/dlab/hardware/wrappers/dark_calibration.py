@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import datetime
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from dlab.hardware.wrappers.acquisition_hub import AcquisitionHub, FrameReader
+from dlab.hardware.wrappers.frame_accumulator import FrameAccumulator
+from dlab.utils.paths_utils import ressources_dir
+
+
+_log = logging.getLogger(__name__)
+
+DEFAULT_DARK_FRAMES = 50
+HOT_SIGMA = 6.0
+NOISY_FACTOR = 5.0
+# Floor of the noise scale [counts]: quantised 8-bit darks often have a MAD of 0.
+MIN_SIGMA = 0.5
+
+
+@dataclass
+class DarkCalibration:
+    """
+    Master dark and defect map of one camera at one exposure and gain.
+
+    :meth:`apply` subtracts the dark and replaces every defect pixel with
+    the mean of its good 4-neighbours. The neighbour indices and weights are
+    precomputed, so correcting a frame is two vectorised passes however many
+    defects there are.
+    """
+
+    camera: str
+    exposure_us: int
+    gain: int
+    dark: np.ndarray
+    defects: np.ndarray
+    frames: int
+    created: str = ""
+    _crops: Dict[Tuple[int, int, int, int], "DarkCalibration"] = field(
+        default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.dark = np.ascontiguousarray(self.dark, dtype=np.float32)
+        self.defects = np.ascontiguousarray(self.defects, dtype=bool)
+        if self.dark.shape != self.defects.shape:
+            raise ValueError(f"Dark {self.dark.shape} and defect map {self.defects.shape} differ in shape.")
+        self._idx, self._nbr, self._w = _repair_tables(self.defects)
+
+    @property
+    def key(self) -> Tuple[str, int, int]:
+        return self.camera, int(self.exposure_us), int(self.gain)
+
+    @property
+    def n_defects(self) -> int:
+        return int(self._idx.size)
+
+    def cropped(self, roi: Optional[Tuple[int, int, int, int]]) -> "DarkCalibration":
+        """Calibration of the (x0, y0, x1, y1) window, cached per ROI."""
+        if roi is None:
+            return self
+        roi = tuple(int(v) for v in roi)
+        cal = self._crops.get(roi)
+        if cal is None:
+            x0, y0, x1, y1 = roi
+            cal = DarkCalibration(self.camera, self.exposure_us, self.gain,
+                                  self.dark[y0:y1, x0:x1], self.defects[y0:y1, x0:x1],
+                                  self.frames, self.created)
+            self._crops[roi] = cal
+        return cal
+
+    def apply(self, frame: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Dark-subtracted, defect-repaired float32 copy of ``frame`` (or into ``out``)."""
+        if np.shape(frame) != self.dark.shape:
+            raise ValueError(f"Frame {np.shape(frame)} does not match the calibration {self.dark.shape}.")
+        if out is None:
+            out = np.empty(self.dark.shape, dtype=np.float32)
+        np.subtract(frame, self.dark, out=out, casting="unsafe")
+        if self._idx.size:
+            flat = out.reshape(-1)
+            flat[self._idx] = (flat[self._nbr] * self._w).sum(axis=1)
+        return out
+
+
+def _repair_tables(defects: np.ndarray):
+    """Flat indices of the defects, of their 4-neighbours and the neighbour weights."""
+    h, w = defects.shape
+    ys, xs = np.nonzero(defects)
+    idx = ys * w + xs
+    offsets = ((-1, 0), (1, 0), (0, -1), (0, 1))
+    nbr = np.zeros((idx.size, 4), dtype=np.intp)
+    good = np.zeros((idx.size, 4), dtype=bool)
+    for k, (dy, dx) in enumerate(offsets):
+        ny, nx = ys + dy, xs + dx
+        inside = (ny >= 0) & (ny < h) & (nx >= 0) & (nx < w)
+        ny, nx = np.clip(ny, 0, h - 1), np.clip(nx, 0, w - 1)
+        nbr[:, k] = ny * w + nx
+        good[:, k] = inside & ~defects[ny, nx]
+    counts = good.sum(axis=1, keepdims=True)
+    weights = np.where(good, 1.0 / np.maximum(counts, 1), 0.0).astype(np.float32)
+    return idx, nbr, weights
+
+
+def build_dark_calibration(
+    frames: Iterable[np.ndarray],
+    camera: str,
+    exposure_us: int,
+    gain: int = 0,
+    hot_sigma: float = HOT_SIGMA,
+    noisy_factor: float = NOISY_FACTOR,
+) -> DarkCalibration:
+    """
+    Master dark and defect map from dark frames, in a single pass.
+
+    A pixel is a defect if its mean is saturated, if it sits more than
+    ``hot_sigma`` robust sigmas above the median dark (hot), or if its
+    temporal noise exceeds ``noisy_factor`` times the median noise (noisy).
+    """
+    acc = FrameAccumulator(track_variance=True)
+    saturation = None
+    for frame in frames:
+        if saturation is None and np.issubdtype(np.asarray(frame).dtype, np.integer):
+            saturation = float(np.iinfo(np.asarray(frame).dtype).max)
+        acc.add(frame)
+    if acc.count == 0:
+        raise ValueError("No dark frames.")
+
+    dark = acc.mean()
+    std = acc.std()
+    med = float(np.median(dark))
+    mad = float(np.median(np.abs(dark - med)))
+    noise = float(np.median(std)) if acc.count > 1 else 0.0
+    sigma = max(1.4826 * mad, noise, MIN_SIGMA)
+
+    defects = dark > med + hot_sigma * sigma
+    if acc.count > 1:
+        defects |= std > noisy_factor * max(noise, MIN_SIGMA)
+    if saturation is not None:
+        defects |= dark >= saturation
+
+    return DarkCalibration(
+        camera=str(camera),
+        exposure_us=int(exposure_us),
+        gain=int(gain),
+        dark=dark,
+        defects=defects,
+        frames=acc.count,
+        created=datetime.datetime.now().isoformat(timespec="seconds"),
+    )
+
+
+def record_dark_calibration(
+    controller,
+    camera: str,
+    n_frames: int,
+    exposure_us: int,
+    gain: int = 0,
+    timeout_s: float = 20.0,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> DarkCalibration:
+    """
+    Record ``n_frames`` dark frames from the controller's shared stream and
+    build the calibration. The exposure and gain must already be set.
+    """
+    hub = AcquisitionHub.for_camera(controller)
+    ring = hub.acquire()
+    try:
+        reader = FrameReader(ring)
+        reader.skip(1)  # the frame in flight may predate the settings
+
+        def _frames():
+            for _ in range(max(1, int(n_frames))):
+                if should_stop is not None and should_stop():
+                    raise RuntimeError("Dark calibration aborted.")
+                got = reader.next(timeout=timeout_s + exposure_us / 1e6, copy=True)
+                if got is None:
+                    raise RuntimeError("Timed out waiting for a dark frame.")
+                yield got[1]
+
+        return build_dark_calibration(_frames(), camera, exposure_us, gain)
+    finally:
+        hub.release()
+
+
+class DarkCalibrationStore:
+    """
+    Dark calibrations keyed by (camera, exposure, gain), one .npz file each.
+
+    Loaded calibrations are kept in memory; :attr:`generation` increases on
+    every change so holders of an :class:`ActiveCalibration` pick up new
+    recordings.
+    """
+
+    def __init__(self, folder: Path) -> None:
+        self.folder = Path(folder)
+        self._cache: Dict[Tuple[str, int, int], Optional[DarkCalibration]] = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def path(self, camera: str, exposure_us: int, gain: int = 0) -> Path:
+        return self.folder / f"{camera}_{int(exposure_us)}us_g{int(gain)}.npz"
+
+    def get(self, camera: str, exposure_us: int, gain: int = 0) -> Optional[DarkCalibration]:
+        """Calibration recorded at exactly these settings, or None."""
+        key = (str(camera), int(exposure_us), int(gain))
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+        cal = self._load(self.path(*key), key)
+        with self._lock:
+            self._cache[key] = cal
+        return cal
+
+    def _load(self, path: Path, key) -> Optional[DarkCalibration]:
+        try:
+            with np.load(path) as data:
+                return DarkCalibration(
+                    camera=key[0], exposure_us=key[1], gain=key[2],
+                    dark=data["dark"], defects=data["defects"],
+                    frames=int(data["frames"]), created=str(data["created"]),
+                )
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError) as e:
+            _log.error("Could not read dark calibration %s: %s", path, e)
+            return None
+
+    def put(self, cal: DarkCalibration) -> Path:
+        path = self.path(*cal.key)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, dark=cal.dark, defects=cal.defects,
+                                frames=cal.frames, created=cal.created)
+        os.replace(tmp, path)
+        with self._lock:
+            self._cache[cal.key] = cal
+            self.generation += 1
+        return path
+
+    def remove(self, camera: str, exposure_us: int, gain: int = 0) -> None:
+        key = (str(camera), int(exposure_us), int(gain))
+        try:
+            os.remove(self.path(*key))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._cache.pop(key, None)
+            self.generation += 1
+
+    def available(self, camera: str) -> List[Tuple[int, int]]:
+        """(exposure_us, gain) of every calibration recorded for ``camera``."""
+        out = []
+        for p in self.folder.glob(f"{camera}_*us_g*.npz"):
+            exp, _, gain = p.stem[len(camera) + 1:].partition("us_g")
+            try:
+                out.append((int(exp), int(gain)))
+            except ValueError:
+                pass
+        return sorted(out)
+
+
+class ActiveCalibration:
+    """
+    The calibration matching a camera's current settings.
+
+    Re-resolved whenever the exposure or gain differ from the last lookup or
+    the store changed, so a dark recorded at another exposure is never applied.
+    """
+
+    def __init__(self, store: DarkCalibrationStore, camera: str) -> None:
+        self.store = store
+        self.camera = camera
+        self._key: Optional[Tuple[int, int, int]] = None
+        self._cal: Optional[DarkCalibration] = None
+
+    def get(self, exposure_us: int, gain: int = 0) -> Optional[DarkCalibration]:
+        key = (int(exposure_us), int(gain), self.store.generation)
+        if key != self._key:
+            self._key = key
+            self._cal = self.store.get(self.camera, exposure_us, gain)
+        return self._cal
+
+    def invalidate(self) -> None:
+        self._key = None
+        self._cal = None
+
+
+@lru_cache(maxsize=1)
+def default_calibration_store() -> DarkCalibrationStore:
+    """Store in <ressources>/camera_calibration, shared by all windows."""
+    return DarkCalibrationStore(ressources_dir() / "camera_calibration")
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class FrameAccumulator:
+    """
+    Running per-pixel mean, and optionally variance, of a stream of frames.
+
+    Frames of any dtype are added in place into float64 buffers that are
+    allocated once and reused across :meth:`reset`; no per-frame float
+    copies or running sums are kept. With ``track_variance`` the variance is
+    updated with Welford's algorithm, which stays accurate for large counts
+    and large offsets.
+    """
+
+    def __init__(self, shape: Optional[Tuple[int, ...]] = None, track_variance: bool = False) -> None:
+        self._mean: Optional[np.ndarray] = None
+        self._m2: Optional[np.ndarray] = None
+        self._delta: Optional[np.ndarray] = None
+        self._delta2: Optional[np.ndarray] = None
+        self.count = 0
+        self.track_variance = bool(track_variance)
+        if shape is not None:
+            self.reset(shape, track_variance)
+
+    @property
+    def shape(self) -> Optional[Tuple[int, ...]]:
+        return None if self._mean is None else self._mean.shape
+
+    def reset(self, shape: Optional[Tuple[int, ...]] = None, track_variance: Optional[bool] = None) -> None:
+        """Forget all frames; buffers are kept when the shape is unchanged."""
+        if track_variance is not None:
+            self.track_variance = bool(track_variance)
+        shape = self.shape if shape is None else tuple(int(s) for s in shape)
+        self.count = 0
+        if shape is None:
+            return
+        if self._mean is None or self._mean.shape != shape:
+            self._mean = np.empty(shape, dtype=np.float64)
+            self._delta = np.empty(shape, dtype=np.float64)
+            self._m2 = None
+            self._delta2 = None
+        self._mean.fill(0.0)
+        if self.track_variance:
+            if self._m2 is None:
+                self._m2 = np.empty(shape, dtype=np.float64)
+                self._delta2 = np.empty(shape, dtype=np.float64)
+            self._m2.fill(0.0)
+
+    def add(self, frame: np.ndarray) -> None:
+        """Add one frame (any dtype, same shape)."""
+        if self._mean is None:
+            self.reset(np.shape(frame))
+        elif np.shape(frame) != self._mean.shape:
+            raise ValueError(f"Frame shape {np.shape(frame)} does not match {self._mean.shape}.")
+        self.count += 1
+        # delta = x - mean; mean += delta / n
+        np.subtract(frame, self._mean, out=self._delta)
+        if self.track_variance:
+            np.multiply(self._delta, 1.0 / self.count, out=self._delta2)
+            self._mean += self._delta2
+            # m2 += delta * (x - new mean)
+            np.subtract(frame, self._mean, out=self._delta2)
+            self._delta *= self._delta2
+            self._m2 += self._delta
+        else:
+            self._delta *= 1.0 / self.count
+            self._mean += self._delta
+
+    def mean(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Mean frame, written into ``out`` (any dtype, e.g. float32) when given."""
+        if self.count == 0:
+            raise ValueError("No frames accumulated.")
+        if out is None:
+            return self._mean.copy()
+        np.copyto(out, self._mean, casting="unsafe")
+        return out
+
+    def variance(self, ddof: int = 1) -> np.ndarray:
+        """Per-pixel variance; zero while there are not more than ``ddof`` frames."""
+        if not self.track_variance:
+            raise ValueError("Variance was not tracked; reset with track_variance=True.")
+        if self.count <= ddof:
+            return np.zeros_like(self._m2)
+        return self._m2 / (self.count - ddof)
+
+    def std(self, ddof: int = 1) -> np.ndarray:
+        return np.sqrt(self.variance(ddof))
+
+
+def percentile_threshold(data: np.ndarray, q: float) -> float:
+    """
+    Value below which ``q`` percent of ``data`` lies, as an order statistic
+    (no interpolation between neighbours).
+
+    Unsigned integer frames of up to 16 bits are counted in a histogram of
+    their native values (O(N), at most 65536 bins); anything else uses
+    ``np.partition`` instead of a full sort.
+    """
+    flat = np.asarray(data).ravel()
+    if flat.size == 0:
+        raise ValueError("No data.")
+    k = min(flat.size - 1, max(0, int(np.ceil(q / 100.0 * (flat.size - 1)))))
+    if flat.dtype.kind == "u" and flat.dtype.itemsize <= 2:
+        counts = np.bincount(flat, minlength=1)
+        return float(np.searchsorted(np.cumsum(counts), k + 1))
+    return float(np.partition(flat, k)[k])
+
+
+def reject_hot_pixels(frame: np.ndarray, limit: float = 65535.0, q: Optional[float] = None) -> np.ndarray:
+    """
+    Zero negative pixels and pixels at or above ``limit`` in place; with
+    ``q`` also the pixels above the ``q``-th percentile of the frame.
+    """
+    frame[frame < 0] = 0
+    frame[frame >= limit] = 0
+    if q is not None and frame.size:
+        frame[frame > percentile_threshold(frame, q)] = 0
+    return frame
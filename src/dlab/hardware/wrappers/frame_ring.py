@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+
+class FrameRing:
+    """
+    Fixed ring of preallocated camera frames.
+
+    One producer writes frames in order; each gets the next sequence number
+    (0, 1, 2, ...) and lands in slot ``seq % slots``, overwriting the oldest
+    frame. Any number of readers can wait for new sequence numbers and copy
+    frames out. A read returns None once its frame has been overwritten, so a
+    slow reader sees gaps in the sequence instead of torn frames.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], dtype=np.uint8, slots: int = 8) -> None:
+        if slots < 2:
+            raise ValueError("A frame ring needs at least two slots.")
+        self.shape = tuple(int(s) for s in shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = int(slots)
+        self._frames = np.empty((self.slots,) + self.shape, dtype=self.dtype)
+        self._seqs = np.full(self.slots, -1, dtype=np.int64)
+        self._meta: list[Any] = [None] * self.slots
+        self._next = 0
+        self._cond = threading.Condition()
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest complete frame, -1 if none yet."""
+        return self._next - 1
+
+    # Producer side
+
+    def begin_write(self) -> Tuple[int, np.ndarray]:
+        """
+        Claim the slot of the next frame and return (seq, writable view).
+        The slot is invisible to readers until :meth:`end_write`.
+        """
+        seq = self._next
+        slot = seq % self.slots
+        with self._cond:
+            self._seqs[slot] = -1
+        return seq, self._frames[slot]
+
+    def end_write(self, seq: int, meta: Any = None) -> None:
+        slot = seq % self.slots
+        with self._cond:
+            self._meta[slot] = meta
+            self._seqs[slot] = seq
+            self._next = seq + 1
+            self._cond.notify_all()
+
+    def write(self, frame: np.ndarray, meta: Any = None) -> int:
+        """Copy ``frame`` into the next slot and publish it; returns its sequence number."""
+        seq, buf = self.begin_write()
+        np.copyto(buf, frame, casting="unsafe")
+        self.end_write(seq, meta)
+        return seq
+
+    # Reader side
+
+    def wait(self, after_seq: int = -1, timeout: Optional[float] = None) -> int:
+        """
+        Block until a frame newer than ``after_seq`` exists and return the
+        newest sequence number, or -1 on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._next - 1 <= after_seq:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return -1
+                self._cond.wait(remaining)
+            return self._next - 1
+
+    def read(self, seq: int, out: Optional[np.ndarray] = None) -> Optional[Tuple[np.ndarray, Any]]:
+        """Copy frame ``seq`` (into ``out`` when given); None if it is gone or not written yet."""
+        slot = seq % self.slots
+        with self._cond:
+            if self._seqs[slot] != seq:
+                return None
+            meta = self._meta[slot]
+        if out is None:
+            frame = self._frames[slot].copy()
+        else:
+            np.copyto(out, self._frames[slot], casting="unsafe")
+            frame = out
+        # The producer may have lapped the ring while copying.
+        with self._cond:
+            if self._seqs[slot] != seq:
+                return None
+        return frame, meta
+
+    def view(self, seq: int) -> Optional[Tuple[np.ndarray, Any]]:
+        """
+        Read-only view of frame ``seq`` without copying, or None if it is gone.
+        The producer may overwrite the slot at any time; check
+        :meth:`is_valid` after using the view and discard the result if the
+        frame is no longer there.
+        """
+        slot = seq % self.slots
+        with self._cond:
+            if self._seqs[slot] != seq:
+                return None
+            meta = self._meta[slot]
+        frame = self._frames[slot].view()
+        frame.flags.writeable = False
+        return frame, meta
+
+    def is_valid(self, seq: int) -> bool:
+        """True while frame ``seq`` is still in the ring."""
+        with self._cond:
+            return self._seqs[seq % self.slots] == seq
+
+    def oldest_seq(self) -> int:
+        """Sequence number of the oldest frame still in the ring, -1 if none."""
+        with self._cond:
+            valid = self._seqs[self._seqs >= 0]
+            return int(valid.min()) if valid.size else -1
+
+    def latest(self) -> Optional[Tuple[int, np.ndarray, Any]]:
+        """(seq, frame copy, meta) of the newest frame, or None if there is none yet."""
+        seq = self.last_seq
+        if seq < 0:
+            return None
+        got = self.read(seq)
+        if got is None:
+            return None
+        return seq, got[0], got[1]
+
+    def reset(self) -> None:
+        """Forget all frames; sequence numbers keep increasing."""
+        with self._cond:
+            self._seqs.fill(-1)
+            self._meta = [None] * self.slots
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import scipy.fft as sfft
+
+
+@dataclass
+class HologramResult:
+    """Outcome of a hologram design run."""
+
+    phase: np.ndarray  # float32 radians in (-π, π]
+    iterations: int
+    nonuniformity: float  # (max - min) / (max + min) of the normalised spot intensities
+    efficiency: float  # fraction of the power landing in the target spots
+    history: List[float] = field(default_factory=list)
+
+
+class HologramEngine:
+    """
+    Gerchberg–Saxton / weighted Gerchberg–Saxton design of spot-array holograms.
+
+    The SLM plane and the focal plane are related by a 2-D FFT of the SLM
+    shape. All work happens in one preallocated complex64 buffer updated in
+    place; scipy.fft keeps the FFT plans of that shape cached between
+    iterations and runs. Reuse one engine for several designs on the same
+    beam to also reuse the buffers.
+    """
+
+    def __init__(self, amplitude: np.ndarray, workers: int = -1) -> None:
+        self.amplitude = np.ascontiguousarray(amplitude, dtype=np.float32)
+        self.shape = self.amplitude.shape
+        self.workers = workers
+        self._field = np.empty(self.shape, dtype=np.complex64)
+        self._scratch = np.empty(self.shape, dtype=np.float32)
+        self._power = float(np.sum(self.amplitude.astype(np.float64) ** 2))
+
+    def _to_slm_plane(self) -> None:
+        """Keep the phase of the buffer and impose the beam amplitude, in place."""
+        f = self._field
+        np.abs(f, out=self._scratch)
+        np.maximum(self._scratch, np.float32(1e-30), out=self._scratch)
+        np.divide(self.amplitude, self._scratch, out=self._scratch)
+        f *= self._scratch
+
+    def run(
+        self,
+        spots: Tuple[np.ndarray, np.ndarray],
+        target: Sequence[float] | None = None,
+        iterations: int = 100,
+        tol: float = 1e-3,
+        weighted: bool = True,
+        init_phase: np.ndarray | None = None,
+        seed: int = 0,
+    ) -> HologramResult:
+        """
+        Iterate until the spot non-uniformity drops below ``tol`` or
+        ``iterations`` is reached.
+
+        ``spots`` holds the (row, column) FFT indices of the foci and
+        ``target`` their relative intensities (equal by default).
+        """
+        rows = np.asarray(spots[0], dtype=np.intp)
+        cols = np.asarray(spots[1], dtype=np.intp)
+        n = rows.size
+        if n == 0:
+            raise ValueError("At least one target spot is required.")
+        t = np.ones(n) if target is None else np.asarray(target, dtype=np.float64)
+        if t.shape != (n,) or np.any(t <= 0):
+            raise ValueError("Target intensities must be positive, one per spot.")
+        sqrt_t = np.sqrt(t / t.sum())
+
+        f = self._field
+        if init_phase is None:
+            # Superposition of the spot gratings with random relative phases:
+            # already close to the target, unlike a random phase.
+            rng = np.random.default_rng(seed)
+            f.fill(0)
+            f[rows, cols] = sqrt_t * np.exp(1j * rng.uniform(-np.pi, np.pi, n))
+            f = sfft.ifft2(f, overwrite_x=True, workers=self.workers)
+            self._field = f
+            self._to_slm_plane()
+        else:
+            np.exp(1j * np.asarray(init_phase, dtype=np.float32), out=f)
+            f *= self.amplitude
+
+        weights = sqrt_t.copy()
+        history: List[float] = []
+        nonuniformity, efficiency = 1.0, 0.0
+        done = 0
+        for it in range(1, max(1, int(iterations)) + 1):
+            f = sfft.fft2(f, overwrite_x=True, workers=self.workers)
+            spot_field = f[rows, cols].astype(np.complex128)
+            spot_amp = np.abs(spot_field) + 1e-30
+
+            ratio = spot_amp / sqrt_t
+            norm_int = ratio**2
+            nonuniformity = float((norm_int.max() - norm_int.min()) / (norm_int.max() + norm_int.min()))
+            last_efficiency = efficiency
+            efficiency = float(np.sum(spot_amp**2) / (self._power * f.size))
+            history.append(nonuniformity)
+            done = it
+            # Converged once the spots are uniform and the efficiency stalls.
+            if nonuniformity < tol and efficiency - last_efficiency < tol * efficiency:
+                f = sfft.ifft2(f, overwrite_x=True, workers=self.workers)
+                break
+
+            if weighted:
+                weights *= ratio.mean() / ratio
+            f.fill(0)
+            f[rows, cols] = (weights * spot_field / spot_amp).astype(np.complex64)
+            f = sfft.ifft2(f, overwrite_x=True, workers=self.workers)
+            self._field = f
+            self._to_slm_plane()
+
+        self._field = f
+        phase = np.angle(f).astype(np.float32)
+        return HologramResult(phase, done, nonuniformity, efficiency, history)
+
+
+def focal_plane_indices(
+    positions_m: Sequence[Tuple[float, float]],
+    shape: Tuple[int, int],
+    pixel_size: float,
+    wavelength: float,
+    focal_length: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    FFT indices of focal-plane positions (x, y) [m] behind a lens of ``focal_length``.
+
+    The focal-plane sampling is λf / (N · pixel) along each axis; positions
+    are rounded to the nearest sample and wrapped to FFT order.
+    """
+    h, w = shape
+    pos = np.asarray(positions_m, dtype=np.float64).reshape(-1, 2)
+    dx = wavelength * focal_length / (w * pixel_size)
+    dy = wavelength * focal_length / (h * pixel_size)
+    cols = np.rint(pos[:, 0] / dx).astype(np.intp) % w
+    rows = np.rint(pos[:, 1] / dy).astype(np.intp) % h
+    return rows, cols
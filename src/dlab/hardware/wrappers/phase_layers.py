@@ -0,0 +1,518 @@
+from __future__ import annotations
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import ClassVar, Tuple
+
+import numpy as np
+
+from dlab.hardware.wrappers.slm_constants import DEFAULT_BIT_DEPTH, LEVEL_DTYPE
+from dlab.hardware.wrappers.slm_geometry import SlmGeometry
+from dlab.hardware.wrappers.hologram_engine import HologramEngine, focal_plane_indices
+from dlab.hardware.wrappers.zernike_basis import get_zernike_basis, load_coefficients
+from dlab.utils.npy_cache import load_cached
+
+DEFAULT_W_L = 3.5e-3
+# Bump whenever a kernel's output changes, so on-disk caches of rendered
+# frames stop serving frames of the old kernels.
+RENDER_VERSION = 1
+
+
+# -----------------------------------------------------------------------------
+# Level helpers
+# -----------------------------------------------------------------------------
+
+
+def zero_levels(geometry: SlmGeometry) -> np.ndarray:
+    return np.zeros(geometry.shape, dtype=LEVEL_DTYPE)
+
+
+def radians_to_levels(phase: np.ndarray, bit_depth: int = DEFAULT_BIT_DEPTH) -> np.ndarray:
+    """Wrap a phase in radians to [0, 2π) and quantise it to integer levels."""
+    wrapped = np.mod(phase, 2 * np.pi)
+    wrapped *= bit_depth / (2 * np.pi)
+    np.rint(wrapped, out=wrapped)
+    return wrapped.astype(LEVEL_DTYPE)
+
+
+def as_levels(values: np.ndarray, bit_depth: int = DEFAULT_BIT_DEPTH) -> np.ndarray:
+    """Round level-valued data (files, Zernike sums) and wrap it to [0, bit_depth]."""
+    arr = np.asarray(values)
+    if not np.issubdtype(arr.dtype, np.integer):
+        arr = np.rint(arr)
+    return np.mod(arr, bit_depth + 1).astype(LEVEL_DTYPE)
+
+
+def read_phase_file(filepath: str) -> np.ndarray:
+    """
+    Read a phase map from a CSV export or an image file.
+
+    Parsed maps are kept as .npy sidecars in the cache directory, so loading
+    the same unchanged file again only memory-maps the sidecar.
+    """
+    return load_cached(filepath, _parse_phase_file, folder="phase_files")
+
+
+def _parse_phase_file(filepath: str) -> np.ndarray:
+    if filepath.endswith(".csv"):
+        try:
+            return np.loadtxt(filepath, delimiter=",", skiprows=1, usecols=np.arange(1920) + 1)
+        except Exception:
+            return np.loadtxt(filepath, delimiter=",")
+
+    import matplotlib.image as mpimg
+
+    img = mpimg.imread(filepath)
+    if img.ndim == 3:
+        img = img.sum(axis=2)
+    return img
+
+
+def _sorted_suffix_sums(items, w_L: float):
+    """
+    Sort (radius in units of w_L, value) pairs by radius and return the radii
+    [m] with the suffix sums of the values.
+
+    ``sums[np.searchsorted(radii, r, side="left")]`` is the total value of all
+    items whose radius is >= r; the trailing entry is 0 for pixels outside.
+    """
+    arr = np.asarray(items, dtype=np.float64).reshape(-1, 2)
+    order = np.argsort(arr[:, 0], kind="stable")
+    radii = arr[order, 0] * w_L
+    sums = np.zeros(len(radii) + 1)
+    sums[:-1] = np.cumsum(arr[order, 1][::-1])[::-1]
+    return radii, sums
+
+
+# -----------------------------------------------------------------------------
+# Layers
+# -----------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class PhaseLayer(ABC):
+    """
+    Pure-data description of one SLM phase layer.
+
+    Layers hold no Qt state and can be rendered from any thread or pickled
+    into a worker process. ``render`` returns LEVEL_DTYPE levels in
+    [0, bit_depth] on the pixels described by ``geometry``.
+    """
+
+    name: ClassVar[str] = ""
+
+    @abstractmethod
+    def render(self, geometry: SlmGeometry, bit_depth: int = DEFAULT_BIT_DEPTH) -> np.ndarray:
+        ...
+
+
+@dataclass(frozen=True)
+class FlatLayer(PhaseLayer):
+    name: ClassVar[str] = "Flat"
+    level: float = 0.0
+
+    def render(self, geometry, bit_depth=DEFAULT_BIT_DEPTH):
+        return np.full(geometry.shape, int(round(self.level)) % (bit_depth + 1), dtype=LEVEL_DTYPE)
+
+
+@dataclass(frozen=True, eq=False)
+class LevelsLayer(PhaseLayer):
+    """Precomputed full-frame levels, e.g. the cached rendering of a widget."""
+
+    name: ClassVar[str] = "Levels"
+    levels: np.ndarray | None = field(default=None, repr=False)
+
+    def render(self, geometry, bit_depth=DEFAULT_BIT_DEPTH):
+        if self.levels is None:
+            return zero_levels(geometry)
+        return self.levels[geometry.rows]
+
+
+@dataclass(frozen=True)
+class BackgroundLayer(PhaseLayer):
+    """Correction map read from ``filepath``; ``image`` may carry it pre-loaded."""
+
+    name: ClassVar[str] = "Background"
+    filepath: str = ""
+    image: np.ndarray | None = field(default=None, compare=False, repr=False)
+
+    def render(self, geometry, bit_depth=DEFAULT_BIT_DEPTH):
+        img = self.image
+        if img is None and self.filepath:
+            try:
+                img = read_phase_file(self.filepath)
+            except Exception as e:
+                print('Error reading file "{}": {}'.format(self.filepath, e))
+        if img is None:
+            return zero_levels(geometry)
+        return as_levels(img[geometry.rows], bit_depth)
+
+
+@dataclass(frozen=True)
+class LensLayer(PhaseLayer):
+    name: ClassVar[str] = "Lens"
+    bending_strength: float = 0.0  # 1/f [1/m]
+    wavelength_nm: float = 1030.0
+
+    def render(self, geometry, bit_depth=DEFAULT_BIT_DEPTH):
+        if self.bending_strength == 0:
+            return zero_levels(geometry)
+        focal_length = 1 / self.bending_strength
+        wavelength = self.wavelength_nm * 1e-9
+        phase_profile = geometry.R2 * (-np.pi / (wavelength * focal_length))
+        return radians_to_levels(phase_profile, bit_depth)
+
+
+@dataclass(frozen=True)
+class ZernikeLayer(PhaseLayer):
+    """Weighted sum of Zernike modes given by Noll index."""
+
+    name: ClassVar[str] = "Zernike"
+    js: Tuple[int, ...] = ()
+    coefs: Tuple[float, ...] = ()
+
+    @classmethod
+    def from_file(cls, filepath: str) -> "ZernikeLayer":
+        js, coefs = load_coefficients(filepath)
+        return cls(tuple(js), tuple(float(c) for c in coefs))
+
+    def render(self, geometry, bit_depth=DEFAULT_BIT_DEPTH):
+        if not self.js:
+            return zero_levels(geometry)
+        basis = get_zernike_basis(self.js, geometry.slm_size)
+        return as_levels(basis.combine(self.coefs, geometry.rows), bit_depth)
+
+
+@dataclass(frozen=True)
+class VortexLayer(PhaseLayer):
+    """Nested vortices given as (radius in units of w_L, topological order)."""
+
+    name: ClassVar[str] = "Vortex"
+    vortices: Tuple[Tuple[float, int], ...] = ()
+    w_L: float = DEFAULT_W_L
+
+    def render(self, geometry, bit_depth=DEFAULT_BIT_DEPTH):
+        if not self.vortices:
+            return zero_levels(geometry)
+        # A pixel at radius r sits inside every vortex with radius >= r, so its
+        # phase is (sum of those orders) * θ: one lookup of the suffix sum of
+        # orders over the sorted radii replaces a masked add per vortex.
+        radii, orders = _sorted_suffix_sums(self.vortices, self.w_L)
+        total_order = orders[np.searchsorted(radii, geometry.R, side="left")]
+        if not total_order.any():
+            return zero_levels(geometry)
+        return radians_to_levels(total_order * geometry.theta, bit_depth)
+
+
+@dataclass(frozen=True)
+class BinaryLayer(PhaseLayer):
+    name: ClassVar[str] = "Binary"
+    phi_pi: float = 1.0
+    stripes: int = 2
+    angle_deg: float = 0.0
+
+    def render(self, geometry, bit_depth=DEFAULT_BIT_DEPTH):
+        if self.stripes <= 0:
+            return zero_levels(geometry)
+        angle_rad = np.radians(self.angle_deg)
+        chip_width = geometry.chip_width
+        stripe_width = chip_width / self.stripes
+        X_rot = geometry.x[None, :] * np.cos(angle_rad) + geometry.y[:, None] * np.sin(angle_rad)
+        X_rot += chip_width / 2
+        X_rot /= stripe_width
+        stripe = np.floor(X_rot, out=X_rot)
+        # Even stripes that fall on the chip carry the phase step.
+        on = (stripe >= 0) & (stripe < self.stripes) & (np.fmod(stripe, 2) == 0)
+        level = radians_to_levels(np.array([self.phi_pi * np.pi]), bit_depth)[0]
+        return np.where(on, level, 0).astype(LEVEL_DTYPE)
+
+
+@dataclass(frozen=True)
+class PhaseJumpsLayer(PhaseLayer):
+    """Concentric phase steps given as (radius in units of w_L, phase in rad)."""
+
+    name: ClassVar[str] = "PhaseJumps"
+    jumps: Tuple[Tuple[float, float], ...] = ()
+    w_L: float = DEFAULT_W_L
+
+    def render(self, geometry, bit_depth=DEFAULT_BIT_DEPTH):
+        if not self.jumps:
+            return zero_levels(geometry)
+        # Every pixel only takes one of len(jumps) + 1 values: quantise those
+        # once and look them up by radius.
+        radii, phases = _sorted_suffix_sums(self.jumps, self.w_L)
+        lut = radians_to_levels(phases, bit_depth)
+        return lut[np.searchsorted(radii, geometry.R, side="left")]
+
+
+@dataclass(frozen=True)
+class TwoFociStochasticLayer(PhaseLayer):
+    """Random checkerboard splitting the beam into two tilted foci plus optional dumps."""
+
+    name: ClassVar[str] = "TwoFociStochastic"
+    wl_nm: float = 1030.0
+    f_focus_m: float = 0.175
+    sep_um: float = 50.0
+    dphi_pi: float = 0.0
+    pitch_um: float = 128.0
+    angle_deg: float = 0.0
+    alpha: float = 0.5
+    alpha_dump_a: float = 0.0
+    alpha_dump_b: float = 0.0
+    dump_a: float = 10.0
+    dump_b: float = 10.0
+    tilt_a: bool = True
+    tilt_b: bool = True
+    seed: int = 12345
+
+    def render(self, geometry, bit_depth=DEFAULT_BIT_DEPTH):
+        wl = self.wl_nm * 1e-9
+        f_focus = self.f_focus_m
+        D = self.sep_um * 1e-6
+        dphi = self.dphi_pi * np.pi
+        pitch = self.pitch_um * 1e-6
+        alpha = self.alpha
+
+        if wl <= 0 or f_focus == 0 or pitch <= 0:
+            return zero_levels(geometry)
+        if not (0 <= alpha <= 1 and 0 <= self.alpha_dump_a <= 1 and 0 <= self.alpha_dump_b <= 1):
+            return zero_levels(geometry)
+
+        # Cells and the tilt coordinate are defined on the whole chip and
+        # sliced to the rows being rendered.
+        U = _rotated_coordinate(geometry.full, float(self.angle_deg))[geometry.rows]
+
+        k0 = 2 * np.pi / wl
+        kt = k0 * D / (2 * f_focus)
+
+        sa, sb = np.sqrt(1 - alpha), np.sqrt(alpha)
+        xiA = 0.0 if sa + sb == 0 else sa / (sa + sb)
+
+        # Classify the checker cells (main A, dump A, main B, dump B) at cell
+        # resolution and only expand the class index to the full frame.
+        side_draw, int_draw, row_cell, cols = _checker_cells(geometry.full, pitch, int(self.seed))
+        sideA = side_draw < xiA
+        cell_class = np.where(
+            sideA,
+            np.where(int_draw < np.sqrt(1 - self.alpha_dump_a), 0, 1),
+            np.where(int_draw < np.sqrt(1 - self.alpha_dump_b), 2, 3),
+        ).astype(np.uint8)
+        pixel_class = np.repeat(cell_class[row_cell[geometry.rows]], cols, axis=1)
+
+        slope = np.array(
+            [
+                kt if self.tilt_a else 0.0,
+                self.dump_a * kt,
+                -kt if self.tilt_b else 0.0,
+                -self.dump_b * kt,
+            ]
+        )
+        offset = np.array([0.0, 0.0, dphi, 0.0])
+        phase = slope[pixel_class] * U + offset[pixel_class]
+        return radians_to_levels(phase, bit_depth)
+
+
+@lru_cache(maxsize=8)
+def _checker_cells(geometry: SlmGeometry, pitch: float, seed: int):
+    """
+    Random draws of the checker cells of a TwoFociStochastic layer.
+
+    Returns the side and intensity draws, one per cell in row-major order,
+    the cell row of every pixel row and the number of pixel columns each
+    cell spans.
+    """
+    ix = np.floor((geometry.x - geometry.x.min()) / pitch).astype(np.int64)
+    iy = np.floor((geometry.y - geometry.y.min()) / pitch).astype(np.int64)
+    _, cols = np.unique(ix, return_counts=True)
+    _, rows = np.unique(iy, return_counts=True)
+
+    rng = np.random.default_rng(seed)
+    n_cells = rows.size * cols.size
+    side_draw = rng.random(n_cells).reshape(rows.size, cols.size)
+    int_draw = rng.random(n_cells).reshape(rows.size, cols.size)
+    row_cell = np.repeat(np.arange(rows.size), rows)
+    for arr in (side_draw, int_draw, row_cell, cols):
+        arr.setflags(write=False)
+    return side_draw, int_draw, row_cell, cols
+
+
+@lru_cache(maxsize=8)
+def _rotated_coordinate(geometry: SlmGeometry, angle_deg: float) -> np.ndarray:
+    """Coordinate along the direction at ``angle_deg`` from the x axis [m]."""
+    ang = np.deg2rad(angle_deg)
+    U = geometry.x[None, :] * np.cos(ang) + geometry.y[:, None] * np.sin(ang)
+    U.setflags(write=False)
+    return U
+
+
+@dataclass(frozen=True)
+class HologramLayer(PhaseLayer):
+    """
+    Spot-array hologram designed by (weighted) Gerchberg–Saxton iterations.
+
+    Spots are (x [µm], y [µm], relative intensity) in the focal plane of a
+    lens of ``f_focus_m`` behind the SLM, for a Gaussian beam of radius
+    ``w_L``. The design runs once per parameter set and is cached.
+    """
+
+    name: ClassVar[str] = "Hologram"
+    spots: Tuple[Tuple[float, float, float], ...] = ()
+    wl_nm: float = 1030.0
+    f_focus_m: float = 0.175
+    w_L: float = DEFAULT_W_L
+    iterations: int = 100
+    tol: float = 1e-3
+    weighted: bool = True
+    seed: int = 0
+
+    def render(self, geometry, bit_depth=DEFAULT_BIT_DEPTH):
+        if not self.spots or self.wl_nm <= 0 or self.f_focus_m <= 0 or self.w_L <= 0:
+            return zero_levels(geometry)
+        return _hologram_levels(self, geometry.full, bit_depth)[geometry.rows]
+
+
+_HOLOGRAM_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=2)
+def _hologram_engine(geometry: SlmGeometry, w_L: float) -> HologramEngine:
+    return HologramEngine(np.exp(-geometry.R2 / w_L**2))
+
+
+@lru_cache(maxsize=4)
+def _hologram_levels(layer: HologramLayer, geometry: SlmGeometry, bit_depth: int) -> np.ndarray:
+    spots = np.asarray(layer.spots, dtype=np.float64).reshape(-1, 3)
+    pixel_size = geometry.chip_width / geometry.shape[1]
+    indices = focal_plane_indices(
+        spots[:, :2] * 1e-6, geometry.shape, pixel_size, layer.wl_nm * 1e-9, layer.f_focus_m
+    )
+    # One engine (and its buffers) per beam; designs run one at a time.
+    with _HOLOGRAM_LOCK:
+        result = _hologram_engine(geometry, float(layer.w_L)).run(
+            indices,
+            target=spots[:, 2],
+            iterations=layer.iterations,
+            tol=layer.tol,
+            weighted=layer.weighted,
+            seed=layer.seed,
+        )
+    levels = radians_to_levels(result.phase, bit_depth)
+    levels.setflags(write=False)
+    return levels
+
+
+LAYER_TYPES = {
+    cls.name: cls
+    for cls in (
+        FlatLayer,
+        BackgroundLayer,
+        LensLayer,
+        ZernikeLayer,
+        VortexLayer,
+        BinaryLayer,
+        PhaseJumpsLayer,
+        TwoFociStochasticLayer,
+        HologramLayer,
+    )
+}
+
+
+def render_sum(
+    layers, geometry: SlmGeometry, bit_depth: int = DEFAULT_BIT_DEPTH, base: np.ndarray | None = None
+) -> np.ndarray:
+    """Render and sum layers (onto an optional base of levels), wrapping once at the end."""
+    total = np.zeros(geometry.shape, dtype=LEVEL_DTYPE) if base is None else np.array(base, dtype=LEVEL_DTYPE)
+    for layer in layers:
+        total += layer.render(geometry, bit_depth)
+    np.remainder(total, bit_depth + 1, out=total)
+    return total
+
+
+MIN_TILE_ROWS = 32
+
+
+# One pool for all tiled renders, grown (and the old one shut down) when a
+# render asks for more threads than it has.
+_TILE_POOL: ThreadPoolExecutor | None = None
+_TILE_POOL_SIZE = 0
+_TILE_POOL_LOCK = threading.Lock()
+
+
+def _submit_tiles(fn, n: int) -> list[Future]:
+    """Submit ``n`` calls of ``fn`` to the shared tile pool, growing it to ``n`` threads if needed."""
+    global _TILE_POOL, _TILE_POOL_SIZE
+    with _TILE_POOL_LOCK:
+        if _TILE_POOL is None or _TILE_POOL_SIZE < n:
+            if _TILE_POOL is not None:
+                _TILE_POOL.shutdown(wait=False)
+            _TILE_POOL = ThreadPoolExecutor(max_workers=n, thread_name_prefix="slm-tile")
+            _TILE_POOL_SIZE = n
+        return [_TILE_POOL.submit(fn) for _ in range(n)]
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def render_tiled(
+    layers,
+    geometry: SlmGeometry,
+    bit_depth: int = DEFAULT_BIT_DEPTH,
+    base: np.ndarray | None = None,
+    workers: int | None = None,
+) -> np.ndarray:
+    """
+    Same result as :func:`render_sum`, evaluated on bands of rows in a thread pool.
+
+    The layer kernels are NumPy expressions that release the GIL, so the
+    tiles render concurrently on ``workers`` threads: the calling thread and
+    ``workers - 1`` threads of a shared pool. The first tile is rendered on
+    the calling thread to build the shared geometry and basis caches only once.
+    """
+    layers = list(layers)
+    workers = default_workers() if workers is None else max(1, int(workers))
+    h = geometry.shape[0]
+    n_tiles = min(2 * workers, max(1, h // MIN_TILE_ROWS))
+    if workers == 1 or n_tiles == 1:
+        return render_sum(layers, geometry, bit_depth, base)
+
+    out = np.zeros(geometry.shape, dtype=LEVEL_DTYPE) if base is None else np.array(base, dtype=LEVEL_DTYPE)
+    r0 = geometry.rows.start
+    edges = np.linspace(0, h, n_tiles + 1).astype(int)
+
+    def render(i: int) -> None:
+        start, stop = int(edges[i]), int(edges[i + 1])
+        tile = geometry.tile(r0 + start, r0 + stop)
+        band = out[start:stop]
+        for layer in layers:
+            band += layer.render(tile, bit_depth)
+        np.remainder(band, bit_depth + 1, out=band)
+
+    render(0)
+    pending = iter(range(1, n_tiles))  # shared; each tile is taken by one thread
+
+    def drain() -> None:
+        for i in pending:
+            render(i)
+
+    helpers = _submit_tiles(drain, workers - 1)
+    drain()
+    for f in helpers:
+        # Helpers that never started have nothing left to do; cancelling them
+        # also keeps a render issued from a busy pool thread from deadlocking.
+        if not f.cancel():
+            f.result()
+    return out
+
+
+def prerender(layer: PhaseLayer, geometry: SlmGeometry, bit_depth: int = DEFAULT_BIT_DEPTH) -> LevelsLayer:
+    """``layer`` rendered once into a :class:`LevelsLayer`; those pass through unchanged."""
+    if isinstance(layer, LevelsLayer):
+        return layer
+    levels = render_tiled([layer], geometry, bit_depth)
+    levels.setflags(write=False)
+    return LevelsLayer(levels)
@@ -1,8 +1,10 @@
 from __future__ import annotations
 import os
+from abc import ABCMeta, abstractmethod
 import numpy as np
 
 from PyQt5 import QtWidgets
+from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
     QFileDialog,
     QVBoxLayout,
@@ -17,17 +19,33 @@ from PyQt5.QtWidgets import (
 )
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.image as mpimg
-
-from dlab.hardware.wrappers.slm_controller import (
+from dlab.hardware.wrappers.slm_constants import (
     DEFAULT_SLM_SIZE,
     DEFAULT_CHIP_W,
     DEFAULT_CHIP_H,
     DEFAULT_PIXEL_SIZE,
     DEFAULT_BIT_DEPTH,
+    LEVEL_DTYPE,
+)
+from dlab.hardware.wrappers.slm_geometry import SlmGeometry, get_geometry
+from dlab.hardware.wrappers.zernike_basis import load_coefficients
+from dlab.hardware.wrappers.phase_layers import (
+    PhaseLayer,
+    LevelsLayer,
+    FlatLayer,
+    BackgroundLayer,
+    LensLayer,
+    ZernikeLayer,
+    VortexLayer,
+    BinaryLayer,
+    PhaseJumpsLayer,
+    TwoFociStochasticLayer,
+    HologramLayer,
+    as_levels,
+    read_phase_file,
+    render_tiled,
 )
 import subprocess
-import math
 from dlab.utils.config_utils import cfg_get
 
 slm_size = DEFAULT_SLM_SIZE
@@ -39,6 +57,15 @@ bit_depth = DEFAULT_BIT_DEPTH
 _w_L_config = cfg_get("slm.beam_radius_on_slm")
 w_L = float(_w_L_config) if isinstance(_w_L_config, (int, float, str)) else 3.5e-3
 
+
+def _geometry() -> SlmGeometry:
+    return get_geometry(slm_size, chip_width, chip_height)
+
+
+def _zero_levels() -> np.ndarray:
+    return np.zeros(slm_size, dtype=LEVEL_DTYPE)
+
+
 phase_types = [
     "Background",
     "Lens",
@@ -47,30 +74,124 @@ phase_types = [
     "Vortex",
     "PhaseJumps",
     "TwoFociStochastic",
+    "Hologram",
 ]
 
 
-class BaseTypeWidget(QtWidgets.QWidget):
+class _WidgetABCMeta(type(QtWidgets.QWidget), ABCMeta):
+    """Metaclass that lets a Qt widget base class declare abstract methods."""
+
+
+class BaseTypeWidget(QtWidgets.QWidget, metaclass=_WidgetABCMeta):
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._version = 0
+        self._watching_inputs = False
+        self._cached_levels: np.ndarray | None = None
+        self._cached_key = None
+
+    # -------------------------------------------------------------------------
+    # Dirty tracking
+    # -------------------------------------------------------------------------
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def mark_dirty(self, *_):
+        """Invalidate the cached levels of this layer."""
+        self._version += 1
+
+    def _watch_inputs(self):
+        # Direct connections so that edits made from a scan worker thread
+        # invalidate the cache before that thread composes the next frame.
+        if self._watching_inputs:
+            return
+        for le in self.findChildren(QLineEdit):
+            le.textChanged.connect(self.mark_dirty, Qt.DirectConnection)
+        for cb in self.findChildren(QCheckBox):
+            cb.toggled.connect(self.mark_dirty, Qt.DirectConnection)
+        for combo in self.findChildren(QComboBox):
+            combo.currentIndexChanged.connect(self.mark_dirty, Qt.DirectConnection)
+        self._watching_inputs = True
+
+    def _cache_token(self):
+        """Extra state outside of the widget that invalidates the cache when it changes."""
+        return None
+
+    def snapshot(self) -> PhaseLayer:
+        """
+        Headless layer of the current inputs, so the rendering can happen off
+        the GUI thread; up-to-date cached levels come wrapped in a LevelsLayer.
+        """
+        self._watch_inputs()
+        if self._cached_levels is not None and self._cached_key == (self._version, self._cache_token()):
+            return LevelsLayer(self._cached_levels)
+        try:
+            return self.to_layer()
+        except ValueError as e:
+            print(f"{self.name}: {e}")
+            return FlatLayer()
+
+    def cache_key(self):
+        """JSON-serialisable description of the rendered layer, for on-disk caches."""
+        return [self.name, self.save_(), self._cache_token()]
+
+    def levels(self) -> np.ndarray:
+        """Return the phase as LEVEL_DTYPE levels in [0, bit_depth], recomputed only when changed."""
+        self._watch_inputs()
+        key = (self._version, self._cache_token())
+        if self._cached_levels is None or key != self._cached_key:
+            lv = self.phase()
+            if lv.dtype != LEVEL_DTYPE:
+                lv = as_levels(lv, bit_depth)
+            lv = np.ascontiguousarray(lv)
+            lv.setflags(write=False)
+            self._cached_levels = lv
+            self._cached_key = key
+        return self._cached_levels
+
+    # -------------------------------------------------------------------------
+    # Layer model
+    # -------------------------------------------------------------------------
+
+    def _text(self, field: str, overrides: dict | None = None) -> str:
+        """Text of the input ``field``, or its override when one is given."""
+        if overrides and field in overrides:
+            return str(overrides[field])
+        return getattr(self, field).text()
+
+    @abstractmethod
+    def to_layer(self, overrides: dict | None = None) -> PhaseLayer:
+        """
+        Snapshot the widget inputs as a headless layer.
+
+        ``overrides`` maps input attribute names (e.g. ``"le_ben"``) to text
+        used in place of the widget's current value, so scans can build
+        layers without touching the widgets. Raises ValueError on invalid
+        input.
+        """
+
+    def phase(self):
+        try:
+            layer = self.to_layer()
+        except ValueError as e:
+            print(f"{self.name}: {e}")
+            return _zero_levels()
+        return render_tiled([layer], _geometry(), bit_depth)
+
+    # -------------------------------------------------------------------------
+    # File I/O
+    # -------------------------------------------------------------------------
 
     def _read_file(self, filepath):
         if not filepath:
             return
         try:
-            if filepath.endswith(".csv"):
-                try:
-                    self.img = np.loadtxt(
-                        filepath, delimiter=",", skiprows=1, usecols=np.arange(1920) + 1
-                    )
-                except Exception:
-                    self.img = np.loadtxt(filepath, delimiter=",")
-            else:
-                self.img = mpimg.imread(filepath)
-                if self.img.ndim == 3:
-                    self.img = self.img.sum(axis=2)
+            self.img = read_phase_file(filepath)
         except Exception as e:
             print('Error reading file "{}": {}'.format(filepath, e))
+        self.mark_dirty()
 
     def open_file(self):
         filepath, _ = QFileDialog.getOpenFileName(
@@ -104,12 +225,13 @@ class TypeFlat(BaseTypeWidget):
         hlayout.addWidget(lbl)
         hlayout.addWidget(self.le_flat)
 
-    def phase(self):
+    def to_layer(self, overrides=None):
+        text = self._text("le_flat", overrides)
         try:
-            phi = float(self.le_flat.text()) if self.le_flat.text() != "" else 0
+            phi = float(text) if text != "" else 0
         except ValueError:
             phi = 0
-        return np.ones(slm_size) * phi
+        return FlatLayer(level=phi)
 
     def save_(self):
         return {"flat_phase": self.le_flat.text()}
@@ -123,6 +245,7 @@ class TypeBackground(BaseTypeWidget):
         super().__init__(parent)
         self.name = "Background"
         self.img = None
+        self._img_token = None  # file token self.img was read under
         layout = QVBoxLayout(self)
         group = QGroupBox("Background Correction File")
         layout.addWidget(group)
@@ -146,8 +269,33 @@ class TypeBackground(BaseTypeWidget):
             self._read_file(filepath)
             self.lbl_file.setText(filepath)
 
-    def phase(self):
-        return self.img if self.img is not None else np.zeros(slm_size)
+    def _read_file(self, filepath):
+        super()._read_file(filepath)
+        self._img_token = self._file_token(filepath)
+
+    def to_layer(self, overrides=None):
+        filepath = self.lbl_file.text()
+        if filepath and self._img_token != self._cache_token():
+            # The file changed on disk since it was read; reload it so the
+            # rendered levels match the cache token.
+            self._img_token = self._file_token(filepath)
+            try:
+                self.img = read_phase_file(filepath)
+            except Exception as e:
+                print('Error reading file "{}": {}'.format(filepath, e))
+                self.img = None
+        return BackgroundLayer(filepath=filepath, image=self.img)
+
+    @staticmethod
+    def _file_token(filepath):
+        try:
+            st = os.stat(filepath)
+            return (filepath, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return filepath
+
+    def _cache_token(self):
+        return self._file_token(self.lbl_file.text())
 
     def save_(self):
         return {"filepath": self.lbl_file.text()}
@@ -260,29 +408,26 @@ class TypeLens(BaseTypeWidget):
             print("Invalid entry in focal length calculation.")
         self.updating = False
 
-    def phase(self):
+    def to_layer(self, overrides=None):
+        # Overridden focus shift / focal length go through the same linking
+        # rules as update_ben and update_ben_from_focal.
+        overrides = overrides or {}
+        mode = self.cb_mode.currentText()
         try:
-            bending_strength = float(self.le_ben.text())
-            wavelength = float(self.le_wavelength.text()) * 1e-9
-        except ValueError:
-            print("Invalid input for bending strength or wavelength.")
-            return np.zeros(slm_size)
-
-        if bending_strength == 0:
-            return np.zeros(slm_size)
-
-        focal_length = 1 / bending_strength
-        x = np.linspace(-chip_width / 2, chip_width / 2, slm_size[1])
-        y = np.linspace(-chip_height / 2, chip_height / 2, slm_size[0])
-        X, Y = np.meshgrid(x, y)
-        R_squared = X**2 + Y**2
-
-        phase_profile = (-np.pi * R_squared) / (wavelength * focal_length)
-
-        phase_profile = np.mod(phase_profile, 2 * np.pi)  # wrap phase to [0, 2pi]
-        phase_profile = phase_profile / (2 * np.pi) * bit_depth
-
-        return phase_profile
+            if "le_focus" in overrides and mode == "Bending Strength":
+                slope = float(self._text("le_slope", overrides))
+                zero_ref = float(self._text("le_zero", overrides))
+                focus_shift = float(overrides["le_focus"])
+                bending_strength = round(zero_ref + focus_shift / slope, 3)
+            elif "le_focal" in overrides and mode == "Focal Length":
+                focal_length = float(overrides["le_focal"])
+                bending_strength = round(1 / focal_length if focal_length != 0 else 0, 3)
+            else:
+                bending_strength = float(self._text("le_ben", overrides))
+            wavelength_nm = float(self._text("le_wavelength", overrides))
+        except (ValueError, ZeroDivisionError):
+            raise ValueError("Invalid input for bending strength or wavelength.")
+        return LensLayer(bending_strength=bending_strength, wavelength_nm=wavelength_nm)
 
     def save_(self):
         return {
@@ -355,11 +500,15 @@ class TypeZernike(BaseTypeWidget):
             "Text Files (*.txt);;All Files (*)",
         )
         if filepath:
-            self.filepath = filepath
-            self.lbl_file.setText(filepath)
-            self.plot_data()
-            self.btn_modify.setEnabled(True)
-            self.btn_update.setEnabled(True)
+            self.set_file(filepath)
+
+    def set_file(self, filepath: str):
+        self.filepath = filepath
+        self.lbl_file.setText(filepath)
+        self.plot_data()
+        self.btn_modify.setEnabled(True)
+        self.btn_update.setEnabled(True)
+        self.mark_dirty()
 
     def modify_file(self):
         if os.path.isfile(self.filepath):
@@ -369,15 +518,21 @@ class TypeZernike(BaseTypeWidget):
                 subprocess.Popen(["notepad", self.filepath])
 
     def update_data(self):
+        self.mark_dirty()
         self.plot_data()
 
+    def _cache_token(self):
+        try:
+            st = os.stat(self.filepath)
+            return (self.filepath, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return self.filepath
+
     def plot_data(self):
         if not self.filepath:
             return
         try:
-            data = np.loadtxt(self.filepath, skiprows=1)
-            js = data[:, 0].astype(int)
-            coefs = data[:, 1]
+            js, coefs = load_coefficients(self.filepath)
             self._update_plot(js, coefs)
         except Exception as e:
             print("Error loading file:", e)
@@ -392,31 +547,13 @@ class TypeZernike(BaseTypeWidget):
         self.ax.grid(True)
         self.canvas.draw()
 
-    def phase(self):
+    def to_layer(self, overrides=None):
         if not self.filepath:
-            print("No file loaded for Zernike coefficients.")
-            return np.zeros(slm_size)
+            raise ValueError("No file loaded for Zernike coefficients.")
         try:
-            data = np.loadtxt(self.filepath, skiprows=1)
-            js = data[:, 0].astype(int)
-            zernike_coefs = data[:, 1]
-
-            size = 1.92
-            N = slm_size[1]
-            X, Y = self._make_xy_grid(N, diameter=size)
-            r, t = self._cart_to_polar(X, Y, diameter=size)
-
-            nms = [self._noll_to_nm(int(j)) for j in js]
-            zernike_basis = [self._zernike_nm(n, m, r, t) for (n, m) in nms]
-            phase = self._sum_of_2d_modes(zernike_basis, zernike_coefs)
-
-            start_row = (slm_size[1] - 1200) // 2
-            phase = phase[start_row : start_row + 1200, :]
-
-            return phase
+            return ZernikeLayer.from_file(self.filepath)
         except Exception as e:
-            print("Error computing Zernike phase:", e)
-            return np.zeros(slm_size)
+            raise ValueError(f"Error loading Zernike coefficients: {e}")
 
     def save_(self):
         return {"filepath": self.lbl_file.text()}
@@ -424,72 +561,12 @@ class TypeZernike(BaseTypeWidget):
     def load_(self, settings):
         self.filepath = settings.get("filepath", "")
         self.lbl_file.setText(self.filepath)
+        self.mark_dirty()
         self.plot_data()
         if self.filepath:
             self.btn_modify.setEnabled(True)
             self.btn_update.setEnabled(True)
 
-    # -------------------------------------------------------------------------
-    # Zernike math helpers
-    # -------------------------------------------------------------------------
-
-    @staticmethod
-    def _make_xy_grid(n: int, diameter: float):
-        x = np.linspace(-diameter / 2, diameter / 2, n)
-        X, Y = np.meshgrid(x, x, indexing="xy")
-        return X, Y
-
-    @staticmethod
-    def _cart_to_polar(X: np.ndarray, Y: np.ndarray, diameter: float):
-        r = np.sqrt(X * X + Y * Y) / (diameter / 2)
-        t = np.arctan2(Y, X)
-        return r, t
-
-    @staticmethod
-    def _noll_to_nm(j: int):
-        if j < 1:
-            raise ValueError("Noll indices start at 1.")
-        n = 0
-        while (n * (n + 1)) // 2 + 1 <= j:
-            n += 1
-        n -= 1
-        j_start = (n * (n + 1)) // 2 + 1
-        k = j - j_start
-        m = -n + 2 * k
-        return n, m
-
-    @staticmethod
-    def _zernike_radial(n: int, m_abs: int, r: np.ndarray):
-        if (n - m_abs) % 2 != 0:
-            return np.zeros_like(r)
-        R = np.zeros_like(r, dtype=float)
-        s_max = (n - m_abs) // 2
-        for s in range(s_max + 1):
-            num = (-1) ** s * math.factorial(n - s)
-            den = (
-                math.factorial(s)
-                * math.factorial((n + m_abs) // 2 - s)
-                * math.factorial((n - m_abs) // 2 - s)
-            )
-            R += (num / den) * r ** (n - 2 * s)
-        return R
-
-    @staticmethod
-    def _zernike_nm(n: int, m: int, r: np.ndarray, t: np.ndarray):
-        m_abs = abs(m)
-        R = TypeZernike._zernike_radial(n, m_abs, r)
-        Z = np.where(
-            r <= 1.0, R * (np.cos(m_abs * t) if m >= 0 else np.sin(m_abs * t)), 0.0
-        )
-        return Z
-
-    @staticmethod
-    def _sum_of_2d_modes(modes: list[np.ndarray], coefs: np.ndarray):
-        out = np.zeros_like(modes[0], dtype=float)
-        for Z, c in zip(modes, coefs):
-            out += c * Z
-        return out
-
 
 class TypeVortex(BaseTypeWidget):
     def __init__(self, parent=None):
@@ -525,6 +602,7 @@ class TypeVortex(BaseTypeWidget):
             radius = float(self.le_radius.text())
             order = int(self.le_order.text())
             self.vortices.append((radius, order))
+            self.mark_dirty()
             self.update_vortex_display()
             self.le_radius.clear()
             self.le_order.setText("1")
@@ -534,6 +612,7 @@ class TypeVortex(BaseTypeWidget):
     def remove_last_vortex(self):
         if self.vortices:
             self.vortices.pop()
+            self.mark_dirty()
             self.update_vortex_display()
 
     def update_vortex_display(self):
@@ -545,25 +624,16 @@ class TypeVortex(BaseTypeWidget):
             )
             self.lbl_vortices.setText(text)
 
-    def phase(self):
-        x = np.linspace(-chip_width, chip_width, slm_size[1])
-        y = np.linspace(-chip_height, chip_height, slm_size[0])
-        X, Y = np.meshgrid(x, y)
-        rho = np.sqrt(X**2 + Y**2) / 2
-        phase_profile = np.zeros(slm_size)
-        for radius, order in self.vortices:
-            radius_scaled = radius * w_L
-            vortex_mask = rho <= radius_scaled
-            theta = np.arctan2(Y, X)
-            vortex_phase = (order * theta) % (2 * np.pi)
-            phase_profile[vortex_mask] += vortex_phase[vortex_mask]
-        return (phase_profile % (2 * np.pi)) * (bit_depth / (2 * np.pi))
+    def to_layer(self, overrides=None):
+        vortices = tuple((float(r), int(o)) for r, o in self.vortices)
+        return VortexLayer(vortices=vortices, w_L=w_L)
 
     def save_(self):
         return {"vortices": self.vortices}
 
     def load_(self, settings):
         self.vortices = settings.get("vortices", [])
+        self.mark_dirty()
         self.update_vortex_display()
 
 
@@ -588,28 +658,14 @@ class TypeBinary(BaseTypeWidget):
         self.le_angle = QLineEdit("0")
         grid.addWidget(self.le_angle, 2, 1)
 
-    def phase(self):
+    def to_layer(self, overrides=None):
         try:
-            phi = float(self.le_phi.text()) * np.pi
-            stripes = int(self.le_stripes.text())
-            angle_deg = float(self.le_angle.text())
-            angle_rad = np.radians(angle_deg)
+            phi_pi = float(self._text("le_phi", overrides))
+            stripes = int(self._text("le_stripes", overrides))
+            angle_deg = float(self._text("le_angle", overrides))
         except ValueError:
-            print("Invalid parameter values.")
-            return np.zeros(slm_size)
-        phase_mat = np.zeros(slm_size)
-        x = np.linspace(-chip_width / 2, chip_width / 2, slm_size[1])
-        y = np.linspace(-chip_height / 2, chip_height / 2, slm_size[0])
-        X, Y = np.meshgrid(x, y)
-        X_rot = X * np.cos(angle_rad) + Y * np.sin(angle_rad)
-        stripe_width = chip_width / stripes
-        for i in range(stripes):
-            if i % 2 == 0:
-                indices = (X_rot >= i * stripe_width - chip_width / 2) & (
-                    X_rot < (i + 1) * stripe_width - chip_width / 2
-                )
-                phase_mat[indices] = phi
-        return (phase_mat % (2 * np.pi)) * (bit_depth / (2 * np.pi))
+            raise ValueError("Invalid parameter values.")
+        return BinaryLayer(phi_pi=phi_pi, stripes=stripes, angle_deg=angle_deg)
 
     def save_(self):
         return {
@@ -658,6 +714,7 @@ class TypePhaseJumps(BaseTypeWidget):
             distance = float(self.le_distance.text())
             phase_value = float(self.le_phase.text()) * np.pi
             self.phase_jumps.append((distance, phase_value))
+            self.mark_dirty()
             self.update_jump_display()
             self.le_distance.clear()
             self.le_phase.clear()
@@ -667,6 +724,7 @@ class TypePhaseJumps(BaseTypeWidget):
     def remove_last_phase_jump(self):
         if self.phase_jumps:
             self.phase_jumps.pop()
+            self.mark_dirty()
             self.update_jump_display()
 
     def update_jump_display(self):
@@ -681,22 +739,16 @@ class TypePhaseJumps(BaseTypeWidget):
             )
             self.lbl_jumps.setText(text)
 
-    def phase(self):
-        x = np.linspace(-chip_width, chip_width, slm_size[1])
-        y = np.linspace(-chip_height, chip_height, slm_size[0])
-        X, Y = np.meshgrid(x, y)
-        rho = np.sqrt(X**2 + Y**2) / 2
-        phase_profile = np.zeros_like(X)
-        for distance, phase_value in self.phase_jumps:
-            indices = rho <= distance * w_L
-            phase_profile[indices] += phase_value
-        return (phase_profile % (2 * np.pi)) * (bit_depth / (2 * np.pi))
+    def to_layer(self, overrides=None):
+        jumps = tuple((float(d), float(v)) for d, v in self.phase_jumps)
+        return PhaseJumpsLayer(jumps=jumps, w_L=w_L)
 
     def save_(self):
         return {"phase_jumps": self.phase_jumps}
 
     def load_(self, settings):
         self.phase_jumps = settings.get("phase_jumps", [])
+        self.mark_dirty()
         self.update_jump_display()
 
 
@@ -773,70 +825,32 @@ class TypeTwoFociStochastic(BaseTypeWidget):
         grid.addWidget(self.cb_noB, row, 0, 1, 2)
         row += 1
 
-    def phase(self):
+    def to_layer(self, overrides=None):
         try:
-            wl = float(self.le_wl.text()) * 1e-9
-            f_focus = float(self.le_f.text())
-            D = float(self.le_sep.text()) * 1e-6
-            dphi = float(self.le_dphi_pi.text()) * np.pi
-            pitch = float(self.le_pitch.text()) * 1e-6
-            angle_deg = float(self.le_angle.text())
-            alpha = float(self.le_alpha.text())
-            alpha_dump_a = float(self.le_alpha_dump_A.text())
-            alpha_dump_b = float(self.le_alpha_dump_B.text())
-            dumpA = float(self.le_dumpA.text())
-            dumpB = float(self.le_dumpB.text())
-        except:
-            return np.zeros(slm_size)
-
-        if wl <= 0 or f_focus == 0 or pitch <= 0:
-            return np.zeros(slm_size)
-        if not (0 <= alpha <= 1 and 0 <= alpha_dump_a <= 1 and 0 <= alpha_dump_b <= 1):
-            return np.zeros(slm_size)
-
-        x = np.linspace(-chip_width / 2, chip_width / 2, slm_size[1])
-        y = np.linspace(-chip_height / 2, chip_height / 2, slm_size[0])
-        X, Y = np.meshgrid(x, y, indexing="xy")
-
-        ang = np.deg2rad(angle_deg)
-        U = X * np.cos(ang) + Y * np.sin(ang)
-
-        k0 = 2 * np.pi / wl
-        kt = k0 * D / (2 * f_focus)
-
-        tilt_a = not self.cb_noA.isChecked()
-        tilt_b = not self.cb_noB.isChecked()
-
-        phiA = kt * U if tilt_a else 0.0
-        phiB = (-kt * U if tilt_b else 0.0) + dphi
-
-        kdumpA = dumpA * kt
-        kdumpB = dumpB * kt
-        phiAD = +kdumpA * U
-        phiBD = -kdumpB * U
-
-        sa, sb = np.sqrt(1 - alpha), np.sqrt(alpha)
-        xiA = 0.0 if sa + sb == 0 else sa / (sa + sb)
-
-        ix = np.floor((X - X.min()) / pitch).astype(np.int64)
-        iy = np.floor((Y - Y.min()) / pitch).astype(np.int64)
-        pid = iy * (ix.max() + 1) + ix
-        uniq, inv = np.unique(pid, return_inverse=True)
-
-        rng = np.random.default_rng(12345)
-        sideA = rng.random(uniq.size)[inv] < xiA
-        u_int = rng.random(uniq.size)[inv]
-
-        mainA = sideA & (u_int < np.sqrt(1 - alpha_dump_a))
-        mainB = (~sideA) & (u_int < np.sqrt(1 - alpha_dump_b))
-
-        phase = np.where(mainA, phiA, np.where(sideA, phiAD, 0.0)) + np.where(
-            mainB, phiB, np.where(~sideA, phiBD, 0.0)
+            params = {
+                name: float(self._text(field, overrides))
+                for name, field in (
+                    ("wl_nm", "le_wl"),
+                    ("f_focus_m", "le_f"),
+                    ("sep_um", "le_sep"),
+                    ("dphi_pi", "le_dphi_pi"),
+                    ("pitch_um", "le_pitch"),
+                    ("angle_deg", "le_angle"),
+                    ("alpha", "le_alpha"),
+                    ("alpha_dump_a", "le_alpha_dump_A"),
+                    ("alpha_dump_b", "le_alpha_dump_B"),
+                    ("dump_a", "le_dumpA"),
+                    ("dump_b", "le_dumpB"),
+                )
+            }
+        except ValueError:
+            raise ValueError("Invalid parameter values.")
+        return TwoFociStochasticLayer(
+            tilt_a=not self.cb_noA.isChecked(),
+            tilt_b=not self.cb_noB.isChecked(),
+            **params,
         )
 
-        wrapped = np.mod(phase, 2 * np.pi)
-        return wrapped * (bit_depth / (2 * np.pi))
-
     def save_(self):
         return {
             "wl_nm": self.le_wl.text(),
@@ -870,6 +884,136 @@ class TypeTwoFociStochastic(BaseTypeWidget):
         self.cb_noB.setChecked(s.get("noB", False))
 
 
+class TypeHologram(BaseTypeWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.name = "Hologram"
+        self.spots = []
+        layout = QVBoxLayout(self)
+        group = QGroupBox("Hologram (weighted Gerchberg-Saxton) Settings")
+        layout.addWidget(group)
+        grid = QGridLayout(group)
+
+        row = 0
+        grid.addWidget(QLabel("Wavelength [nm]:"), row, 0)
+        self.le_wl = QLineEdit("1030")
+        grid.addWidget(self.le_wl, row, 1)
+        row += 1
+
+        grid.addWidget(QLabel("Focal length f_focus [m]:"), row, 0)
+        self.le_f = QLineEdit("0.175")
+        grid.addWidget(self.le_f, row, 1)
+        row += 1
+
+        grid.addWidget(QLabel("Max iterations:"), row, 0)
+        self.le_iterations = QLineEdit("100")
+        grid.addWidget(self.le_iterations, row, 1)
+        row += 1
+
+        grid.addWidget(QLabel("Non-uniformity tolerance:"), row, 0)
+        self.le_tol = QLineEdit("0.001")
+        grid.addWidget(self.le_tol, row, 1)
+        row += 1
+
+        self.cb_weighted = QCheckBox("Weighted GS")
+        self.cb_weighted.setChecked(True)
+        grid.addWidget(self.cb_weighted, row, 0, 1, 2)
+        row += 1
+
+        grid.addWidget(QLabel("Spot x [µm]:"), row, 0)
+        self.le_x = QLineEdit("0")
+        grid.addWidget(self.le_x, row, 1)
+        row += 1
+
+        grid.addWidget(QLabel("Spot y [µm]:"), row, 0)
+        self.le_y = QLineEdit("0")
+        grid.addWidget(self.le_y, row, 1)
+        row += 1
+
+        grid.addWidget(QLabel("Relative intensity:"), row, 0)
+        self.le_weight = QLineEdit("1")
+        grid.addWidget(self.le_weight, row, 1)
+        row += 1
+
+        btn_add = QPushButton("Add Spot")
+        btn_add.clicked.connect(self.add_spot)
+        grid.addWidget(btn_add, row, 0)
+        btn_remove = QPushButton("Remove Last Spot")
+        btn_remove.clicked.connect(self.remove_last_spot)
+        grid.addWidget(btn_remove, row, 1)
+
+        self.lbl_spots = QLabel("No spots added")
+        self.lbl_spots.setWordWrap(True)
+        layout.addWidget(self.lbl_spots)
+
+    def add_spot(self):
+        try:
+            x = float(self.le_x.text())
+            y = float(self.le_y.text())
+            weight = float(self.le_weight.text())
+            if weight <= 0:
+                raise ValueError
+            self.spots.append((x, y, weight))
+            self.mark_dirty()
+            self.update_spot_display()
+        except ValueError:
+            print("Invalid input for spot position or intensity.")
+
+    def remove_last_spot(self):
+        if self.spots:
+            self.spots.pop()
+            self.mark_dirty()
+            self.update_spot_display()
+
+    def update_spot_display(self):
+        if not self.spots:
+            self.lbl_spots.setText("No spots added")
+        else:
+            text = "\n".join(
+                ["x: {:.1f} µm, y: {:.1f} µm, I: {:.2f}".format(x, y, i) for x, y, i in self.spots]
+            )
+            self.lbl_spots.setText(text)
+
+    def to_layer(self, overrides=None):
+        try:
+            wl_nm = float(self._text("le_wl", overrides))
+            f_focus = float(self._text("le_f", overrides))
+            iterations = int(self._text("le_iterations", overrides))
+            tol = float(self._text("le_tol", overrides))
+        except ValueError:
+            raise ValueError("Invalid parameter values.")
+        spots = tuple((float(x), float(y), float(i)) for x, y, i in self.spots)
+        return HologramLayer(
+            spots=spots,
+            wl_nm=wl_nm,
+            f_focus_m=f_focus,
+            w_L=w_L,
+            iterations=iterations,
+            tol=tol,
+            weighted=self.cb_weighted.isChecked(),
+        )
+
+    def save_(self):
+        return {
+            "spots": self.spots,
+            "wl_nm": self.le_wl.text(),
+            "f_focus_m": self.le_f.text(),
+            "iterations": self.le_iterations.text(),
+            "tol": self.le_tol.text(),
+            "weighted": self.cb_weighted.isChecked(),
+        }
+
+    def load_(self, s):
+        self.spots = [tuple(spot) for spot in s.get("spots", [])]
+        self.le_wl.setText(s.get("wl_nm", "1030"))
+        self.le_f.setText(s.get("f_focus_m", "0.175"))
+        self.le_iterations.setText(s.get("iterations", "100"))
+        self.le_tol.setText(s.get("tol", "0.001"))
+        self.cb_weighted.setChecked(s.get("weighted", True))
+        self.mark_dirty()
+        self.update_spot_display()
+
+
 def new_type(parent, typ):
     types_dict = {
         "Flat": TypeFlat,
@@ -880,6 +1024,7 @@ def new_type(parent, typ):
         "Zernike": TypeZernike,
         "PhaseJumps": TypePhaseJumps,
         "TwoFociStochastic": TypeTwoFociStochastic,
+        "Hologram": TypeHologram,
     }
     if typ not in types_dict:
         raise ValueError(
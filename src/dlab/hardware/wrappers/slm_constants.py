@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+# Driver-free so the phase model, benchmarks and batch jobs can import these
+# without loading the SLM SDK; slm_controller re-exports them.
+
+# SLM-300 Santec
+DEFAULT_SLM_SIZE: Tuple[int, int] = (1200, 1920)  # (rows, cols) = (height, width)
+DEFAULT_CHIP_W = 15.36e-3
+DEFAULT_CHIP_H = 9.6e-3
+DEFAULT_PIXEL_SIZE = 8e-6
+DEFAULT_BIT_DEPTH = 1023  # 10 bits
+
+# Phase levels travel from the phase layers to the driver in this dtype.
+LEVEL_DTYPE = np.uint16
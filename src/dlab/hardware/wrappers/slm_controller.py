@@ -1,14 +1,97 @@
 from __future__ import annotations
-from typing import Tuple, Optional
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Sequence, Tuple, Optional
 import numpy as np
 import dlab.hardware.drivers.SLM_driver._slm_py as slm_driver
+from dlab.hardware.wrappers.slm_lut import PhaseLut, lut_for_color
+# SLM-300 Santec defaults live in the driver-free slm_constants; re-exported here.
+from dlab.hardware.wrappers.slm_constants import (
+    DEFAULT_SLM_SIZE,
+    DEFAULT_CHIP_W,
+    DEFAULT_CHIP_H,
+    DEFAULT_PIXEL_SIZE,
+    DEFAULT_BIT_DEPTH,
+    LEVEL_DTYPE,
+)
+
+
+class SLMDisplaySession:
+    """
+    An SLM display kept open between publishes.
+
+    Owns a preallocated C-contiguous frame buffer that callers may fill in
+    place before calling :meth:`push`. Every push is timed. Pushed levels
+    are nominal (linear in phase); the phase-response ``lut`` is applied as
+    one gather into a second preallocated buffer just before the driver call.
+    """
+    def __init__(
+        self,
+        screen_num: int,
+        slm_size: Tuple[int, int] = DEFAULT_SLM_SIZE,
+        history: int = 200,
+        lut: Optional[PhaseLut] = None,
+    ):
+        self.screen_num = screen_num
+        self.slm_size = slm_size
+        self.frame = np.zeros(slm_size, dtype=LEVEL_DTYPE)
+        self.lut = lut
+        self._mapped: Optional[np.ndarray] = None
+        self.is_open = False
+        self.last_latency_ms: Optional[float] = None
+        self._latencies: deque[float] = deque(maxlen=history)
+
+    def open(self) -> None:
+        if not self.is_open:
+            slm_driver.SLM_Disp_Open(self.screen_num)
+            self.is_open = True
+
+    def push(self, levels: Optional[np.ndarray] = None) -> float:
+        """
+        Display ``levels`` (or the session frame if None) and return the latency in ms.
+        Any C-contiguous LEVEL_DTYPE array of the SLM size is handed to the driver as is.
+        """
+        buf = self.frame if levels is None else levels
+        if buf.dtype != LEVEL_DTYPE or not buf.flags.c_contiguous or buf.shape != tuple(self.slm_size):
+            np.copyto(self.frame, buf, casting="unsafe")
+            buf = self.frame
+        if self.lut is not None and not self.lut.is_identity:
+            if self._mapped is None:
+                self._mapped = np.empty_like(self.frame)
+            buf = self.lut.apply(buf, out=self._mapped)
+        self.open()
+
+        h, w = self.slm_size
+        t0 = time.perf_counter()
+        slm_driver.SLM_Disp_Data(self.screen_num, buf, w, h)
+        latency_ms = (time.perf_counter() - t0) * 1e3
+
+        self.last_latency_ms = latency_ms
+        self._latencies.append(latency_ms)
+        return latency_ms
+
+    def latency_stats(self) -> dict:
+        """Return last/mean/max publish latency in ms over the recent history."""
+        if not self._latencies:
+            return {"count": 0, "last_ms": None, "mean_ms": None, "max_ms": None}
+        lat = np.fromiter(self._latencies, dtype=float)
+        return {
+            "count": int(lat.size),
+            "last_ms": self.last_latency_ms,
+            "mean_ms": float(lat.mean()),
+            "max_ms": float(lat.max()),
+        }
+
+    def close(self) -> None:
+        if self.is_open:
+            try:
+                slm_driver.SLM_Disp_Close(self.screen_num)
+            finally:
+                self.is_open = False
 
-# SLM-300 Santec
-DEFAULT_SLM_SIZE: Tuple[int, int] = (1200, 1920)  # (rows, cols) = (height, width)
-DEFAULT_CHIP_W = 15.36e-3
-DEFAULT_CHIP_H = 9.6e-3
-DEFAULT_PIXEL_SIZE = 8e-6
-DEFAULT_BIT_DEPTH = 1023  # 10 bits
 
 class SLMController:
     """
@@ -33,35 +116,124 @@ class SLMController:
         self.background_phase: Optional[np.ndarray] = None
         self.phase: Optional[np.ndarray] = None
         self.screen_num: Optional[int] = None
+        self.session: Optional[SLMDisplaySession] = None
+        self.lut: PhaseLut = lut_for_color(color, bit_depth)
+
+    def set_lut(self, lut: PhaseLut) -> None:
+        """Use ``lut`` for the following publishes, including on the open session."""
+        if lut.bit_depth != self.bit_depth:
+            raise ValueError(f"LUT has {lut.bit_depth + 1} levels, SLM has {self.bit_depth + 1}.")
+        self.lut = lut
+        if self.session is not None:
+            self.session.lut = lut
 
     def _convert_phase(self, phase: np.ndarray) -> np.ndarray:
         """
         Ensure integer phase in [0..bit_depth], contiguous C array.
-        If float given, we modulo and cast to uint16.
+        Composed LEVEL_DTYPE buffers are passed through untouched;
+        anything else is wrapped and cast to uint16.
         """
         arr = np.asarray(phase)
-        arr = np.mod(arr, self.bit_depth + 1)
-        arr = arr.astype(np.uint16, copy=False)
-        return np.ascontiguousarray(arr)
+        if arr.dtype == LEVEL_DTYPE and arr.flags.c_contiguous:
+            return arr
+        if np.issubdtype(arr.dtype, np.integer):
+            arr = np.remainder(arr, self.bit_depth + 1)
+        else:
+            arr = np.mod(arr, self.bit_depth + 1)
+        return np.ascontiguousarray(arr, dtype=LEVEL_DTYPE)
+
+    def open_session(self, screen_num: int) -> SLMDisplaySession:
+        """
+        Return the open display session for ``screen_num``, opening it once.
+        A session on another screen is closed first.
+        """
+        if self.session is not None and self.session.screen_num != screen_num:
+            self.close()
+        if self.session is None:
+            self.session = SLMDisplaySession(screen_num, self.slm_size, lut=self.lut)
+        self.session.open()
+        self.screen_num = screen_num
+        return self.session
 
-    def publish(self, phase: np.ndarray, screen_num: int) -> None:
+    def publish(self, phase: np.ndarray, screen_num: int) -> float:
         """
         Publish the phase to the specified SLM screen.
+        ``phase`` holds nominal levels; ``self.phase`` keeps them and the LUT
+        is applied on the way to the driver. Returns the driver latency in ms.
         """
         self.phase = self._convert_phase(phase)
-        self.screen_num = screen_num
+        return self.open_session(screen_num).push(self.phase)
 
-        slm_driver.SLM_Disp_Open(self.screen_num)
-        h, w = self.slm_size
-        slm_driver.SLM_Disp_Data(self.screen_num, self.phase, w, h)
+    @property
+    def last_publish_ms(self) -> Optional[float]:
+        return self.session.last_latency_ms if self.session is not None else None
 
     def close(self) -> None:
         """
         Explicit close if you kept a screen open (safe no-op otherwise).
         """
-        if self.screen_num is not None:
+        if self.session is not None:
             try:
-                slm_driver.SLM_Disp_Close(self.screen_num)
+                self.session.close()
             except Exception:
                 pass
-            self.screen_num = None
+            self.session = None
+        self.screen_num = None
+
+
+@dataclass
+class PublishTiming:
+    """Timing of one SLM in a coordinated publish; ``error`` is set if it failed."""
+
+    color: str
+    screen_num: int
+    render_ms: float
+    push_ms: float
+    total_ms: float
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@lru_cache(maxsize=1)
+def _publish_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="slm-publish")
+
+
+def _render_and_publish(
+    slm: SLMController, screen_num: int, render: Callable[[], np.ndarray]
+) -> PublishTiming:
+    t0 = time.perf_counter()
+    render_ms = push_ms = float("nan")
+    try:
+        levels = render()
+        render_ms = (time.perf_counter() - t0) * 1e3
+        push_ms = slm.publish(levels, screen_num)
+    except Exception as e:
+        total_ms = (time.perf_counter() - t0) * 1e3
+        return PublishTiming(slm.color, screen_num, render_ms, push_ms, total_ms, e)
+    total_ms = (time.perf_counter() - t0) * 1e3
+    return PublishTiming(slm.color, screen_num, render_ms, push_ms, total_ms)
+
+
+def publish_parallel(
+    jobs: Sequence[Tuple[SLMController, int, Callable[[], np.ndarray]]],
+) -> Dict[str, PublishTiming]:
+    """
+    Render and publish several SLMs concurrently, one worker thread each.
+
+    ``jobs`` holds (controller, screen number, render callable returning the
+    levels). Returns once every SLM is displayed, with per-SLM timing keyed
+    by colour. A failing job does not stop the others; its timing carries
+    the error instead.
+    """
+    screens = [screen for _, screen, _ in jobs]
+    if len(set(screens)) != len(screens):
+        raise ValueError(f"Each SLM needs its own screen, got {screens}.")
+    futures = [
+        (slm.color, _publish_pool().submit(_render_and_publish, slm, screen, render))
+        for slm, screen, render in jobs
+    ]
+    return {color: fut.result() for color, fut in futures}
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from dlab.hardware.wrappers.slm_constants import DEFAULT_SLM_SIZE, LEVEL_DTYPE
+
+
+def default_bank_path(name: str) -> Path:
+    """Return a scratch path for a frame bank file."""
+    folder = Path(tempfile.gettempdir()) / "dlab_slm_frames"
+    folder.mkdir(parents=True, exist_ok=True)
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name) or "bank"
+    return folder / f"{safe}.npy"
+
+
+class SlmFrameBank:
+    """
+    Memory-mapped stack of pre-rendered SLM frames for a scan.
+
+    Frames are indexed by the tuple of positions of the SLM axes they were
+    rendered for, in the order the axes were given.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        axis_lengths: Sequence[int],
+        slm_size: Tuple[int, int] = DEFAULT_SLM_SIZE,
+        mode: str = "w+",
+    ) -> None:
+        self.path = Path(path)
+        self.axis_lengths = tuple(int(n) for n in axis_lengths)
+        self.slm_size = (int(slm_size[0]), int(slm_size[1]))
+        n_frames = int(np.prod(self.axis_lengths)) if self.axis_lengths else 1
+        if mode == "r":
+            self.frames = np.load(self.path, mmap_mode="r")
+        else:
+            self.frames = np.lib.format.open_memmap(
+                self.path, mode=mode, dtype=LEVEL_DTYPE, shape=(n_frames,) + self.slm_size
+            )
+
+    def __len__(self) -> int:
+        return int(self.frames.shape[0])
+
+    def index(self, idxs: Sequence[int]) -> int:
+        """Flat frame index for a tuple of SLM axis indices."""
+        if not self.axis_lengths:
+            return 0
+        return int(np.ravel_multi_index(tuple(int(i) for i in idxs), self.axis_lengths))
+
+    def frame(self, idxs: Sequence[int]) -> np.ndarray:
+        """C-contiguous view of the frame for the given axis indices."""
+        return self.frames[self.index(idxs)]
+
+    def store(self, flat_index: int, levels: np.ndarray) -> None:
+        self.frames[flat_index] = levels
+
+    def flush(self) -> None:
+        if self.frames is not None and hasattr(self.frames, "flush"):
+            self.frames.flush()
+
+    def close(self, delete: bool = True) -> None:
+        """Release the memory map and optionally remove the file."""
+        if self.frames is not None:
+            self.flush()
+            self.frames = None
+        if delete:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import threading
+from functools import lru_cache
+from typing import Callable, Tuple
+
+import numpy as np
+
+from dlab.hardware.wrappers.slm_constants import (
+    DEFAULT_SLM_SIZE,
+    DEFAULT_CHIP_W,
+    DEFAULT_CHIP_H,
+)
+
+
+def _read_only(arr: np.ndarray) -> np.ndarray:
+    arr.setflags(write=False)
+    return arr
+
+
+class SlmGeometry:
+    """
+    Read-only pixel coordinates of an SLM chip, shared by all phase types.
+
+    Full-frame arrays (X, Y, R², θ) are built lazily on first access and kept
+    for the lifetime of the process. Use :func:`get_geometry` instead of
+    instantiating this class directly so that the arrays are shared.
+
+    :meth:`tile` returns the geometry of a band of rows whose arrays are
+    views into the full-frame ones, so kernels can render tiles in parallel.
+    ``slm_size`` always refers to the whole chip; ``shape`` to the pixels
+    covered and ``rows`` to their position on the chip.
+    """
+
+    def __init__(
+        self,
+        slm_size: Tuple[int, int] = DEFAULT_SLM_SIZE,
+        chip_width: float = DEFAULT_CHIP_W,
+        chip_height: float = DEFAULT_CHIP_H,
+        dtype=np.float64,
+    ) -> None:
+        self.slm_size = (int(slm_size[0]), int(slm_size[1]))
+        self.chip_width = float(chip_width)
+        self.chip_height = float(chip_height)
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.RLock()  # derived arrays build their inputs under the lock
+        self._arrays: dict[str, np.ndarray] = {}
+        self.full = self
+        self.rows = slice(0, self.slm_size[0])
+
+        h, w = self.slm_size
+        self.x = _read_only(
+            np.linspace(-self.chip_width / 2, self.chip_width / 2, w).astype(self.dtype)
+        )
+        self.y = _read_only(
+            np.linspace(-self.chip_height / 2, self.chip_height / 2, h).astype(self.dtype)
+        )
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.y.size, self.x.size)
+
+    @property
+    def key(self) -> tuple:
+        return (
+            self.slm_size,
+            self.chip_width,
+            self.chip_height,
+            self.dtype.str,
+            self.rows.start,
+            self.rows.stop,
+        )
+
+    def tile(self, row_start: int, row_stop: int) -> "SlmGeometry":
+        """Geometry of rows [row_start, row_stop) of the chip."""
+        full = self.full
+        rows = slice(*slice(row_start, row_stop).indices(full.slm_size[0])[:2])
+        tile = object.__new__(SlmGeometry)
+        tile.slm_size = full.slm_size
+        tile.chip_width = full.chip_width
+        tile.chip_height = full.chip_height
+        tile.dtype = full.dtype
+        tile._lock = full._lock
+        tile._arrays = {}
+        tile.full = full
+        tile.rows = rows
+        tile.x = full.x
+        tile.y = full.y[rows]
+        return tile
+
+    def _get(self, name: str, build: Callable[[], np.ndarray]) -> np.ndarray:
+        if self.full is not self:
+            return getattr(self.full, name)[self.rows]
+        arr = self._arrays.get(name)
+        if arr is not None:
+            return arr
+        with self._lock:
+            arr = self._arrays.get(name)
+            if arr is None:
+                arr = _read_only(np.ascontiguousarray(build(), dtype=self.dtype))
+                self._arrays[name] = arr
+        return arr
+
+    @property
+    def X(self) -> np.ndarray:
+        """Horizontal coordinate of every pixel [m]."""
+        return self._get("X", lambda: np.broadcast_to(self.x[None, :], self.shape))
+
+    @property
+    def Y(self) -> np.ndarray:
+        """Vertical coordinate of every pixel [m]."""
+        return self._get("Y", lambda: np.broadcast_to(self.y[:, None], self.shape))
+
+    @property
+    def R2(self) -> np.ndarray:
+        """Squared distance to the chip centre [m²]."""
+        return self._get("R2", lambda: self.x[None, :] ** 2 + self.y[:, None] ** 2)
+
+    @property
+    def R(self) -> np.ndarray:
+        """Distance to the chip centre [m]."""
+        return self._get("R", lambda: np.sqrt(self.R2))
+
+    @property
+    def theta(self) -> np.ndarray:
+        """Azimuthal angle around the chip centre [rad], in (-π, π]."""
+        return self._get("theta", lambda: np.arctan2(self.y[:, None], self.x[None, :]))
+
+    def clear(self) -> None:
+        """Drop the cached full-frame arrays."""
+        with self._lock:
+            self.full._arrays.clear()
+
+
+@lru_cache(maxsize=8)
+def _cached_geometry(slm_size: Tuple[int, int], chip_width: float, chip_height: float, dtype: str) -> SlmGeometry:
+    return SlmGeometry(slm_size, chip_width, chip_height, np.dtype(dtype))
+
+
+def get_geometry(
+    slm_size: Tuple[int, int] = DEFAULT_SLM_SIZE,
+    chip_width: float = DEFAULT_CHIP_W,
+    chip_height: float = DEFAULT_CHIP_H,
+    dtype=np.float64,
+) -> SlmGeometry:
+    """Return the process-wide geometry for the given chip, building it once."""
+    return _cached_geometry(
+        (int(slm_size[0]), int(slm_size[1])),
+        float(chip_width),
+        float(chip_height),
+        np.dtype(dtype).str,
+    )
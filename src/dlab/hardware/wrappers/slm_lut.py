@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from dlab.boot import ROOT
+from dlab.utils.config_utils import cfg_get
+
+
+class PhaseLut:
+    """
+    Phase-response lookup table of an SLM at one wavelength.
+
+    Maps the nominal level of a linear phase (level = φ / 2π · bit_depth) to
+    the gray level that produces that phase on the chip. Applying it is a
+    single integer gather over the composed frame.
+    """
+
+    def __init__(self, table: np.ndarray, wavelength_nm: Optional[float] = None, source: str = ""):
+        table = np.ascontiguousarray(table, dtype=np.uint16)
+        if table.ndim != 1 or table.size < 2:
+            raise ValueError("LUT must be a 1-D table with one entry per level.")
+        table.setflags(write=False)
+        self.table = table
+        self.wavelength_nm = wavelength_nm
+        self.source = source
+        self.is_identity = bool(np.array_equal(table, np.arange(table.size)))
+
+    @property
+    def bit_depth(self) -> int:
+        return self.table.size - 1
+
+    @classmethod
+    def identity(cls, bit_depth: int) -> "PhaseLut":
+        return cls(np.arange(bit_depth + 1), source="identity")
+
+    def apply(self, levels: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Return ``table[levels]``, written into ``out`` when given."""
+        if self.is_identity:
+            if out is None:
+                return levels
+            np.copyto(out, levels, casting="unsafe")
+            return out
+        return np.take(self.table, levels, out=out, mode="clip")
+
+
+def _parse_lut(path: str, bit_depth: int):
+    """
+    Read a LUT file: '#' comment lines (an optional "# Wavelength (nm): 1030"),
+    then either one output level per line or (input level, output level)
+    pairs. Pairs may be sparse and are linearly interpolated.
+    """
+    wavelength_nm = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line.startswith("#"):
+                continue
+            key, _, value = line[1:].partition(":")
+            if key.strip().lower().startswith("wavelength"):
+                try:
+                    wavelength_nm = float(value)
+                except ValueError:
+                    pass
+
+    data = np.loadtxt(path, comments="#", delimiter=None, ndmin=2)
+    levels = np.arange(bit_depth + 1)
+    if data.shape[1] == 1:
+        if data.shape[0] != bit_depth + 1:
+            raise ValueError(f"LUT {path} has {data.shape[0]} entries, expected {bit_depth + 1}.")
+        out = data[:, 0]
+    else:
+        order = np.argsort(data[:, 0])
+        out = np.interp(levels, data[order, 0], data[order, 1])
+    out = np.clip(np.rint(out), 0, bit_depth)
+    return out, wavelength_nm
+
+
+@lru_cache(maxsize=8)
+def _cached_lut(path: str, mtime_ns: int, size: int, bit_depth: int) -> PhaseLut:
+    table, wavelength_nm = _parse_lut(path, bit_depth)
+    return PhaseLut(table, wavelength_nm, source=path)
+
+
+def load_lut(path: str | Path, bit_depth: int) -> PhaseLut:
+    """Load a LUT file, re-parsing only when the file changes."""
+    st = os.stat(path)
+    return _cached_lut(os.path.abspath(path), st.st_mtime_ns, st.st_size, int(bit_depth))
+
+
+def lut_for_color(color: str, bit_depth: int) -> PhaseLut:
+    """
+    LUT configured as ``slm.<color>_lut`` (relative to the repository root).
+
+    Falls back to the identity table when none is configured or the file
+    cannot be read.
+    """
+    rel = cfg_get(f"slm.{color}_lut")
+    if not rel:
+        return PhaseLut.identity(bit_depth)
+    path = (ROOT / str(rel)).resolve()
+    try:
+        return load_lut(path, bit_depth)
+    except Exception as e:
+        print(f'Could not load {color} SLM LUT "{path}": {e}. Using identity.')
+        return PhaseLut.identity(bit_depth)
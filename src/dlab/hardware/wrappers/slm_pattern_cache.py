@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from dlab.utils.config_utils import cfg_get
+from dlab.utils.paths_utils import cache_dir
+
+DEFAULT_MAX_MB = 512
+
+
+class SlmPatternCache:
+    """
+    Content-addressed on-disk LRU cache of composed SLM frames.
+
+    Frames are stored as .npy files named by a hash of the layer parameters
+    and the chip geometry, and come back as read-only memory maps. Every hit
+    refreshes the file's mtime; when the folder grows past ``max_bytes`` the
+    least recently used frames are deleted.
+
+    :meth:`put` only queues the write on a background thread, so callers on
+    the GUI thread never wait for the disk; frames still queued are served
+    from memory by :meth:`get`.
+    """
+
+    def __init__(self, folder: Path, max_bytes: int) -> None:
+        self.folder = Path(folder)
+        self.max_bytes = int(max_bytes)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slm-pattern-cache")
+        self._pending: Dict[str, np.ndarray] = {}
+        self._futures: list[Future] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(layers: Iterable, geometry_key, bit_depth: int, render_version: int = 0) -> str:
+        """
+        Hash JSON-serialisable layer descriptions together with the geometry
+        and the version of the kernels that rendered them.
+        """
+        payload = json.dumps(
+            {
+                "layers": list(layers),
+                "geometry": geometry_key,
+                "bit_depth": int(bit_depth),
+                "render_version": int(render_version),
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.folder / f"{key}.npy"
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            frame = self._pending.get(key)
+        if frame is not None:
+            return frame
+        path = self._path(key)
+        try:
+            frame = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return frame
+
+    def put(self, key: str, frame: np.ndarray) -> None:
+        """Queue ``frame`` for writing; the caller may keep modifying its own copy."""
+        frame = np.array(frame, copy=True, order="C")
+        frame.setflags(write=False)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending[key] = frame
+            self._futures = [f for f in self._futures if not f.done()]
+            self._futures.append(self._writer.submit(self._write, key, frame))
+
+    def flush(self) -> None:
+        """Wait until every queued frame is on disk."""
+        with self._lock:
+            futures = list(self._futures)
+        for f in futures:
+            f.result()
+
+    def _write(self, key: str, frame: np.ndarray) -> None:
+        try:
+            self._save(key, frame)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _save(self, key: str, frame: np.ndarray) -> None:
+        path = self._path(key)
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, frame)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Could not write SLM pattern cache entry: {e}")
+            return
+        self._evict(keep=path)
+
+    def _evict(self, keep: Path) -> None:
+        try:
+            entries = [(p.stat().st_mtime, p.stat().st_size, p) for p in self.folder.glob("*.npy")]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if p == keep:
+                continue
+            try:
+                os.remove(p)
+                total -= size
+            except OSError:
+                pass  # still memory-mapped (Windows); evicted on a later write
+
+    def clear(self) -> None:
+        self.flush()
+        for p in self.folder.glob("*.npy"):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+
+def default_pattern_cache() -> SlmPatternCache:
+    """Pattern cache in <cache_dir>/slm_patterns, capped at ``slm.pattern_cache_mb``."""
+    max_mb = float(cfg_get("slm.pattern_cache_mb", DEFAULT_MAX_MB))
+    return SlmPatternCache(cache_dir() / "slm_patterns", int(max_mb * 1024 * 1024))
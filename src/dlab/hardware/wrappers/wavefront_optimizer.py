@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.ndimage import uniform_filter
+
+from dlab.hardware.wrappers.slm_constants import DEFAULT_BIT_DEPTH, LEVEL_DTYPE
+from dlab.hardware.wrappers.zernike_basis import ZernikeBasis
+
+
+# -----------------------------------------------------------------------------
+# Frame metrics (higher is better)
+# -----------------------------------------------------------------------------
+
+def _prepare(frame: np.ndarray, roi: Optional[Tuple[int, int, int, int]]) -> np.ndarray:
+    """Float copy of the (ROI of the) frame with the median dark level removed."""
+    img = np.asarray(frame)
+    if roi is not None:
+        x0, y0, x1, y1 = roi
+        img = img[y0:y1, x0:x1]
+    img = img.astype(np.float32)
+    img -= np.float32(np.median(img))
+    np.maximum(img, 0, out=img)
+    return img
+
+
+def peak_metric(frame: np.ndarray, roi=None) -> float:
+    """Peak of the 3x3-averaged frame, robust to single hot pixels."""
+    return float(uniform_filter(_prepare(frame, roi), size=3).max())
+
+
+def strehl_proxy(frame: np.ndarray, roi=None) -> float:
+    """Smoothed peak over the total signal: insensitive to power drifts."""
+    img = _prepare(frame, roi)
+    total = float(img.sum())
+    if total <= 0:
+        return 0.0
+    return float(uniform_filter(img, size=3).max()) / total
+
+
+def second_moment_metric(frame: np.ndarray, roi=None) -> float:
+    """Negative spot variance σx² + σy² [px²] from the intensity moments."""
+    img = _prepare(frame, roi)
+    total = float(img.sum())
+    if total <= 0:
+        return float("-inf")
+    px = img.sum(axis=0, dtype=np.float64) / total
+    py = img.sum(axis=1, dtype=np.float64) / total
+    x = np.arange(px.size, dtype=np.float64)
+    y = np.arange(py.size, dtype=np.float64)
+    mx, my = px @ x, py @ y
+    return -float(px @ (x - mx) ** 2 + py @ (y - my) ** 2)
+
+
+METRICS = {
+    "Peak": peak_metric,
+    "Strehl proxy": strehl_proxy,
+    "Second moments": second_moment_metric,
+}
+
+
+# -----------------------------------------------------------------------------
+# Search strategies
+# -----------------------------------------------------------------------------
+
+class SpgdSearch:
+    """
+    Stochastic parallel gradient descent.
+
+    Every iteration measures the two-sided perturbation c ± σ·δ with random
+    signs δ on all modes at once, and steps along δ by ``gain`` · σ times the
+    normalised score difference. σ decays by ``decay`` per iteration; the
+    search has converged once it falls below ``min_sigma``.
+    """
+
+    name = "SPGD"
+
+    def __init__(self, n_modes: int, sigma: float, gain: float = 1.0, decay: float = 0.98,
+                 min_sigma: float = 0.0, seed: int = 0) -> None:
+        self.sigma = float(sigma)
+        self.gain = float(gain)
+        self.decay = float(decay)
+        self.min_sigma = float(min_sigma)
+        self._rng = np.random.default_rng(seed)
+        self._n = int(n_modes)
+        self._delta = np.zeros(self._n)
+
+    @property
+    def converged(self) -> bool:
+        return self.sigma < self.min_sigma
+
+    def ask(self, center: np.ndarray) -> List[np.ndarray]:
+        self._delta = self._rng.choice((-1.0, 1.0), self._n)
+        d = self.sigma * self._delta
+        return [center + d, center - d]
+
+    def tell(self, center: np.ndarray, center_score: float, scores: Sequence[float]) -> Tuple[np.ndarray, float]:
+        j_plus, j_minus = scores
+        scale = abs(j_plus) + abs(j_minus)
+        dj = (j_plus - j_minus) / scale if scale > 0 else 0.0
+        center = center + self.gain * self.sigma * dj * self._delta
+        self.sigma *= self.decay
+        return center, 0.5 * (j_plus + j_minus)
+
+
+class CoordinateSearch:
+    """
+    Coordinate search over the modes, one mode per iteration.
+
+    Each iteration measures c ± step along one mode and moves to the better
+    side if it beats the current score. After a full sweep without any
+    improvement the step shrinks by ``shrink``; the search has converged
+    once it falls below ``min_step``.
+    """
+
+    name = "Coordinate"
+
+    def __init__(self, n_modes: int, step: float, shrink: float = 0.5, min_step: float = 1.0) -> None:
+        self.step = float(step)
+        self.shrink = float(shrink)
+        self.min_step = float(min_step)
+        self._n = int(n_modes)
+        self._mode = 0
+        self._improved = False
+
+    @property
+    def converged(self) -> bool:
+        return self.step < self.min_step
+
+    def ask(self, center: np.ndarray) -> List[np.ndarray]:
+        e = np.zeros(self._n)
+        e[self._mode] = self.step
+        return [center + e, center - e]
+
+    def tell(self, center: np.ndarray, center_score: float, scores: Sequence[float]) -> Tuple[np.ndarray, float]:
+        trials = self.ask(center)
+        best = int(np.argmax(scores))
+        if scores[best] > center_score:
+            center, center_score = trials[best], float(scores[best])
+            self._improved = True
+        self._mode += 1
+        if self._mode == self._n:
+            if not self._improved:
+                self.step *= self.shrink
+            self._mode = 0
+            self._improved = False
+        return center, center_score
+
+
+# -----------------------------------------------------------------------------
+# Closed loop
+# -----------------------------------------------------------------------------
+
+@dataclass
+class OptimizerStep:
+    """Progress report after one iteration."""
+
+    iteration: int
+    coefs: np.ndarray
+    score: float
+    best_score: float
+    frames: int
+    ms_per_frame: float
+
+
+@dataclass
+class WavefrontResult:
+    """Best coefficients found by a run, with its score history."""
+
+    js: Tuple[int, ...]
+    coefs: np.ndarray
+    score: float
+    initial_score: float
+    iterations: int
+    frames: int
+    converged: bool
+    history: List[float] = field(default_factory=list)
+
+
+class WavefrontOptimizer:
+    """
+    Closed-loop optimisation of Zernike coefficients from camera feedback.
+
+    Trial frames are ``base_levels`` plus the Zernike sum of the cached basis
+    (coefficients in levels, as in the coefficient files). The loop is
+    pipelined: the next trial renders into the other of two level buffers
+    while the current one is displayed and captured, and each captured frame
+    is scored on a second thread while the next trial is on the SLM. Within
+    an iteration a trial therefore costs about one camera frame; only the
+    first trial of each iteration waits for the previous scores.
+    """
+
+    def __init__(
+        self,
+        basis: ZernikeBasis,
+        base_levels: np.ndarray,
+        publish: Callable[[np.ndarray], object],
+        grab: Callable[[], np.ndarray],
+        metric: Callable[[np.ndarray], float],
+        bit_depth: int = DEFAULT_BIT_DEPTH,
+        settle_s: float = 0.0,
+    ) -> None:
+        if tuple(base_levels.shape) != basis.slm_size:
+            raise ValueError(f"Base frame {base_levels.shape} does not match the basis {basis.slm_size}.")
+        self.basis = basis
+        self.base = np.asarray(base_levels, dtype=np.float32)
+        self.publish = publish
+        self.grab = grab
+        self.metric = metric
+        self.bit_depth = int(bit_depth)
+        self.settle_s = float(settle_s)
+        self._buffers = [np.empty(basis.slm_size, dtype=LEVEL_DTYPE) for _ in range(2)]
+        self._next_buffer = 0
+
+    def render(self, coefs: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Levels of the base frame plus the Zernike sum of ``coefs``."""
+        phase = self.basis.combine(coefs)
+        phase += self.base
+        np.rint(phase, out=phase)
+        np.mod(phase, self.bit_depth + 1, out=phase)
+        if out is None:
+            out = np.empty(phase.shape, dtype=LEVEL_DTYPE)
+        np.copyto(out, phase, casting="unsafe")
+        return out
+
+    def _render_next(self, coefs: np.ndarray) -> np.ndarray:
+        out = self._buffers[self._next_buffer]
+        self._next_buffer ^= 1
+        return self.render(coefs, out)
+
+    def _measure(self, trials: Sequence[np.ndarray], render_pool: ThreadPoolExecutor,
+                 analysis_pool: ThreadPoolExecutor) -> List[float]:
+        rendered: Future = render_pool.submit(self._render_next, trials[0])
+        scores: List[Future] = []
+        for i in range(len(trials)):
+            levels = rendered.result()
+            if i + 1 < len(trials):
+                rendered = render_pool.submit(self._render_next, trials[i + 1])
+            self.publish(levels)
+            if self.settle_s > 0:
+                time.sleep(self.settle_s)
+            frame = self.grab()
+            scores.append(analysis_pool.submit(self.metric, frame))
+        return [float(f.result()) for f in scores]
+
+    def run(
+        self,
+        strategy,
+        coefs0: Sequence[float],
+        max_iterations: int = 200,
+        on_step: Optional[Callable[[OptimizerStep], None]] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> WavefrontResult:
+        """
+        Optimise from ``coefs0`` until the strategy converges, ``max_iterations``
+        is reached or ``should_stop`` returns True. The best coefficients seen
+        are displayed on return.
+        """
+        center = np.asarray(coefs0, dtype=np.float64).copy()
+        if center.shape != (len(self.basis.js),):
+            raise ValueError(f"Expected {len(self.basis.js)} coefficients, got {center.shape}")
+
+        history: List[float] = []
+        iterations = frames = 0
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(1, thread_name_prefix="wfo-render") as render_pool, \
+                ThreadPoolExecutor(1, thread_name_prefix="wfo-metric") as analysis_pool:
+            center_score = self._measure([center], render_pool, analysis_pool)[0]
+            frames += 1
+            initial_score = best_score = center_score
+            best = center.copy()
+            history.append(center_score)
+
+            while iterations < max_iterations and not strategy.converged:
+                if should_stop is not None and should_stop():
+                    break
+                trials = strategy.ask(center)
+                scores = self._measure(trials, render_pool, analysis_pool)
+                frames += len(trials)
+                iterations += 1
+                for trial, score in zip(trials, scores):
+                    if score > best_score:
+                        best, best_score = trial.copy(), score
+                center, center_score = strategy.tell(center, center_score, scores)
+                history.append(center_score)
+                if on_step is not None:
+                    elapsed_ms = (time.perf_counter() - t0) * 1e3
+                    on_step(OptimizerStep(iterations, center.copy(), center_score, best_score,
+                                          frames, elapsed_ms / frames))
+
+        self.publish(self.render(best))
+        return WavefrontResult(
+            js=self.basis.js,
+            coefs=best,
+            score=best_score,
+            initial_score=initial_score,
+            iterations=iterations,
+            frames=frames,
+            converged=bool(strategy.converged),
+            history=history,
+        )
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import math
+import os
+from functools import lru_cache
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from dlab.hardware.wrappers.slm_constants import DEFAULT_SLM_SIZE
+
+
+def noll_to_nm(j: int) -> Tuple[int, int]:
+    """Convert a Noll index (starting at 1) to the radial/azimuthal orders (n, m)."""
+    if j < 1:
+        raise ValueError("Noll indices start at 1.")
+    n = 0
+    while (n * (n + 1)) // 2 + 1 <= j:
+        n += 1
+    n -= 1
+    j_start = (n * (n + 1)) // 2 + 1
+    k = j - j_start
+    m = -n + 2 * k
+    return n, m
+
+
+def zernike_radial(n: int, m_abs: int, r: np.ndarray, r2: np.ndarray | None = None) -> np.ndarray:
+    """
+    Evaluate the radial polynomial R_n^|m|(r).
+
+    The series coefficients are generated by their ratio recurrence and the
+    polynomial in r² is evaluated with Horner's scheme, so no factorial or
+    power is recomputed per term.
+    """
+    if (n - m_abs) % 2 != 0:
+        return np.zeros_like(r)
+    if r2 is None:
+        r2 = r * r
+
+    a = (n + m_abs) // 2
+    b = (n - m_abs) // 2
+    coefs = [float(math.comb(n, b))]
+    for s in range(b):
+        coefs.append(-coefs[-1] * (a - s) * (b - s) / ((s + 1) * (n - s)))
+
+    R = np.full_like(r, coefs[0])
+    for c in coefs[1:]:
+        R *= r2
+        R += c
+    if m_abs:
+        R *= r**m_abs
+    return R
+
+
+def _unit_window(slm_size: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Normalised coordinates of the chip inside the unit disk spanning its width."""
+    h, w = slm_size
+    x = np.linspace(-1.0, 1.0, w)
+    start = (w - h) // 2
+    y = x[start : start + h] if w >= h else np.linspace(-h / w, h / w, h)
+    return x, y
+
+
+class ZernikeBasis:
+    """
+    Stack of Zernike modes evaluated once on the SLM window.
+
+    Modes are normalised to the unit disk spanning the chip width and are
+    zero outside of it. A new set of coefficients only costs one tensordot
+    over the cached stack.
+    """
+
+    def __init__(
+        self,
+        js: Sequence[int],
+        slm_size: Tuple[int, int] = DEFAULT_SLM_SIZE,
+        dtype=np.float32,
+    ) -> None:
+        self.js = tuple(int(j) for j in js)
+        self.slm_size = (int(slm_size[0]), int(slm_size[1]))
+        self.dtype = np.dtype(dtype)
+
+        x, y = _unit_window(self.slm_size)
+        X, Y = np.meshgrid(x, y, indexing="xy")
+        r2 = X * X + Y * Y
+        r = np.sqrt(r2)
+        t = np.arctan2(Y, X)
+        inside = r <= 1.0
+
+        modes = np.empty((len(self.js),) + self.slm_size, dtype=self.dtype)
+        for i, j in enumerate(self.js):
+            n, m = noll_to_nm(j)
+            m_abs = abs(m)
+            Z = zernike_radial(n, m_abs, r, r2)
+            if m_abs:
+                Z *= np.cos(m_abs * t) if m >= 0 else np.sin(m_abs * t)
+            Z[~inside] = 0.0
+            modes[i] = Z
+        modes.setflags(write=False)
+        self.modes = modes
+
+    def combine(self, coefs: Sequence[float], rows: slice = slice(None)) -> np.ndarray:
+        """Return the weighted sum of the cached modes, optionally on a band of rows."""
+        c = np.asarray(coefs, dtype=self.dtype)
+        if c.shape != (len(self.js),):
+            raise ValueError(f"Expected {len(self.js)} coefficients, got {c.shape}")
+        return np.tensordot(c, self.modes[:, rows], axes=1)
+
+
+@lru_cache(maxsize=4)
+def _cached_basis(js: Tuple[int, ...], slm_size: Tuple[int, int]) -> ZernikeBasis:
+    return ZernikeBasis(js, slm_size)
+
+
+def get_zernike_basis(js: Sequence[int], slm_size: Tuple[int, int] = DEFAULT_SLM_SIZE) -> ZernikeBasis:
+    """Return the process-wide basis for the given Noll indices, building it once."""
+    return _cached_basis(tuple(int(j) for j in js), (int(slm_size[0]), int(slm_size[1])))
+
+
+@lru_cache(maxsize=16)
+def _cached_coefficients(path: str, mtime_ns: int, size: int) -> Tuple[Tuple[int, ...], np.ndarray]:
+    data = np.atleast_2d(np.loadtxt(path, skiprows=1))
+    js = tuple(int(j) for j in data[:, 0])
+    coefs = data[:, 1].copy()
+    coefs.setflags(write=False)
+    return js, coefs
+
+
+def load_coefficients(path: str) -> Tuple[Tuple[int, ...], np.ndarray]:
+    """Read a (Noll index, coefficient) table, re-parsing only when the file changes."""
+    st = os.stat(path)
+    return _cached_coefficients(os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def save_coefficients(path: str, js: Sequence[int], coefs: Sequence[float]) -> None:
+    """Write a (Noll index, coefficient) table readable by :func:`load_coefficients`."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("#Zernike_order_j\tZernike_coefficient (nm rms)\n")
+        for j, c in zip(js, coefs):
+            f.write(f"{int(j)}\t{float(c):.6g}\n")
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from dlab.utils.paths_utils import cache_dir
+
+
+def sidecar_path(path: str | Path, folder: str = "arrays") -> Path:
+    """Sidecar location for ``path``, keyed by its absolute path, mtime and size."""
+    src = Path(path).resolve()
+    st = src.stat()
+    version = hashlib.sha1(f"{st.st_mtime_ns}|{st.st_size}".encode("utf-8")).hexdigest()[:8]
+    return cache_dir() / folder / f"{_source_prefix(src)}-{version}.npy"
+
+
+def _source_prefix(src: Path) -> str:
+    return f"{src.stem}-{hashlib.sha1(str(src).encode('utf-8')).hexdigest()[:8]}"
+
+
+def load_cached(path: str | Path, loader: Callable[[str], np.ndarray], folder: str = "arrays") -> np.ndarray:
+    """
+    Load an array through a binary .npy sidecar.
+
+    The first load parses ``path`` with ``loader`` and writes the result to
+    the cache directory; later loads of the unchanged file memory-map the
+    sidecar read-only. Editing the file changes its key, so stale sidecars
+    are never used.
+    """
+    try:
+        sidecar = sidecar_path(path, folder)
+    except OSError:
+        return loader(str(path))
+
+    if sidecar.exists():
+        try:
+            return np.load(sidecar, mmap_mode="r")
+        except (OSError, ValueError):
+            pass
+
+    arr = np.asarray(loader(str(path)))
+    try:
+        sidecar.parent.mkdir(parents=True, exist_ok=True)
+        tmp = sidecar.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, arr)
+        os.replace(tmp, sidecar)
+        _prune_stale(sidecar)
+    except OSError as e:
+        print(f'Could not write cache for "{path}": {e}')
+    return arr
+
+
+def _prune_stale(sidecar: Path) -> None:
+    """Remove sidecars of earlier versions of the same source file."""
+    prefix = sidecar.stem.rsplit("-", 1)[0]
+    for old in sidecar.parent.glob(f"{prefix}-*.npy"):
+        if old != sidecar and old.stem.rsplit("-", 1)[0] == prefix:
+            try:
+                os.remove(old)
+            except OSError:
+                pass  # still memory-mapped elsewhere; retried on the next write
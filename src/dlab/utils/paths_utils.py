@@ -16,3 +16,8 @@ def logs_dir() -> Path:
 def data_dir() -> Path:
     """Get data directory from config."""
     return (ROOT / str(cfg_get("paths.data_dir", "data"))).resolve()
+
+
+def cache_dir() -> Path:
+    """Get cache directory from config."""
+    return (ROOT / str(cfg_get("paths.cache_dir", "cache"))).resolve()